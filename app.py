@@ -4,6 +4,7 @@ from uuid import uuid4
 from datetime import datetime
 import re
 from llm.chat import handle_user_query
+from llm.agents.agent_pool import get_agent_pool
 import base64
 import os 
 import html
@@ -76,6 +77,13 @@ def load_agents_with_b64_avatars():
     return agents_with_b64
 
 AGENTS_WITH_B64_AVATARS = load_agents_with_b64_avatars()
+
+@st.cache_resource
+def warm_up_agent_pool(llm_backend):
+    # runs once per backend per server process, not per rerun
+    get_agent_pool().warm_up(backends=[llm_backend])
+    return True
+
 DEFAULT_AGENT_INFO_B64 = AGENTS["fixie"]
 
 # place all agents inside dict
@@ -226,13 +234,32 @@ async def stream_response_to_placeholder(session_id, user_query, chat_history_fo
     start_time = datetime.now().strftime("%H:%M")
     final_persona_key_used = agent_key_for_this_turn 
 
+    progress_lines = []
+
+    def show_tool_progress(progress):
+        # partial tool results (e.g. speed test ping / download / upload) while the answer is pending
+        progress_lines.append(progress.message())
+        placeholder.markdown(f"""
+            <div class="chat-container">
+                <img src="{agent_avatar}" class="chat-avatar">
+                <div>
+                    <div class="agent-name">{current_persona_display_name}</div>
+                    <div class="chat-bubble-bot">
+                        {escape_html_with_breaks(chr(10).join(progress_lines))}
+                        <div class="timestamp-bot">{start_time}</div>
+                    </div>
+                </div>
+            </div>
+        """, unsafe_allow_html=True)
+
     try:
         ai_generator, returned_persona_key = await handle_user_query(
             session_id=session_id,
             user_query=user_query,
             chat_history=chat_history_for_llm,
             stream_to_terminal=False,
-            llm_backend=st.session_state.llm_backend
+            llm_backend=st.session_state.llm_backend,
+            on_tool_progress=show_tool_progress
         )
 
         if returned_persona_key:
@@ -330,6 +357,7 @@ st.session_state.llm_backend = st.sidebar.selectbox(
     LLM_BACKENDS, 
     index=LLM_BACKENDS.index(st.session_state.llm_backend)
 )
+warm_up_agent_pool(st.session_state.llm_backend)
 
 st.sidebar.title("Son Aktif Agent")
 
@@ -4,6 +4,7 @@ from uuid import uuid4
 from datetime import datetime
 import re
 from llm.chat import handle_user_query
+from llm.agents.agent_pool import get_agent_pool
 import base64
 import os 
 import html
@@ -93,6 +94,13 @@ def load_agents_with_b64_avatars():
     return agents_with_b64
 
 AGENTS_WITH_B64_AVATARS = load_agents_with_b64_avatars()
+
+@st.cache_resource
+def warm_up_agent_pool(llm_backend):
+    # runs once per backend per server process, not per rerun
+    get_agent_pool().warm_up(backends=[llm_backend])
+    return True
+
 DEFAULT_AGENT_INFO_B64 = AGENTS["fixie"]
 
 # place all agents inside dict
@@ -346,6 +354,7 @@ st.session_state.llm_backend = st.sidebar.selectbox(
     LLM_BACKENDS, 
     index=LLM_BACKENDS.index(st.session_state.llm_backend)
 )
+warm_up_agent_pool(st.session_state.llm_backend)
 
 st.sidebar.title("Son Aktif Agent")
 
@@ -0,0 +1,153 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from utils.log import logger
+
+
+LOCAL_BACKENDS = ("local", "ollama")
+SUPPORTED_BACKENDS = ("local", "gemini")
+
+MAX_POOLED_SESSIONS = int(os.environ.get("AGENT_POOL_MAX_SESSIONS", "256"))
+SESSION_IDLE_TTL_SECONDS = float(os.environ.get("AGENT_POOL_SESSION_TTL", "1800"))
+
+
+def normalize_backend(llm_backend: str) -> str:
+    backend = (llm_backend or "").lower()
+    if backend in LOCAL_BACKENDS:
+        return "local"
+    if backend == "gemini":
+        return "gemini"
+    raise ValueError(f"Unsupported LLM backend: {llm_backend}")
+
+
+class AgentPool:
+    """
+    Keeps warm agent instances so a chat turn does not rebuild prompts, SDK clients or the RAG agent.
+
+    Heavy components (RagAgent, Gemini client) are built once per (backend, language_mode) and shared.
+    Each session gets its own lightweight agent on top of them, so per-session state stays apart.
+    Sessions are evicted least-recently-used first and after being idle for `session_ttl` seconds.
+    """
+
+    def __init__(self, max_sessions: int = MAX_POOLED_SESSIONS, session_ttl: float = SESSION_IDLE_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self._shared = {}
+        self._rag_agent = None
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def _get_rag_agent(self):
+        # the RAG agent is language independent, one is enough for the process
+        if self._rag_agent is None:
+            from llm.agents.rag_agent import RagAgent
+            self._rag_agent = RagAgent()
+        return self._rag_agent
+
+    def _get_shared(self, backend: str, language_mode: str) -> dict:
+        key = (backend, language_mode)
+        shared = self._shared.get(key)
+        if shared is None:
+            start = time.perf_counter()
+            shared = {"rag_agent": self._get_rag_agent()}
+            if backend == "gemini":
+                from llm.agents.gemini_chat_agent import GeminiChatAgent
+                shared["chat_agent"] = GeminiChatAgent(language_mode=language_mode)
+            self._shared[key] = shared
+            logger.info(f"Agent pool built shared components for {key} in {time.perf_counter() - start:.2f}s")
+        return shared
+
+    def _build_agent(self, backend: str, language_mode: str, session_id: str):
+        shared = self._get_shared(backend, language_mode)
+        if backend == "local":
+            from llm.agents.local_chat_agent import LocalAIChatAgent
+            return LocalAIChatAgent(session_id=session_id, language_mode=language_mode,
+                                    rag_agent=shared["rag_agent"])
+        from llm.agents.agent_router import AgentRouter
+        return AgentRouter(session_id=session_id, language_mode=language_mode,
+                           chat_agent=shared["chat_agent"], rag_agent=shared["rag_agent"])
+
+    def acquire(self, session_id: str, llm_backend: str = "local", language_mode: str = "tr"):
+        """Return the warm agent for this session, creating it on first use."""
+        backend = normalize_backend(llm_backend)
+        key = (backend, language_mode, session_id)
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._sessions.get(key)
+            if entry is not None:
+                self._sessions.move_to_end(key)
+                entry[1] = now
+                self.reused += 1
+                return entry[0]
+
+            agent = self._build_agent(backend, language_mode, session_id)
+            self._sessions[key] = [agent, now]
+            self.created += 1
+            self._evict(now)
+            return agent
+
+    def release(self, session_id: str):
+        """Drop every agent held for a session (e.g. when the user resets the chat)."""
+        with self._lock:
+            for key in [k for k in self._sessions if k[2] == session_id]:
+                del self._sessions[key]
+
+    def _evict(self, now: float):
+        while self._sessions:
+            key, (_, last_used) = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or now - last_used > self.session_ttl:
+                del self._sessions[key]
+                self.evicted += 1
+                logger.debug(f"Agent pool evicted session {key}")
+            else:
+                break
+
+    def warm_up(self, backends=("local",), language_modes=("tr",), preload_embeddings: bool = True):
+        """Build shared components ahead of the first user message. Failures are logged, not raised."""
+        start = time.perf_counter()
+        for llm_backend in backends:
+            for language_mode in language_modes:
+                try:
+                    with self._lock:
+                        self._get_shared(normalize_backend(llm_backend), language_mode)
+                except Exception as e:
+                    logger.error(f"Agent pool warm-up failed for {llm_backend}/{language_mode}: {e}")
+        if preload_embeddings:
+            try:
+                self._get_rag_agent().embedding_model
+                if "local" in {normalize_backend(b) for b in backends}:
+                    from llm.utils.fast_router import get_fast_router, FAST_ROUTER_ENABLED
+                    if FAST_ROUTER_ENABLED:
+                        get_fast_router().warm_up()
+            except Exception as e:
+                logger.error(f"Agent pool could not preload embedding model: {e}")
+        logger.info(f"Agent pool warm-up finished in {time.perf_counter() - start:.2f}s")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "shared": [f"{b}/{l}" for b, l in self._shared],
+                "created": self.created,
+                "reused": self.reused,
+                "evicted": self.evicted,
+            }
+
+
+_agent_pool = None
+_agent_pool_lock = threading.Lock()
+
+
+def get_agent_pool() -> AgentPool:
+    """Process-wide agent pool."""
+    global _agent_pool
+    if _agent_pool is None:
+        with _agent_pool_lock:
+            if _agent_pool is None:
+                _agent_pool = AgentPool()
+    return _agent_pool
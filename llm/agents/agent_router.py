@@ -6,23 +6,35 @@ from llm.agents.gemini_chat_agent import GeminiChatAgent
 from llm.utils.tools.hypernet_funcs import run_speed_test
 from llm.utils.tools.professor_ping_funcs import draw_topology_diagram
 from llm.utils.tools.bytefix_funcs import run_network_diagnostics
+from llm.utils.tools.compaction import compact_results
+from llm.utils.tool_scheduler import set_tool_context
 from llm.agents.base_chat_agent import BaseChatAgent
+from llm.utils.routing_cache import get_route_cache
 
 import asyncio
+import copy
+import inspect
 import json
 from utils.log import logger
 
 class AgentRouter(BaseChatAgent):
-    def __init__(self, session_id: str = "", language_mode: str = "tr", agent_tools: dict = AGENT_TOOLS, chat_agent=None):
+    def __init__(self, session_id: str = "", language_mode: str = "tr", agent_tools: dict = AGENT_TOOLS, chat_agent=None,
+                 rag_agent: RagAgent = None):
         super().__init__(session_id=session_id, language_mode=language_mode)
         self.agent_tools = agent_tools
         self.chat_agent = chat_agent or GeminiChatAgent()
         # TODO: make all agents as class instances like fixie, hypernet, etc.
         self.agent_instances = {
-            "fixie": RagAgent(),
+            "fixie": rag_agent or RagAgent(),
         }
 
     async def detect_agent_and_function(self, query):
+        route_cache = get_route_cache()
+        cached_route = route_cache.get(query)
+        if cached_route:
+            logger.info(f"Routing path: cache | route: {cached_route}")
+            return copy.deepcopy(cached_route)
+
         prompt = f"""
         You are an expert router that selects the **most appropriate** technical support agent based **strictly** on their specialization. Do not choose Fixie unless **no other agent is a clear fit**.
 
@@ -39,9 +51,14 @@ class AgentRouter(BaseChatAgent):
         Respond in pure JSON (no explanation):
         {{"agent": "agent_name", "function": "function_name", "parameters": {{...}}}}
         """
-        return self.chat_agent.generate_json_response(prompt)
-
-    async def execute_function(self, agent_name, function_name, parameters):
+        route = self.chat_agent.generate_json_response(prompt)
+        if isinstance(route, dict) and {"agent", "function", "parameters"} <= route.keys():
+            route_cache.put(query, copy.deepcopy(route))
+        return route
+
+    async def execute_function(self, agent_name, function_name, parameters, on_progress=None):
+        # the router model may answer "parameters": null
+        parameters = parameters or {}
         logger.info("Selected agent: %s", agent_name)
         logger.info(f"Executing function {function_name} with parameters: {parameters}")
         func = None
@@ -69,11 +86,17 @@ class AgentRouter(BaseChatAgent):
                 logger.error(f"Function '{function_name}' not implemented or not callable.")
                 raise NotImplementedError(f"Function '{function_name}' for agent '{agent_name}' not implemented or found.")
 
+        # long-running tools (speed test) report partial results to the chat
+        if on_progress is not None and "on_progress" in inspect.signature(func).parameters:
+            parameters = {**parameters, "on_progress": on_progress}
+
         # support both async and sync functions
         # TODO: use only asyync functions
         return await func(**parameters) if asyncio.iscoroutinefunction(func) else func(**parameters)
 
-    async def ask_agent(self, query, chat_history, language_mode="tr"):
+    async def ask_agent(self, query, chat_history, language_mode="tr", on_progress=None):
+        # tool runs of this turn are scheduled fairly per session and report queueing through on_progress
+        set_tool_context(self.session_id, on_progress)
         # agent and function to route to
         route = await self.detect_agent_and_function(query)
         logger.info(f"Routing query to: {route}")
@@ -91,7 +114,7 @@ class AgentRouter(BaseChatAgent):
                     "chat_history": chat_history
                 }
 
-        result = await self.execute_function(route["agent"], route["function"], route["parameters"])
+        result = await self.execute_function(route["agent"], route["function"], route["parameters"], on_progress)
         result = {route["function"]: result} if not isinstance(result, dict) else result
         user_response = await self.generate_user_response(query, result, route["agent"], language_mode)
 
@@ -119,6 +142,8 @@ class AgentRouter(BaseChatAgent):
         }
         system_prompt = get_system_prompt(language_mode)
         persona_prompt = system_prompt + persona_prompts.get(agent_name.lower(), FIXIE_PERSONA_PROMPT)
+        # parsed, size-bounded summary instead of the raw tool output
+        results = compact_results(results)
         prompt = f"""
 {persona_prompt}
 The user asked: "{query}"
@@ -1,8 +1,7 @@
 import os
 import re
 import json
-import google.generativeai as genai
-from google.generativeai import configure
+from llm.utils.lazy import genai
 from llm.agents.base_chat_agent import BaseChatAgent
 
 from utils.log import logger
@@ -14,7 +13,7 @@ class GeminiChatAgent(BaseChatAgent):
     def __init__(self, session_id: str = "", language_mode: str = "tr", model_name="models/gemini-2.0-flash"):
         super().__init__(session_id=session_id, language_mode=language_mode)
         
-        configure(api_key=os.environ.get("GOOGLE_API_KEY"))
+        genai.configure(api_key=os.environ.get("GOOGLE_API_KEY"))
         self.model = genai.GenerativeModel(model_name)
 
     def generate_json_response(self, prompt):
@@ -1,22 +1,25 @@
 import asyncio
 from llm.agents.base_chat_agent import BaseChatAgent
 from llm.utils.agent_mapping import PERSONA_MAPPING
-from llm.utils.select_agent import select_agent
+from llm.utils.select_agent import select_agent_async
 from llm.utils.tools.tools import AGENT_TOOLS
 from llm.model import AIModel
 from utils.log import logger
 from llm.agents.rag_agent import RagAgent
 from llm.utils.tools.hypernet_funcs import run_speed_test
 from llm.utils.tools.professor_ping_funcs import draw_topology_diagram
-from llm.utils.tools.helpers.select_tools import select_bytefix_tool
+from llm.utils.tools.helpers.select_tools import select_bytefix_tool_async
 from llm.utils.tools.bytefix_funcs import run_network_diagnostics
+from llm.utils.tools.compaction import compact_tool_output
+from llm.utils.tool_scheduler import set_tool_context
 
 
 class LocalAIChatAgent(BaseChatAgent):
-    def __init__(self, session_id: str = "", language_mode: str = "tr"):
+    def __init__(self, session_id: str = "", language_mode: str = "tr", rag_agent: RagAgent = None):
         super().__init__(session_id=session_id, language_mode=language_mode)
 
-        self.rag_agent = RagAgent()
+        # pooled agents share one RagAgent, see llm/agents/agent_pool.py
+        self.rag_agent = rag_agent or RagAgent()
         self.model_params = self.set_model_parameters(
             system_prompt=self.system_prompt,
             model=self.model,
@@ -30,8 +33,10 @@ class LocalAIChatAgent(BaseChatAgent):
             persona=self.persona
         )
 
-    async def ask_agent(self, user_query: str, chat_history: list = []):
-        persona = select_agent(user_query=user_query)
+    async def ask_agent(self, user_query: str, chat_history: list = [], on_progress=None):
+        # tool runs of this turn are scheduled fairly per session and report queueing through on_progress
+        set_tool_context(self.session_id, on_progress)
+        persona = await select_agent_async(user_query=user_query)
         if persona:
             logger.info(f"Selected Agent: {persona.upper()}")
         else:
@@ -44,8 +49,9 @@ class LocalAIChatAgent(BaseChatAgent):
         if persona == "fixie":
             user_query = await self._run_rag_if_needed(persona, user_query)
         elif persona == "hypernet":
-            speedtest_results = await run_speed_test(user_query)
+            speedtest_results = await run_speed_test(user_query, on_progress=on_progress)
             if speedtest_results:
+                speedtest_results = compact_tool_output("run_speed_test", speedtest_results)
                 user_query = f"{user_query}\n\n Speed Results: {speedtest_results} I will inform you about the speed test results."
                 logger.info("Speedtest results appended to user query.")
         elif persona == "professor_ping":
@@ -57,11 +63,13 @@ class LocalAIChatAgent(BaseChatAgent):
                 user_query = f"{user_query}\n\n Topology Diagram: {topology_diagram} \nUse exactly this diagram."
                 logger.info("Topology diagram appended to user query.")
         elif persona == "bytefix":
-            result = select_bytefix_tool(user_query)
+            result = await select_bytefix_tool_async(user_query)
             if result:
                 tool_name, parameters = result
-                result = run_network_diagnostics(**parameters)
+                # the decider may return no parameters or extra keys, only the target is used
+                result = await run_network_diagnostics(target=(parameters or {}).get("target"))
                 logger.info("Bytefix tool result - %s", result)
+                result = compact_tool_output(tool_name, result)
                 user_query = f"Results of {tool_name}: {result} \nUse this result to inform user."
                 logger.info("Bytefix tool response appended to user query.")
             else:
@@ -81,7 +89,17 @@ class LocalAIChatAgent(BaseChatAgent):
     async def _run_rag_if_needed(self, persona: str, user_query: str) -> str:
         if persona != "fixie":
             return user_query
-        dataset_id, tool_name = self.rag_agent.select_dataset(user_query)
+        if self.rag_agent.use_unified_index():
+            # no decider round trip: the unified index covers every dataset
+            try:
+                hits = await self.rag_agent.retrieve_async(user_query)
+            except Exception as e:
+                logger.error(f"Unified retrieval failed: {e}")
+                return user_query
+            if hits:
+                return f"{user_query}\n\nRetrieved Information: \n{self.rag_agent.format_hits(hits)}"
+            return user_query
+        dataset_id, tool_name = await self.rag_agent.select_dataset_async(user_query)
         if dataset_id and tool_name:
             rag_response = await self.rag_agent.call_rag_tool(tool_name, user_query, dataset_id)
             if rag_response:
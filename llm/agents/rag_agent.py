@@ -1,21 +1,51 @@
-import ollama
-from llm.data.data_pipeline import DataPipeline
-from sentence_transformers import SentenceTransformer
+from llm.data.data_pipeline import DataPipeline, UNIFIED_DATASET_ID
+from llm.data.index_specs import search_parameters
+from llm.utils.embedding_registry import get_embedding_model, DEFAULT_EMBEDDING_MODEL
+from llm.utils.ollama_client import get_ollama_client, DECIDER_TIMEOUT
+from llm.utils.retrieval_cache import get_retrieval_cache, get_query_embedding_cache
 from utils.log import logger
 import numpy as np
+import asyncio
+import os
+import time
 import re
-import faiss  
+from llm.utils.lazy import faiss
+from collections import defaultdict
+from dataclasses import dataclass
+
+
+# Fixie searches one index over all datasets instead of asking the decider which dataset to use,
+# once that index has been built offline; until then retrieval stays per dataset
+RAG_UNIFIED_INDEX = os.environ.get("RAG_UNIFIED_INDEX", "1") == "1"
+# candidates fetched per requested hit when results are boosted after the search
+RAG_OVERFETCH = int(os.environ.get("RAG_OVERFETCH", "4"))
+
+NO_INFORMATION = "İlgili bilgi bulunamadı."
+
+
+@dataclass
+class RetrievalRequest:
+    query: str
+    dataset_id: str
+    k: int = 3
+    tool_name: str = None
+
+
+@dataclass
+class RetrievalHit:
+    text: str
+    source: str
+    chunk_id: int
+    distance: float
+    dataset_id: str
 
 
 class RagAgent:
-    def __init__(self, decider_model: str = "gemma3"):
+    def __init__(self, decider_model: str = "gemma3", embedding_model_name: str = DEFAULT_EMBEDDING_MODEL):
         """Initialize the RagAgent with data pipeline and embedding model."""
-        self.pipeline = DataPipeline()
-        self.embedding_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+        self.pipeline = DataPipeline(embedding_model_name=embedding_model_name)
+        self.embedding_model_name = embedding_model_name
         self.decider_model = decider_model
-        self.index = None
-        self.documents = []
-        self.metadata = []
         
         # Define tool-specific query prefixes for contextual retrieval
         self.tool_prefixes = {
@@ -29,12 +59,18 @@ class RagAgent:
             "check_router_troubleshooting": "network_troubleshooting"
         }
 
-    def select_dataset(self, query: str, selected_tool: str = None) -> tuple[str, str]:
-        """
-        Select the dataset_id and tool_name based on the query and selected tool.
-        Used by local LLMs
-        """
-        available_datasets = self.pipeline.list_existing_indices()
+    @property
+    def embedding_model(self):
+        """Shared process-wide embedding model (same instance as the data pipeline's)."""
+        return get_embedding_model(self.embedding_model_name)
+
+    def _encode(self, texts: list[str], **kwargs) -> np.ndarray:
+        """Query embeddings through the process-wide cache of repeated query strings."""
+        return get_query_embedding_cache().encode(self.embedding_model, self.embedding_model_name, texts, **kwargs)
+
+    def _direct_dataset(self, selected_tool: str = None):
+        """Return (available_datasets, direct selection or None) without asking the decider model."""
+        available_datasets = [d for d in self.pipeline.list_existing_indices() if d != UNIFIED_DATASET_ID]
         if not available_datasets:
             logger.error("No FAISS indices available")
             raise ValueError("No FAISS indices found in llm/data")
@@ -44,12 +80,13 @@ class RagAgent:
             dataset_id = self.tool_to_dataset[selected_tool]
             if dataset_id in available_datasets:
                 logger.info(f"Selected dataset_id {dataset_id} based on tool {selected_tool}")
-                return dataset_id, selected_tool
+                return available_datasets, (dataset_id, selected_tool)
+        return available_datasets, None
 
-        # Fallback to query-based selection
+    def _dataset_selection_prompt(self, query: str, available_datasets: list) -> str:
         dataset_options = ", ".join(available_datasets)
         tool_options = ", ".join(self.tool_prefixes.keys())
-        prompt = f"""
+        return f"""
         Kullanıcı sorusu: {query}
         Mevcut veri setleri: {dataset_options}
         Mevcut araçlar: {tool_options}
@@ -61,17 +98,11 @@ class RagAgent:
         tool: check_common_issues
         Yalnızca bu formatta yanıt ver, başka metin ekleme.
         """
-        
-        response = ollama.chat(
-            model=self.decider_model,
-            messages=[{"role": "user", "content": prompt}],
-            stream=False
-        )
-        
+
+    def _parse_dataset_selection(self, response_text: str, available_datasets: list) -> tuple[str, str]:
         # Parse the response
         selected_dataset = None
         selected_tool = None
-        response_text = response["message"].get("content", "").strip()
         
         # Extract dataset and tool
         dataset_match = re.search(r"dataset:\s*(\S+)", response_text)
@@ -96,6 +127,45 @@ class RagAgent:
             logger.info(f"Ultimate fallback to dataset_id {available_datasets[0]} and tool check_common_issues")
             return available_datasets[0], "check_common_issues"
 
+    async def select_dataset_async(self, query: str, selected_tool: str = None,
+                                   timeout: float | None = DECIDER_TIMEOUT) -> tuple[str, str]:
+        """
+        Non-blocking select_dataset. On decider timeout the usual fallback dataset is used;
+        cancellation propagates to the pending request.
+        """
+        available_datasets, selection = self._direct_dataset(selected_tool)
+        if selection:
+            return selection
+
+        prompt = self._dataset_selection_prompt(query, available_datasets)
+        try:
+            response = await asyncio.wait_for(
+                get_ollama_client().chat(model=self.decider_model, messages=[{"role": "user", "content": prompt}]),
+                timeout=timeout
+            )
+            response_text = response["message"].get("content", "").strip()
+        except asyncio.TimeoutError:
+            logger.warning(f"Decider model {self.decider_model} timed out after {timeout}s selecting a dataset.")
+            response_text = ""
+        return self._parse_dataset_selection(response_text, available_datasets)
+
+    def select_dataset(self, query: str, selected_tool: str = None) -> tuple[str, str]:
+        """
+        Select the dataset_id and tool_name based on the query and selected tool.
+        Used by local LLMs. Blocking variant for scripts; use select_dataset_async inside the event loop.
+        """
+        available_datasets, selection = self._direct_dataset(selected_tool)
+        if selection:
+            return selection
+
+        # Fallback to query-based selection
+        prompt = self._dataset_selection_prompt(query, available_datasets)
+        response = get_ollama_client().chat_sync(
+            model=self.decider_model,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return self._parse_dataset_selection(response["message"].get("content", "").strip(), available_datasets)
+
     async def call_rag_tool(self, tool_name: str, query: str, dataset_id: str, k: int = 3) -> str:
         """Call the RAG tool to retrieve relevant information based on tool_name, query, and dataset_id."""
         if tool_name not in self.tool_prefixes:
@@ -103,26 +173,48 @@ class RagAgent:
             return "İlgili bilgi bulunamadı."  # No RAG for non-troubleshooting tools
         
         logger.info(f"Calling RAG tool: {tool_name} with query: {query} using dataset: {dataset_id}")
+
+        if self.use_unified_index():
+            # one search over the unified index, filtered to the tool's dataset like the per-dataset path
+            try:
+                hits = await self.retrieve_async(query, k, datasets=[dataset_id],
+                                                 prefix=self.tool_prefixes.get(tool_name, ""))
+            except Exception as e:
+                logger.error(f"Unified retrieval failed for {tool_name}: {e}")
+                return f"Hata: FAISS indeksi yüklenemedi: {e}"
+            retrieved_info = self.format_hits(hits)
+            logger.info(f"Retrieved information: \n{retrieved_info}")
+            return retrieved_info
         
         # Load the FAISS index for the selected dataset
         filename = f"{dataset_id}.txt"
         try:
-            self.index, self.documents, self.metadata = self.pipeline.get_index_and_metadata(dataset_id, filename)
+            # locals, not attributes: a pooled RagAgent serves several sessions at once
+            entry = self.pipeline.get_index_entry(dataset_id, filename)
+            index, documents, metadata = entry.index, entry.documents, entry.metadata
         except Exception as e:
             logger.error(f"Failed to load FAISS index for dataset {dataset_id}: {e}")
             return f"Hata: FAISS indeksi yüklenemedi: {e}"
         
-        if not isinstance(self.index, faiss.Index):
-            logger.error(f"Invalid FAISS index type: {type(self.index)}")
+        if not isinstance(index, faiss.Index):
+            logger.error(f"Invalid FAISS index type: {type(index)}")
             return "Hata: Geçersiz FAISS indeksi."
 
         # Get the prefix for the tool to bias retrieval
         prefix = self.tool_prefixes.get(tool_name, "")
         modified_query = prefix + query
 
+        # Same question against the same index version: reuse the previous answer
+        cache = get_retrieval_cache()
+        cache_key = cache.key(dataset_id, prefix, query, k, tool_name)
+        cached = cache.get(cache_key, entry.version)
+        if cached is not None:
+            logger.info(f"Retrieval cache hit for {tool_name} in {dataset_id}")
+            return cached
+
         # Generate embedding for the modified query
         try:
-            query_embedding = self.embedding_model.encode([modified_query])[0]
+            query_embedding = self._encode([modified_query])[0]
         except Exception as e:
             logger.error(f"Failed to encode query: {e}")
             return f"Hata: Sorgu kodlaması başarısız: {e}"
@@ -133,28 +225,29 @@ class RagAgent:
             return "Hata: Geçersiz sorgu gömülmesi."
         
         query_embedding = np.array([query_embedding]).astype('float32')
-        if query_embedding.shape[1] != self.index.d:
-            logger.error(f"Query embedding dimension {query_embedding.shape[1]} does not match index dimension {self.index.d}")
+        if query_embedding.shape[1] != index.d:
+            logger.error(f"Query embedding dimension {query_embedding.shape[1]} does not match index dimension {index.d}")
             return "Hata: Sorgu gömülme boyutu indeks boyutuyla uyuşmuyor."
 
         # Search FAISS index for top-k similar documents
         try:
-            distances, indices = self.index.search(query_embedding, k)
+            distances, indices = index.search(query_embedding, k)
         except Exception as e:
             logger.error(f"FAISS search failed: {e}")
             return f"Hata: FAISS araması başarısız: {e}"
         
         # Filter results based on tool_name for relevance
         relevant_chunks = []
-        for idx in indices[0]:
-            if idx < len(self.metadata):
-                meta = self.metadata[idx]
+        for label in indices[0]:
+            idx = entry.row(label)
+            if idx is not None:
+                meta = metadata[idx]
                 # Bias towards relevant files
                 if (tool_name == "check_common_issues" and "common_home_network_problems" in meta['source']) or \
                    (tool_name == "check_router_troubleshooting" and "network_troubleshooting" in meta['source']):
-                    relevant_chunks.append(self.documents[idx])
+                    relevant_chunks.append(documents[idx])
                 elif tool_name not in self.tool_prefixes:  # Fallback for generic queries
-                    relevant_chunks.append(self.documents[idx])
+                    relevant_chunks.append(documents[idx])
         
         # Format retrieved information
         if relevant_chunks:
@@ -165,4 +258,150 @@ class RagAgent:
             retrieved_info = "İlgili bilgi bulunamadı."  # No relevant information found
             logger.info(f"No relevant chunks found for {tool_name} in {dataset_id}")
 
-        return retrieved_info
\ No newline at end of file
+        cache.put(cache_key, entry.version, retrieved_info)
+        return retrieved_info
+
+    def use_unified_index(self) -> bool:
+        """True when unified retrieval is enabled and its index has been built; queries never build it."""
+        if not RAG_UNIFIED_INDEX:
+            return False
+        if not self.pipeline.index_ready(UNIFIED_DATASET_ID):
+            logger.info(f"No '{UNIFIED_DATASET_ID}' index built yet, using per-dataset retrieval")
+            return False
+        return True
+
+    @staticmethod
+    def _hit_dataset(meta: dict) -> str:
+        return meta.get("dataset_id") or os.path.splitext(meta.get("source", ""))[0]
+
+    def _dataset_labels(self, entry, datasets: list[str]) -> np.ndarray:
+        """faiss labels (chunk ids, or rows for position-labelled indices) of the entry's chunks from `datasets`."""
+        key = tuple(sorted(datasets))
+        labels = entry.dataset_labels.get(key)
+        if labels is None:
+            labels = np.array([meta["id"] if entry.id_to_row is not None else row
+                               for row, meta in enumerate(entry.metadata) if self._hit_dataset(meta) in key],
+                              dtype="int64")
+            entry.dataset_labels[key] = labels
+        return labels
+
+    def _search_datasets(self, entry, query_embedding: np.ndarray, k: int, datasets: list[str]):
+        """Search only the chunks of `datasets`, so a small dataset in a large corpus still fills k."""
+        labels = self._dataset_labels(entry, datasets)
+        if not len(labels):
+            return np.empty((1, 0), dtype="float32"), np.empty((1, 0), dtype="int64")
+        selector = faiss.IDSelectorBatch(labels)
+        k = min(k, len(labels))
+        distances, found = entry.index.search(query_embedding, k, params=search_parameters(entry.index, selector))
+        if (found[0] < 0).any():
+            # the probed IVF lists / HNSW candidates held fewer matches than k, look everywhere
+            distances, found = entry.index.search(
+                query_embedding, k, params=search_parameters(entry.index, selector, exhaustive=True))
+        return distances, found
+
+    def retrieve(self, query: str, k: int = 3, datasets: list[str] = None,
+                 boost: dict[str, float] = None, prefix: str = "") -> list[RetrievalHit]:
+        """
+        Top-k chunks from the unified index of all datasets with a single search.
+        `datasets` restricts the search itself to those datasets' chunks (a faiss IDSelector);
+        `boost` ({dataset_id: 0.15}) shrinks the distance of hits from a dataset by that fraction
+        and re-ranks an over-fetched candidate list.
+        Results are cached per index version, so a rebuilt index is searched again.
+        """
+        entry = self.pipeline.get_index_entry(UNIFIED_DATASET_ID)
+        cache = get_retrieval_cache()
+        options = (tuple(sorted(datasets)) if datasets else None, tuple(sorted(boost.items())) if boost else None)
+        cache_key = cache.key(UNIFIED_DATASET_ID, prefix, query, k, options)
+        cached = cache.get(cache_key, entry.version)
+        if cached is not None:
+            logger.info(f"Retrieval cache hit for '{query}'")
+            return list(cached)
+
+        query_embedding = self._encode([prefix + query])
+        fetch = min(entry.index.ntotal, k * RAG_OVERFETCH) if boost else k
+        if datasets:
+            distances, labels = self._search_datasets(entry, query_embedding, fetch, datasets)
+        else:
+            distances, labels = entry.index.search(query_embedding, max(fetch, 1))
+
+        hits = []
+        for label, distance in zip(labels[0], distances[0]):
+            idx = entry.row(label)
+            if idx is None:
+                continue
+            meta = entry.metadata[idx]
+            dataset_id = self._hit_dataset(meta)
+            hits.append(RetrievalHit(text=entry.documents[idx], source=meta.get("source", ""),
+                                     chunk_id=meta.get("chunk_id", idx), distance=float(distance),
+                                     dataset_id=dataset_id))
+        if boost:
+            hits.sort(key=lambda hit: hit.distance * (1 - boost.get(hit.dataset_id, 0.0)))
+        hits = hits[:k]
+        logger.info(f"Unified retrieval: {len(hits)} hits for '{query}' from {sorted({hit.dataset_id for hit in hits})}")
+        cache.put(cache_key, entry.version, hits)
+        return list(hits)
+
+    async def retrieve_async(self, query: str, k: int = 3, datasets: list[str] = None,
+                             boost: dict[str, float] = None, prefix: str = "") -> list[RetrievalHit]:
+        """retrieve in a worker thread, so encoding and search do not block the event loop."""
+        return await asyncio.to_thread(self.retrieve, query, k, datasets, boost, prefix)
+
+    @staticmethod
+    def format_hits(hits: list[RetrievalHit]) -> str:
+        return "\n\n".join(hit.text for hit in hits) if hits else NO_INFORMATION
+
+    @staticmethod
+    def _as_request(item) -> RetrievalRequest:
+        if isinstance(item, RetrievalRequest):
+            return item
+        if isinstance(item, dict):
+            return RetrievalRequest(**item)
+        return RetrievalRequest(*item)
+
+    def retrieve_batch(self, requests: list, batch_size: int = 64) -> list[list[RetrievalHit]]:
+        """
+        Retrieve top-k chunks for many (query, dataset_id, k[, tool_name]) items at once.
+        All queries are encoded in one vectorized call and each dataset is searched once;
+        results are aligned with the input order. A failing dataset yields empty lists.
+        """
+        requests = [self._as_request(item) for item in requests]
+        results = [[] for _ in requests]
+        if not requests:
+            return results
+
+        start = time.perf_counter()
+        texts = [self.tool_prefixes.get(r.tool_name, "") + r.query for r in requests]
+        embeddings = self._encode(texts, batch_size=batch_size)
+        encode_seconds = time.perf_counter() - start
+
+        by_dataset = defaultdict(list)
+        for position, request in enumerate(requests):
+            by_dataset[request.dataset_id].append(position)
+
+        for dataset_id, positions in by_dataset.items():
+            try:
+                entry = self.pipeline.get_index_entry(dataset_id)
+                k_max = max(requests[p].k for p in positions)
+                distances, labels = entry.index.search(embeddings[positions], k_max)
+            except Exception as e:
+                logger.error(f"Batched retrieval failed for dataset {dataset_id}: {e}")
+                continue
+
+            for row, position in enumerate(positions):
+                for label, distance in zip(labels[row][:requests[position].k], distances[row]):
+                    idx = entry.row(label)
+                    if idx is not None:
+                        meta = entry.metadata[idx]
+                        results[position].append(RetrievalHit(
+                            text=entry.documents[idx], source=meta.get("source", ""),
+                            chunk_id=meta.get("chunk_id", idx), distance=float(distance),
+                            dataset_id=dataset_id,
+                        ))
+
+        logger.info(f"Batched retrieval: {len(requests)} queries over {len(by_dataset)} datasets in "
+                    f"{time.perf_counter() - start:.2f}s (encode {encode_seconds:.2f}s)")
+        return results
+
+    async def retrieve_batch_async(self, requests: list, batch_size: int = 64) -> list[list[RetrievalHit]]:
+        """retrieve_batch in a worker thread, so encoding and search do not block the event loop."""
+        return await asyncio.to_thread(self.retrieve_batch, requests, batch_size)
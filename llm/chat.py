@@ -1,6 +1,5 @@
 import asyncio
-from llm.agents.local_chat_agent import LocalAIChatAgent
-from llm.agents.agent_router import AgentRouter
+from llm.agents.agent_pool import get_agent_pool
 from utils.log import logger
 
 
@@ -11,12 +10,18 @@ async def handle_user_query(
     language_mode="tr",
     stream_to_terminal: bool = False,
     llm_backend: str = "local",  # "local" or "gemini"
+    on_tool_progress=None,
 ):
-    """Handles a user query by selecting the correct AI agent and responding."""
+    """
+    Handles a user query by selecting the correct AI agent and responding. `on_tool_progress` receives
+    partial results of long-running tools (e.g. each speed test phase) before the answer starts.
+    """
+    if on_tool_progress is None and stream_to_terminal:
+        on_tool_progress = lambda progress: print(f"... {progress.message()}", flush=True)
 
     if llm_backend == "local" or llm_backend == "ollama":
-        agent = LocalAIChatAgent(session_id=session_id, language_mode=language_mode)
-        ai_response, persona = await agent.ask_agent(user_query, chat_history)
+        agent = get_agent_pool().acquire(session_id, llm_backend, language_mode)
+        ai_response, persona = await agent.ask_agent(user_query, chat_history, on_progress=on_tool_progress)
         if stream_to_terminal:
             print(f"{persona.upper()} is answering...")
             async for part in ai_response:
@@ -24,7 +29,8 @@ async def handle_user_query(
             print("\n")
             logger.info("AI response is sent.")
     elif llm_backend == "gemini":
-        ai_response = await AgentRouter(session_id=session_id, language_mode=language_mode).ask_agent(user_query, chat_history)
+        agent = get_agent_pool().acquire(session_id, llm_backend, language_mode)
+        ai_response = await agent.ask_agent(user_query, chat_history, on_progress=on_tool_progress)
         if isinstance(ai_response, dict) and "agent" in ai_response and "response" in ai_response:
             persona = ai_response["agent"]
             ai_response = ai_response["response"]
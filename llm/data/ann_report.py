@@ -0,0 +1,112 @@
+import time
+import argparse
+import numpy as np
+from llm.utils.lazy import faiss
+from llm.data.index_specs import IndexSpec, build_index, train_index, apply_search_params
+from llm.data.index_store import load_index
+from llm.utils.embedding_registry import get_embedding_model, DEFAULT_EMBEDDING_MODEL
+
+
+def dataset_vectors(dataset_id: str, embedding_model_name: str = DEFAULT_EMBEDDING_MODEL) -> np.ndarray:
+    """Embeddings of a dataset's chunks, re-encoded from the metadata texts so any stored index kind works."""
+    _, metadata = load_index(dataset_id)
+    model = get_embedding_model(embedding_model_name)
+    return np.asarray(model.encode([meta["text"] for meta in metadata], batch_size=64), dtype="float32")
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Clustered random vectors, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype("float32")
+    vectors = centers[rng.integers(0, clusters, n)] + 0.3 * rng.normal(size=(n, dim)).astype("float32")
+    return vectors.astype("float32")
+
+
+def sample_queries(vectors: np.ndarray, n: int, seed: int = 1) -> np.ndarray:
+    """Perturbed copies of stored vectors, so queries land near real data without being exact duplicates."""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), min(n, len(vectors)), replace=False)
+    noise = rng.normal(scale=vectors.std() * 0.1, size=(len(rows), vectors.shape[1])).astype("float32")
+    return vectors[rows] + noise
+
+
+def evaluate(spec: IndexSpec, vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    """Build `spec` over `vectors` and measure recall@k against exact results and per-query latency."""
+    start = time.perf_counter()
+    index = build_index(spec, vectors.shape[1], n_vectors=len(vectors))
+    train_index(index, vectors, spec)
+    index.add_with_ids(vectors, np.arange(len(vectors), dtype="int64"))
+    build_seconds = time.perf_counter() - start
+
+    apply_search_params(index, spec)
+    latencies = []
+    found = np.empty_like(truth)
+    for row, query in enumerate(queries):
+        t0 = time.perf_counter()
+        _, labels = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        found[row] = labels[0]
+
+    recall = np.mean([len(set(found[i]) & set(truth[i])) / k for i in range(len(queries))])
+    return {
+        "index": spec.factory_string(len(vectors)),
+        "nprobe": spec.nprobe if spec.needs_training else "-",
+        "ef_search": spec.ef_search if spec.kind == "hnsw" else "-",
+        "recall": float(recall),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "build_s": build_seconds,
+    }
+
+
+def sweep(base: IndexSpec, kinds: list[str], nprobes: list[int], ef_searches: list[int]) -> list[IndexSpec]:
+    specs = []
+    for kind in kinds:
+        values = {**base.to_dict(), "kind": kind}
+        if kind in ("ivf_flat", "ivf_pq"):
+            specs += [IndexSpec.from_dict({**values, "nprobe": nprobe}) for nprobe in nprobes]
+        elif kind == "hnsw":
+            specs += [IndexSpec.from_dict({**values, "ef_search": ef}) for ef in ef_searches]
+        else:
+            specs.append(IndexSpec.from_dict(values))
+    return specs
+
+
+def report(vectors: np.ndarray, specs: list[IndexSpec], n_queries: int = 200, k: int = 10) -> list[dict]:
+    k = min(k, len(vectors))
+    queries = sample_queries(vectors, n_queries)
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+    return [evaluate(spec, vectors, queries, truth, k) for spec in specs]
+
+
+def format_report(rows: list[dict]) -> str:
+    header = f"{'index':<22}{'nprobe':>8}{'efSearch':>10}{'recall':>9}{'p50 ms':>9}{'p95 ms':>9}{'build s':>9}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(f"{row['index']:<22}{row['nprobe']!s:>8}{row['ef_search']!s:>10}{row['recall']:>9.3f}"
+                     f"{row['p50_ms']:>9.3f}{row['p95_ms']:>9.3f}{row['build_s']:>9.2f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    """Compare approximate index specs with exact flat search on a dataset or synthetic vectors."""
+    parser = argparse.ArgumentParser(description="Recall-vs-latency report of FAISS index specs against IndexFlatL2.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dataset", help="dataset id whose chunks are re-embedded and indexed")
+    source.add_argument("--synthetic", type=int, help="number of synthetic vectors, e.g. 1000000")
+    parser.add_argument("--dim", type=int, default=384, help="dimension of synthetic vectors")
+    parser.add_argument("--kinds", nargs="+", default=["flat", "ivf_flat", "hnsw", "ivf_pq"])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--nlist", type=int, default=IndexSpec.nlist)
+    parser.add_argument("--m", type=int, default=IndexSpec.m)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    data = dataset_vectors(args.dataset) if args.dataset else synthetic_vectors(args.synthetic, args.dim)
+    specs = sweep(IndexSpec(nlist=args.nlist, m=args.m), args.kinds, args.nprobe, args.ef_search)
+    print(f"{len(data)} vectors, {data.shape[1]} dimensions, recall@{args.k} over {min(args.queries, len(data))} queries")
+    print(format_report(report(data, specs, args.queries, args.k)))
@@ -0,0 +1,190 @@
+import os
+import re
+import math
+import hashlib
+from typing import Callable, Iterable, Iterator
+
+
+# "sliding" (token budget with overlap) or "paragraph" (legacy blank-line split); indices built with
+# another chunker are rebuilt from scratch by the offline pipeline, queries keep serving them until then
+CHUNKER = os.environ.get("CHUNKER", "sliding")
+# all-MiniLM-L6-v2 truncates at 256 word pieces, stay below it with room for the tool prefix
+CHUNK_MAX_TOKENS = int(os.environ.get("CHUNK_MAX_TOKENS", "200"))
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", "32"))
+# sections shorter than this (stray titles, lone headings) are merged into the next one
+CHUNK_MIN_TOKENS = int(os.environ.get("CHUNK_MIN_TOKENS", "12"))
+
+_READ_BLOCK = 1 << 16
+
+# "# Network Troubleshooting" and numbered FAQ questions "12. How do I ...?"
+_TITLE = re.compile(r"^\s*#{1,6}\s+\S")
+_QUESTION = re.compile(r"^\s*\d{1,3}[.)]\s+.*\?\s*$")
+_UNIT = re.compile(r"\S+\s*")
+
+
+def chunk_id_for(source: str, text: str) -> int:
+    """Stable 63-bit id of a chunk: same source and text give the same FAISS id on every run."""
+    digest = hashlib.sha1(f"{source}\0{text}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") & 0x7FFF_FFFF_FFFF_FFFF
+
+
+def iter_split(path: str, separator: str = "\n\n", block_size: int = _READ_BLOCK):
+    """Yield the parts of `text.split(separator)` for a file, reading it block by block."""
+    pending = ""
+    with open(path, "r", encoding="utf-8") as f:
+        for block in iter(lambda: f.read(block_size), ""):
+            parts = (pending + block).split(separator)
+            pending = parts.pop()
+            yield from parts
+    yield pending
+
+
+def is_heading(line: str) -> bool:
+    return bool(_TITLE.match(line) or _QUESTION.match(line))
+
+
+def approximate_tokens(text: str) -> int:
+    """Word-piece count estimate when no tokenizer is available (~4 pieces per 3 words)."""
+    return math.ceil(len(text.split()) * 4 / 3)
+
+
+def embedding_token_counter(model_name: str) -> Callable[[str], int]:
+    """Exact word-piece counter using the tokenizer of a SentenceTransformer model."""
+    from llm.utils.embedding_registry import get_embedding_model
+    tokenizer = get_embedding_model(model_name).tokenizer
+    return lambda text: len(tokenizer.tokenize(text))
+
+
+class Chunker:
+    """Turns the paragraphs of a file into chunk texts; `chunk` adds source, position and stable id."""
+
+    name = "base"
+
+    def split(self, paragraphs: Iterable[str]) -> Iterator[str]:
+        raise NotImplementedError
+
+    def iter_chunks(self, paragraphs: Iterable[str] | str, source: str) -> Iterator[tuple[str, dict]]:
+        if isinstance(paragraphs, str):
+            paragraphs = paragraphs.split("\n\n")
+        for i, text in enumerate(self.split(paragraphs)):
+            yield text, {"source": source, "chunk_id": i, "id": chunk_id_for(source, text)}
+
+    def chunk(self, paragraphs: Iterable[str] | str, source: str) -> list[tuple[str, dict]]:
+        return list(self.iter_chunks(paragraphs, source))
+
+
+class ParagraphChunker(Chunker):
+    """One chunk per blank-line separated paragraph (the original behaviour)."""
+
+    name = "paragraph"
+
+    def split(self, paragraphs: Iterable[str]) -> Iterator[str]:
+        for paragraph in paragraphs:
+            if paragraph.strip():
+                yield paragraph.strip()
+
+
+class SlidingWindowChunker(Chunker):
+    """
+    Heading-aware chunks with a token budget.
+
+    Text is grouped into sections that start at a heading (a numbered FAQ question or a markdown
+    title); sections that are only headings or shorter than `min_tokens` are merged into the next
+    one. A section within `max_tokens` is one chunk, a longer one is cut into windows that overlap by
+    `overlap_tokens`, each repeating the section heading so it still says what it answers.
+    """
+
+    name = "sliding"
+
+    def __init__(self, max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                 min_tokens: int = CHUNK_MIN_TOKENS, count_tokens: Callable[[str], int] = None):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = min_tokens
+        self.count_tokens = count_tokens or approximate_tokens
+
+    def _sections(self, paragraphs: Iterable[str]) -> Iterator[str]:
+        pending = ""
+        for paragraph in paragraphs:
+            lines = [line.rstrip() for line in paragraph.strip().splitlines()]
+            if not lines:
+                continue
+            # a question line starts a new section even without a blank line before it
+            starts = [0] + [i for i, line in enumerate(lines) if i and _QUESTION.match(line)]
+            for begin, end in zip(starts, starts[1:] + [len(lines)]):
+                section = "\n".join(lines[begin:end])
+                if pending:
+                    section, pending = f"{pending}\n{section}", ""
+                body = [line for line in section.splitlines() if line.strip() and not is_heading(line)]
+                if not body or self.count_tokens(section) < self.min_tokens:
+                    pending = section
+                    continue
+                yield section
+        if pending:
+            yield pending
+
+    def _windows(self, section: str) -> Iterator[str]:
+        lines = section.splitlines()
+        heading = "\n".join(line for line in lines[:2] if is_heading(line)) if is_heading(lines[0]) else ""
+        body = section[len(heading):].strip() if heading else section
+        budget = self.max_tokens - (self.count_tokens(heading) if heading else 0)
+        units = _UNIT.findall(body)
+        costs = [self.count_tokens(unit) for unit in units]
+
+        start = 0
+        while start < len(units):
+            end, used = start, 0
+            while end < len(units) and (end == start or used + costs[end] <= budget):
+                used += costs[end]
+                end += 1
+            text = "".join(units[start:end]).strip()
+            yield f"{heading}\n{text}" if heading else text
+            if end >= len(units):
+                break
+            # step back over `overlap_tokens` worth of units, always moving forward
+            next_start, overlap = end, 0
+            while next_start - 1 > start and overlap + costs[next_start - 1] <= self.overlap_tokens:
+                next_start -= 1
+                overlap += costs[next_start]
+            start = next_start
+
+    def split(self, paragraphs: Iterable[str]) -> Iterator[str]:
+        for section in self._sections(paragraphs):
+            if self.count_tokens(section) <= self.max_tokens:
+                yield section
+            else:
+                yield from self._windows(section)
+
+
+CHUNKERS = {
+    ParagraphChunker.name: ParagraphChunker,
+    SlidingWindowChunker.name: SlidingWindowChunker,
+}
+
+
+def get_chunker(name: str = None, **kwargs) -> Chunker:
+    """Chunker by name ("paragraph", "sliding"), defaulting to the CHUNKER setting."""
+    name = name or CHUNKER
+    if name not in CHUNKERS:
+        raise ValueError(f"Unknown chunker '{name}', expected one of {', '.join(CHUNKERS)}")
+    return CHUNKERS[name](**kwargs)
+
+
+def chunk_file(path: str, source: str, chunker: Chunker = None) -> list[tuple[str, dict]]:
+    """(text, metadata) chunks of one file, read block by block."""
+    return (chunker or get_chunker()).chunk(iter_split(path), source)
+
+
+def iter_chunk_batches(path: str, source: str, chunker: Chunker = None,
+                       batch_size: int = 64) -> Iterator[list[tuple[str, dict]]]:
+    """chunk_file in lists of at most batch_size chunks, so a large file is never held in memory whole."""
+    batch = []
+    for row in (chunker or get_chunker()).iter_chunks(iter_split(path), source):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -1,24 +1,48 @@
 import os
-import faiss
-import pickle
+import time
+import argparse
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from llm.utils.embedding_registry import get_embedding_model, DEFAULT_EMBEDDING_MODEL, DEFAULT_BACKEND, EMBEDDING_BACKENDS
+from llm.data.index_store import INDEX_DIR, save_index, load_index, index_exists, index_files, index_path, \
+    pointer_path, list_indices, read_manifest, write_manifest
+from llm.data.chunking import CHUNKER, CHUNKERS, Chunker, chunk_id_for, chunk_file, get_chunker
+from llm.data.index_specs import IndexSpec, get_index_spec, has_chunk_ids, build_index, train_index, apply_search_params, \
+    remove_ids, trained_params
+from llm.data.index_cache import IndexCache, IndexEntry, file_fingerprint
 from utils.log import logger
-import glob
 
 # File paths
 DATA_DIR = "llm/data/files"
-INDEX_DIR = "llm/data"
+
+# one index over every file in DATA_DIR, each chunk tagged with its dataset_id
+UNIFIED_DATASET_ID = "all"
+
+# loaded indices are shared by every DataPipeline / RagAgent in the process
+_index_cache = IndexCache()
+
+
+def get_index_cache() -> IndexCache:
+    return _index_cache
+
 
 class DataPipeline:
-    def __init__(self, data_dir: str = DATA_DIR):
-        """Initialize the data pipeline with the data directory."""
+    def __init__(self, data_dir: str = DATA_DIR, embedding_model_name: str = DEFAULT_EMBEDDING_MODEL,
+                 chunker: Chunker = None, embedding_backend: str = DEFAULT_BACKEND, index_dir: str = INDEX_DIR):
+        """Initialize the data pipeline with the data directory and the directory its indices live in."""
         self.data_dir = data_dir
-        self.embedding_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+        self.index_dir = index_dir
+        self.embedding_model_name = embedding_model_name
+        self.embedding_backend = embedding_backend
+        self.chunker = chunker or get_chunker()
         self.documents = []
         self.metadata = []
         self.index = None
 
+    @property
+    def embedding_model(self):
+        """Shared process-wide embedding model, loaded on first use."""
+        return get_embedding_model(self.embedding_model_name, backend=self.embedding_backend)
+
     def load_text_file(self, filename: str):
         """Load and chunk a single text file."""
         self.documents = []
@@ -29,19 +53,11 @@ class DataPipeline:
             raise ValueError(f"File {file_path} does not exist.")
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Simple chunking: split by double newlines (paragraphs)
-            chunks = content.split('\n\n')
-            for i, chunk in enumerate(chunks):
-                if chunk.strip():  # Ignore empty chunks
-                    self.documents.append(chunk.strip())
-                    self.metadata.append({
-                        'source': filename,
-                        'chunk_id': i
-                    })
-            logger.info(f"Processed {filename} with {len(chunks)} chunks")
+            dataset_id = os.path.splitext(filename)[0]
+            for text, meta in chunk_file(file_path, filename, self.chunker):
+                self.documents.append(text)
+                self.metadata.append({**meta, 'dataset_id': dataset_id})
+            logger.info(f"Processed {filename} with {len(self.documents)} chunks ({self.chunker.name} chunker)")
         except Exception as e:
             logger.error(f"Error processing {filename}: {str(e)}")
             raise
@@ -49,6 +65,21 @@ class DataPipeline:
         if not self.documents:
             raise ValueError(f"No valid content found in {filename}")
 
+    def load_text_files(self, filenames: list[str]):
+        """Load and chunk several files into one document list (for the unified index)."""
+        documents, metadata = [], []
+        for filename in filenames:
+            self.load_text_file(filename)
+            documents += self.documents
+            metadata += self.metadata
+        self.documents, self.metadata = documents, metadata
+
+    def source_files(self, dataset_id: str, filename: str = None) -> list[str]:
+        """Source .txt files behind a dataset: every file for the unified index, else its own file."""
+        if dataset_id == UNIFIED_DATASET_ID:
+            return sorted(f for f in os.listdir(self.data_dir) if f.endswith(".txt"))
+        return [filename or f"{dataset_id}.txt"]
+
     def generate_embeddings(self):
         """Generate embeddings for all documents."""
         if not self.documents:
@@ -61,78 +92,219 @@ class DataPipeline:
 
     def build_faiss_index(self, dataset_id: str, force_rebuild: bool = False):
         """Build or load FAISS index for a specific dataset."""
-        faiss_index_path = os.path.join(INDEX_DIR, f"faiss_index_{dataset_id}.pkl")
-        metadata_path = os.path.join(INDEX_DIR, f"metadata_{dataset_id}.pkl")
-        
-        if not force_rebuild and os.path.exists(faiss_index_path) and os.path.exists(metadata_path):
-            # Load existing FAISS index and metadata
-            with open(faiss_index_path, 'rb') as f:
-                self.index = pickle.load(f)
-            with open(metadata_path, 'rb') as f:
-                self.metadata = pickle.load(f)
+        if not force_rebuild and index_exists(dataset_id, self.index_dir):
+            # Load existing FAISS index (memory-mapped) and metadata
+            self.index, self.metadata = load_index(dataset_id, self.index_dir)
             self.documents = [meta['text'] for meta in self.metadata]
-            logger.info(f"Loaded existing FAISS index and metadata from {faiss_index_path}")
         else:
-            # Generate embeddings
+            self.update_index(dataset_id, full_rebuild=True)
+
+    def load_updatable_index(self, dataset_id: str, manifest: dict | None, spec: IndexSpec = None,
+                             n_vectors: int = None):
+        """
+        Existing ID-mapped index to update in place, or None when it has to be rebuilt from scratch.
+        `n_vectors` is the expected size after the update (the manifest's size when unknown), used to
+        rebuild IVF / PQ indices whose clusters were capped for a much smaller corpus.
+        """
+        if manifest is None or not index_exists(dataset_id, self.index_dir):
+            return None
+        if manifest.get("embedding_model") != self.embedding_model_name:
+            logger.info(f"{dataset_id} was embedded with {manifest.get('embedding_model')}, re-embedding everything")
+            return None
+        # manifests written before chunkers were pluggable come from the paragraph split
+        if manifest.get("chunker", "paragraph") != self.chunker.name:
+            logger.info(f"{dataset_id} was chunked with {manifest.get('chunker', 'paragraph')}, "
+                        f"rebuilding with {self.chunker.name}")
+            return None
+        spec = spec or get_index_spec(dataset_id)
+        if IndexSpec.from_dict(manifest.get("index_spec", {})).build_params() != spec.build_params():
+            logger.info(f"Index spec of {dataset_id} changed to {spec.kind}, rebuilding")
+            return None
+        # read into memory, a memory-mapped index is read-only
+        index, _ = load_index(dataset_id, self.index_dir, mmap=False)
+        if not has_chunk_ids(index):
+            logger.info(f"{dataset_id} has no chunk ids yet (pre-manifest index), rebuilding once")
+            return None
+        n_vectors = max(n_vectors or 0, len(manifest.get("ids", ())))
+        if spec.outgrown(trained_params(index), n_vectors):
+            logger.info(f"{dataset_id} was trained with {trained_params(index)} for a smaller corpus, "
+                        f"rebuilding for {n_vectors} vectors")
+            return None
+        return index
+
+    def update_index(self, dataset_id: str, full_rebuild: bool = False) -> dict:
+        """
+        Bring the dataset's index in line with the loaded documents, embedding only what changed.
+
+        Chunks are identified by a hash of (source, text). Chunks already in the manifest keep their
+        vectors, new chunks are embedded and added, and chunks no longer in the file are removed by id.
+        Returns counts of added / removed / unchanged chunks.
+        """
+        if not self.documents:
+            raise ValueError("No documents loaded. Run load_text_file() first.")
+        start = time.perf_counter()
+
+        # identical paragraphs in one file share an id, keep the first
+        ids, documents, metadata, seen = [], [], [], set()
+        for doc, meta in zip(self.documents, self.metadata):
+            chunk_id = chunk_id_for(meta['source'], doc)
+            if chunk_id in seen:
+                continue
+            seen.add(chunk_id)
+            ids.append(chunk_id)
+            documents.append(doc)
+            metadata.append({**meta, 'id': chunk_id, 'text': doc})
+
+        manifest = read_manifest(dataset_id, self.index_dir)
+        spec = get_index_spec(dataset_id)
+        index = None if full_rebuild else self.load_updatable_index(dataset_id, manifest, spec, len(ids))
+        known = set(manifest["ids"]) if index is not None else set()
+
+        added = [i for i, chunk_id in enumerate(ids) if chunk_id not in known]
+        removed = sorted(known - seen)
+
+        if index is None:
+            dim = self.embedding_model.get_sentence_embedding_dimension()
+            index = build_index(spec, dim, n_vectors=len(ids))
+        if removed:
+            index = remove_ids(index, np.array(removed, dtype='int64'), spec)
+        if added:
+            self.documents = [documents[i] for i in added]
             embedding_matrix = self.generate_embeddings()
+            train_index(index, embedding_matrix, spec)
+            index.add_with_ids(embedding_matrix, np.array([ids[i] for i in added], dtype='int64'))
+
+        self.index, self.documents, self.metadata = index, documents, metadata
+        if added or removed or not index_exists(dataset_id, self.index_dir):
+            save_index(index, metadata, dataset_id, self.index_dir)
+            sources = sorted({meta['source'] for meta in metadata})
+            write_manifest(self.manifest_for(dataset_id, ids, index, spec, sources), dataset_id, self.index_dir)
+        else:
+            # nothing to re-embed (e.g. whitespace-only edit): mark the index as current for the source file
+            for path in index_files(dataset_id, self.index_dir):
+                os.utime(path)
+
+        counts = {"added": len(added), "removed": len(removed), "unchanged": len(ids) - len(added)}
+        logger.info(f"Index update for {dataset_id}: {counts['added']} added, {counts['removed']} removed, "
+                    f"{counts['unchanged']} unchanged in {time.perf_counter() - start:.2f}s")
+        return counts
 
-            # Build FAISS index
-            self.index = faiss.IndexFlatL2(embedding_matrix.shape[1])
-            self.index.add(embedding_matrix)
-            logger.info(f"FAISS index built with {len(self.documents)} vectors")
+    def manifest_for(self, dataset_id: str, ids: list[int], index, spec: IndexSpec, sources: list[str]) -> dict:
+        return {
+            "dataset_id": dataset_id,
+            "sources": sources,
+            "embedding_model": self.embedding_model_name,
+            # informational: backends of one model stay within the parity tolerance, indices remain compatible
+            "embedding_backend": self.embedding_backend,
+            "chunker": self.chunker.name,
+            "index_spec": spec.to_dict(),
+            # nlist / nbits after capping to the corpus size at the first build
+            "trained": trained_params(index),
+            "dim": index.d,
+            "ids": ids,
+            "updated_at": time.time(),
+        }
 
-            # Update metadata with text content
-            for i, doc in enumerate(self.documents):
-                self.metadata[i]['text'] = doc
+    def _dataset_fingerprint(self, dataset_id: str, filename: str = None) -> tuple:
+        paths = index_files(dataset_id, self.index_dir) or \
+            [pointer_path(dataset_id, self.index_dir), index_path(dataset_id, self.index_dir)]
+        return file_fingerprint(paths)
+
+    def index_ready(self, dataset_id: str) -> bool:
+        """True when the dataset has a built index that queries can be served from."""
+        return index_exists(dataset_id, self.index_dir)
+
+    def _warn_if_stale(self, dataset_id: str, files: list[str], sources: list[str]):
+        built = min(os.path.getmtime(p) for p in files)
+        stale = any(os.path.getmtime(os.path.join(self.data_dir, f)) > built for f in sources
+                    if os.path.exists(os.path.join(self.data_dir, f)))
+        # a file added to or deleted from the unified index
+        manifest = read_manifest(dataset_id, self.index_dir)
+        stale = stale or bool(manifest and manifest.get("sources") and manifest["sources"] != sources)
+        if stale:
+            logger.warning(f"Sources of {dataset_id} changed since the index was built, serving the old index "
+                           f"until it is rebuilt with python -m llm.data.data_pipeline")
+
+    def _load_dataset(self, dataset_id: str, filename: str = None, force_rebuild: bool = False):
+        """
+        Load the dataset's index for serving. Indices are built offline (python -m llm.data.data_pipeline):
+        a missing index raises FileNotFoundError and a stale one is served with a warning, so answering
+        a query never embeds documents or writes index files. force_rebuild is the explicit exception.
+        """
+        # a fresh pipeline so concurrent loads never share documents/metadata lists
+        pipeline = DataPipeline(self.data_dir, self.embedding_model_name, self.chunker, self.embedding_backend,
+                                self.index_dir)
+        sources = self.source_files(dataset_id, filename)
+        if force_rebuild:
+            pipeline.load_text_files(sources)
+            pipeline.update_index(dataset_id, full_rebuild=True)
+        else:
+            files = index_files(dataset_id, self.index_dir)
+            if not files:
+                raise FileNotFoundError(f"No index for {dataset_id} in {self.index_dir}, "
+                                        f"build it with python -m llm.data.data_pipeline")
+            self._warn_if_stale(dataset_id, files, sources)
+            pipeline.build_faiss_index(dataset_id)
+        # query-time parameters come from the current spec, changing nprobe / efSearch needs no rebuild
+        apply_search_params(pipeline.index, get_index_spec(dataset_id))
+        return pipeline.index, pipeline.documents, pipeline.metadata
 
-            # Save FAISS index and metadata
-            os.makedirs(os.path.dirname(faiss_index_path), exist_ok=True)
-            with open(faiss_index_path, 'wb') as f:
-                pickle.dump(self.index, f)
-            with open(metadata_path, 'wb') as f:
-                pickle.dump(self.metadata, f)
-            
-            logger.info(f"Saved FAISS index to {faiss_index_path} and metadata to {metadata_path}")
+    def get_index_entry(self, dataset_id: str, filename: str = None, force_rebuild: bool = False) -> IndexEntry:
+        """Return the process-wide cached index entry (index, documents, metadata, version) for a dataset."""
+        return _index_cache.get(
+            dataset_id,
+            loader=lambda: self._load_dataset(dataset_id, filename, force_rebuild),
+            fingerprint=lambda: self._dataset_fingerprint(dataset_id, filename),
+            force_reload=force_rebuild,
+        )
 
     def get_index_and_metadata(self, dataset_id: str, filename: str, force_rebuild: bool = False):
         """Return the FAISS index, documents, and metadata for a specific dataset."""
-        if self.index is None or not self.documents or force_rebuild:
-            self.load_text_file(filename)
-            self.build_faiss_index(dataset_id, force_rebuild)
+        entry = self.get_index_entry(dataset_id, filename, force_rebuild)
+        self.index, self.documents, self.metadata = entry.index, entry.documents, entry.metadata
         return self.index, self.documents, self.metadata
 
     @staticmethod
     def list_existing_indices(index_dir: str = INDEX_DIR):
-        """List all existing FAISS index files in the index directory."""
-        index_files = glob.glob(os.path.join(index_dir, "faiss_index_*.pkl"))
-        indices = [os.path.basename(f).replace("faiss_index_", "").replace(".pkl", "") for f in index_files]
-        return indices
+        """List all existing FAISS indices (native or legacy pickled) in the index directory."""
+        return list_indices(index_dir)
+
+def update_all_indices(pipeline: DataPipeline, full_rebuild: bool = False):
+    """Build or update the index of every .txt file in the pipeline's data dir, then the unified index."""
+    txt_files = sorted(f for f in os.listdir(pipeline.data_dir) if f.endswith(".txt"))
+    if not txt_files:
+        raise ValueError(f"No .txt files found in {pipeline.data_dir}")
+
+    for txt_file in txt_files:
+        dataset_id = os.path.splitext(txt_file)[0]  # e.g., "common_home_network_problems"
+        logger.info(f"Processing {txt_file} with dataset_id: {dataset_id}")
+        pipeline.load_text_file(txt_file)
+        counts = pipeline.update_index(dataset_id, full_rebuild=full_rebuild)
+        print(f"Updated FAISS index for {dataset_id}: {counts['added']} added, "
+              f"{counts['removed']} removed, {counts['unchanged']} unchanged")
+
+    # the unified index Fixie searches in one go
+    pipeline.load_text_files(pipeline.source_files(UNIFIED_DATASET_ID))
+    counts = pipeline.update_index(UNIFIED_DATASET_ID, full_rebuild=full_rebuild)
+    print(f"Updated unified FAISS index ({UNIFIED_DATASET_ID}): {counts['added']} added, "
+          f"{counts['removed']} removed, {counts['unchanged']} unchanged")
+
 
 if __name__ == "__main__":
-    """Process all .txt files in llm/data/files and build FAISS indices."""
+    """Process all .txt files in llm/data/files and build or incrementally update their FAISS indices."""
+    parser = argparse.ArgumentParser(description="Build or update FAISS indices for llm/data/files.")
+    parser.add_argument("--force-rebuild", action="store_true", help="re-embed every chunk instead of only changed ones")
+    parser.add_argument("--chunker", choices=sorted(CHUNKERS), default=CHUNKER)
+    parser.add_argument("--backend", choices=EMBEDDING_BACKENDS, default=DEFAULT_BACKEND,
+                        help="embedding backend; with --force-rebuild every chunk is re-embedded with it")
+    args = parser.parse_args()
+
     try:
-        pipeline = DataPipeline()
-        existing_indices = pipeline.list_existing_indices()
-        
-        # Process each .txt file
-        txt_files = [f for f in os.listdir(DATA_DIR) if f.endswith(".txt")]
-        if not txt_files:
-            raise ValueError(f"No .txt files found in {DATA_DIR}")
-
-        for txt_file in txt_files:
-            dataset_id = os.path.splitext(txt_file)[0]  # e.g., "common_home_network_problems"
-            if dataset_id in existing_indices:
-                logger.info(f"Index for {dataset_id} already exists, skipping unless forced")
-                print(f"Index for {dataset_id} exists. Run with force_rebuild=True to overwrite.")
-                continue
-            
-            logger.info(f"Processing {txt_file} with dataset_id: {dataset_id}")
-            pipeline.load_text_file(txt_file)
-            pipeline.build_faiss_index(dataset_id, force_rebuild=False)
-            print(f"Created FAISS index for {dataset_id}")
+        pipeline = DataPipeline(chunker=get_chunker(args.chunker), embedding_backend=args.backend)
+        update_all_indices(pipeline, full_rebuild=args.force_rebuild)
 
         logger.info("Data pipeline completed successfully")
         print("Data pipeline completed. Indices saved in llm/data/")
     except Exception as e:
         logger.error(f"Data pipeline failed: {str(e)}")
-        print(f"Error: {str(e)}")
\ No newline at end of file
+        print(f"Error: {str(e)}")
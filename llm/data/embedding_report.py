@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from llm.data.chunking import chunk_file
+from llm.data.data_pipeline import DATA_DIR
+from llm.utils.embedding_registry import get_embedding_model, DEFAULT_EMBEDDING_MODEL, EMBEDDING_BACKENDS
+
+# largest accepted cosine drift (1 - cosine similarity) of a backend's vectors against the torch ones
+EMBEDDING_PARITY_TOLERANCE = float(os.environ.get("EMBEDDING_PARITY_TOLERANCE", "0.01"))
+
+SAMPLE_QUERIES = [
+    "My WiFi keeps disconnecting",
+    "How do I reset my router?",
+    "Internet is slow in the evening",
+    "What is the difference between a hub and a switch?",
+    "My laptop cannot get an IP address",
+    "DNS lookups time out",
+]
+
+
+def corpus_texts(data_dir: str = DATA_DIR, limit: int = 512) -> list[str]:
+    """Chunk texts of the data files, the vectors that sit in the indices."""
+    texts = []
+    for filename in sorted(f for f in os.listdir(data_dir) if f.endswith(".txt")):
+        texts += [text for text, _ in chunk_file(os.path.join(data_dir, filename), filename)]
+    return texts[:limit]
+
+
+def encode(model, texts: list[str], batch_size: int = 64) -> np.ndarray:
+    return np.asarray(model.encode(texts, batch_size=batch_size, normalize_embeddings=True), dtype="float32")
+
+
+def cosine_drift(reference: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    """1 - cosine similarity per row of two embedding matrices."""
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    return 1.0 - np.sum(reference * candidate, axis=1)
+
+
+def parity(reference: np.ndarray, candidate: np.ndarray, tolerance: float = EMBEDDING_PARITY_TOLERANCE) -> dict:
+    drift = cosine_drift(reference, candidate)
+    return {
+        "mean_drift": float(drift.mean()),
+        "max_drift": float(drift.max()),
+        "passed": bool(drift.max() <= tolerance),
+    }
+
+
+def benchmark(model, queries: list[str], texts: list[str], repeats: int = 20, batch_size: int = 64) -> dict:
+    """Per-query latency of single-text encodes (what a RAG turn does) and batch throughput."""
+    encode(model, queries[:1])  # warm-up: first call allocates buffers / sessions
+    latencies = []
+    for _ in range(repeats):
+        for query in queries:
+            t0 = time.perf_counter()
+            model.encode([query])
+            latencies.append((time.perf_counter() - t0) * 1000)
+    start = time.perf_counter()
+    encode(model, texts, batch_size)
+    elapsed = time.perf_counter() - start
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "texts_per_s": len(texts) / elapsed if elapsed else 0.0,
+    }
+
+
+def report(backends: list[str], model_name: str = DEFAULT_EMBEDDING_MODEL, texts: list[str] = None,
+           queries: list[str] = None, tolerance: float = EMBEDDING_PARITY_TOLERANCE, repeats: int = 20) -> list[dict]:
+    """Parity against the torch backend and CPU latency / throughput for each backend."""
+    texts = texts or corpus_texts()
+    queries = queries or SAMPLE_QUERIES
+    reference_model = get_embedding_model(model_name, "cpu", "torch")
+    reference = encode(reference_model, texts + queries)
+    rows = []
+    for backend in backends:
+        model = get_embedding_model(model_name, "cpu", backend)
+        row = {"backend": backend, **parity(reference, encode(model, texts + queries), tolerance)}
+        row.update(benchmark(model, queries, texts, repeats))
+        rows.append(row)
+    return rows
+
+
+def format_report(rows: list[dict]) -> str:
+    header = f"{'backend':<10}{'mean drift':>12}{'max drift':>12}{'parity':>8}{'p50 ms':>9}{'p95 ms':>9}{'texts/s':>10}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(f"{row['backend']:<10}{row['mean_drift']:>12.2e}{row['max_drift']:>12.2e}"
+                     f"{'ok' if row['passed'] else 'FAIL':>8}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}"
+                     f"{row['texts_per_s']:>10.1f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    """Compare embedding backends on CPU: cosine drift against torch, query latency and throughput."""
+    parser = argparse.ArgumentParser(description="Parity check and CPU microbenchmark of embedding backends.")
+    parser.add_argument("--backends", nargs="+", choices=EMBEDDING_BACKENDS, default=list(EMBEDDING_BACKENDS))
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--tolerance", type=float, default=EMBEDDING_PARITY_TOLERANCE)
+    parser.add_argument("--texts", type=int, default=512, help="number of corpus chunks encoded")
+    parser.add_argument("--repeats", type=int, default=20, help="passes over the sample queries for latency")
+    args = parser.parse_args()
+
+    rows = report(args.backends, args.model, corpus_texts(limit=args.texts), tolerance=args.tolerance,
+                  repeats=args.repeats)
+    print(f"{args.model} on CPU, parity tolerance {args.tolerance:g}")
+    print(format_report(rows))
+    # a non-zero exit lets CI refuse a backend whose vectors drifted away from the indexed ones
+    sys.exit(0 if all(row["passed"] for row in rows) else 1)
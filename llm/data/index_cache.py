@@ -0,0 +1,163 @@
+import os
+import time
+import hashlib
+import threading
+import itertools
+from dataclasses import dataclass, field
+from utils.log import logger
+
+
+# seconds between file checks of a cached dataset, 0 checks on every lookup
+INDEX_CACHE_CHECK_INTERVAL = float(os.environ.get("INDEX_CACHE_CHECK_INTERVAL", "2"))
+# "mtime" (cheap stat) or "hash" (content hash, survives touch/copy with same mtime)
+INDEX_CACHE_FINGERPRINT = os.environ.get("INDEX_CACHE_FINGERPRINT", "mtime")
+
+
+def file_fingerprint(paths: list[str], mode: str = INDEX_CACHE_FINGERPRINT) -> tuple:
+    """Fingerprint of a set of files; missing files are part of the fingerprint too."""
+    parts = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            parts.append((path, None))
+            continue
+        if mode == "hash":
+            digest = hashlib.sha1()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            parts.append((path, digest.hexdigest()))
+        else:
+            parts.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(parts)
+
+
+@dataclass
+class IndexEntry:
+    dataset_id: str
+    index: object
+    documents: list
+    metadata: list
+    fingerprint: tuple
+    version: int
+    loaded_at: float = field(default_factory=time.time)
+    id_to_row: dict = None
+    # faiss label arrays per set of datasets, for searches restricted to those datasets
+    dataset_labels: dict = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        # ID-mapped indices return chunk ids instead of row positions
+        if self.id_to_row is None and self.metadata and "id" in self.metadata[0]:
+            self.id_to_row = {meta["id"]: row for row, meta in enumerate(self.metadata)}
+
+    def row(self, label: int) -> int | None:
+        """Row in documents/metadata for a label returned by index.search, None if unknown."""
+        label = int(label)
+        if self.id_to_row is not None:
+            return self.id_to_row.get(label)
+        return label if 0 <= label < len(self.metadata) else None
+
+
+class IndexCache:
+    """
+    Per-process cache of loaded FAISS indices keyed by dataset_id.
+
+    Every lookup (at most once per `check_interval`) compares the dataset's file fingerprint with
+    the cached one. On change the dataset is reloaded or rebuilt by one thread while other readers
+    keep getting the previous entry, and the new entry is swapped in with a single assignment.
+    Each load gets a new `version`, so dependent caches can tell when an index was replaced.
+    """
+
+    def __init__(self, check_interval: float = INDEX_CACHE_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._entries = {}
+        self._last_check = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._versions = itertools.count(1)
+        self.loads = 0
+        self.reloads = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.last_reload_seconds = 0.0
+        self.total_load_seconds = 0.0
+
+    def _dataset_lock(self, dataset_id: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(dataset_id, threading.Lock())
+
+    def get(self, dataset_id: str, loader, fingerprint, force_reload: bool = False) -> IndexEntry:
+        """
+        Return the cached entry for dataset_id.
+        `loader()` returns (index, documents, metadata); `fingerprint()` describes the files behind them.
+        """
+        entry = self._entries.get(dataset_id)
+        now = time.monotonic()
+        if entry is not None and not force_reload:
+            if now - self._last_check.get(dataset_id, 0.0) < self.check_interval:
+                self.hits += 1
+                return entry
+            self._last_check[dataset_id] = now
+            if fingerprint() == entry.fingerprint:
+                self.hits += 1
+                return entry
+
+        lock = self._dataset_lock(dataset_id)
+        if entry is not None and not force_reload:
+            # someone else is already reloading: keep serving the current entry
+            if not lock.acquire(blocking=False):
+                self.stale_hits += 1
+                return entry
+        else:
+            lock.acquire()
+
+        try:
+            current = self._entries.get(dataset_id)
+            if current is not None and current is not entry and not force_reload:
+                # swapped in by another thread while we waited for the lock
+                self.hits += 1
+                return current
+
+            start = time.perf_counter()
+            index, documents, metadata = loader()
+            new_entry = IndexEntry(dataset_id=dataset_id, index=index, documents=documents, metadata=metadata,
+                                   fingerprint=fingerprint(), version=next(self._versions))
+            self._entries[dataset_id] = new_entry
+            self._last_check[dataset_id] = time.monotonic()
+            elapsed = time.perf_counter() - start
+
+            self.total_load_seconds += elapsed
+            if entry is None:
+                self.loads += 1
+                logger.info(f"Index cache loaded {dataset_id} (v{new_entry.version}) in {elapsed:.2f}s")
+            else:
+                self.reloads += 1
+                self.last_reload_seconds = elapsed
+                logger.info(f"Index cache reloaded {dataset_id} (v{new_entry.version}) in {elapsed:.2f}s")
+            return new_entry
+        finally:
+            lock.release()
+
+    def peek(self, dataset_id: str) -> IndexEntry | None:
+        return self._entries.get(dataset_id)
+
+    def invalidate(self, dataset_id: str = None):
+        with self._lock:
+            if dataset_id is None:
+                self._entries.clear()
+                self._last_check.clear()
+            else:
+                self._entries.pop(dataset_id, None)
+                self._last_check.pop(dataset_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "datasets": {k: e.version for k, e in self._entries.items()},
+            "loads": self.loads,
+            "reloads": self.reloads,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "last_reload_seconds": self.last_reload_seconds,
+            "total_load_seconds": self.total_load_seconds,
+        }
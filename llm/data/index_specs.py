@@ -0,0 +1,198 @@
+import os
+import json
+import math
+from dataclasses import dataclass, asdict, fields
+from llm.utils.lazy import faiss
+import numpy as np
+from utils.log import logger
+
+
+# JSON file with {"default": {...}, "<dataset_id>": {"kind": "hnsw", "ef_search": 128, ...}}
+INDEX_SPECS_PATH = os.environ.get("INDEX_SPECS_PATH", "llm/data/index_specs.json")
+
+INDEX_KINDS = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+# parameters that change how vectors are stored; changing them needs a rebuild, the rest apply at load
+_BUILD_PARAMS = ("kind", "nlist", "m", "nbits", "hnsw_m", "ef_construction")
+
+
+@dataclass
+class IndexSpec:
+    """How a dataset's vectors are indexed: exact flat search or an approximate index."""
+    kind: str = "flat"
+    # IVF: number of coarse clusters and clusters visited per query
+    nlist: int = 1024
+    nprobe: int = 16
+    # PQ: sub-quantizers per vector and bits per code
+    m: int = 16
+    nbits: int = 8
+    # HNSW: graph degree and candidate list sizes
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    # vectors used to train IVF / PQ quantizers
+    train_sample: int = 100_000
+
+    def __post_init__(self):
+        if self.kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown index kind '{self.kind}', expected one of {', '.join(INDEX_KINDS)}")
+
+    @property
+    def needs_training(self) -> bool:
+        return self.kind in ("ivf_flat", "ivf_pq")
+
+    @property
+    def supports_remove(self) -> bool:
+        # HNSW graphs cannot drop nodes
+        return self.kind != "hnsw"
+
+    def build_params(self) -> dict:
+        return {name: getattr(self, name) for name in _BUILD_PARAMS}
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, values: dict) -> "IndexSpec":
+        known = {f.name for f in fields(cls)}
+        unknown = set(values) - known
+        if unknown:
+            logger.warning(f"Ignoring unknown index spec keys: {', '.join(sorted(unknown))}")
+        return cls(**{k: v for k, v in values.items() if k in known})
+
+    def capped_params(self, n_vectors: int | None = None) -> dict:
+        """nlist / nbits an index built now would use: k-means wants ~39 points per centroid."""
+        if n_vectors is None:
+            return {"nlist": self.nlist, "nbits": self.nbits}
+        return {"nlist": max(1, min(self.nlist, n_vectors // 39)),
+                "nbits": max(1, min(self.nbits, int(math.log2(max(2, n_vectors)))))}
+
+    def factory_string(self, n_vectors: int | None = None) -> str:
+        """faiss.index_factory description, with cluster/code sizes capped to what n_vectors can train."""
+        if self.kind == "flat":
+            return "Flat"
+        if self.kind == "hnsw":
+            return f"HNSW{self.hnsw_m},Flat"
+        capped = self.capped_params(n_vectors)
+        if self.kind == "ivf_flat":
+            return f"IVF{capped['nlist']},Flat"
+        return f"IVF{capped['nlist']},PQ{self.m}x{capped['nbits']}"
+
+    def outgrown(self, trained: dict, n_vectors: int) -> bool:
+        """
+        True when an index built with `trained` (see trained_params) was capped for a much smaller
+        corpus: n_vectors could now train more than twice its clusters, or more PQ bits. A trained
+        quantizer is never retrained in place, so such an index has to be rebuilt.
+        """
+        if not self.needs_training or not trained:
+            return False
+        capped = self.capped_params(n_vectors)
+        if capped["nlist"] > 2 * trained["nlist"]:
+            return True
+        return "nbits" in trained and capped["nbits"] > trained["nbits"]
+
+
+def load_index_specs(path: str = INDEX_SPECS_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_index_spec(dataset_id: str, path: str = INDEX_SPECS_PATH) -> IndexSpec:
+    """Spec for a dataset: its own entry over the "default" entry over exact flat search."""
+    specs = load_index_specs(path)
+    values = {**specs.get("default", {}), **specs.get(dataset_id, {})}
+    return IndexSpec.from_dict(values)
+
+
+def _base_index(index):
+    return faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+
+
+def has_chunk_ids(index) -> bool:
+    """True for indices that return chunk ids (ID-mapped or IVF), False for legacy position-labelled ones."""
+    return isinstance(index, faiss.IndexIDMap) or faiss.try_extract_index_ivf(index) is not None
+
+
+def trained_params(index) -> dict:
+    """nlist (and PQ nbits) an IVF index was actually built with, {} for flat and HNSW indices."""
+    ivf = faiss.try_extract_index_ivf(_base_index(index))
+    if ivf is None:
+        return {}
+    ivf = faiss.downcast_index(ivf)
+    params = {"nlist": ivf.nlist}
+    if isinstance(ivf, faiss.IndexIVFPQ):
+        params["nbits"] = ivf.pq.nbits
+    return params
+
+
+def build_index(spec: IndexSpec, dim: int, n_vectors: int | None = None):
+    """
+    Empty index that accepts add_with_ids for a spec; IVF / PQ indices still need train_index
+    before vectors are added. IVF lists store ids themselves, flat and HNSW get an IndexIDMap2.
+    """
+    description = spec.factory_string(n_vectors)
+    index = faiss.index_factory(dim, description, faiss.METRIC_L2)
+    if spec.kind == "hnsw":
+        index.hnsw.efConstruction = spec.ef_construction
+    if not spec.needs_training:
+        index = faiss.IndexIDMap2(index)
+    logger.info(f"Building {description} index ({spec.kind}) for {dim}-d vectors")
+    apply_search_params(index, spec)
+    return index
+
+
+def train_index(index, vectors: np.ndarray, spec: IndexSpec):
+    """Train IVF / PQ quantizers on at most spec.train_sample vectors."""
+    if index.is_trained:
+        return
+    sample = vectors
+    if len(vectors) > spec.train_sample:
+        rows = np.random.default_rng(0).choice(len(vectors), spec.train_sample, replace=False)
+        sample = vectors[np.sort(rows)]
+    logger.info(f"Training {spec.kind} index on {len(sample)} vectors")
+    index.train(np.ascontiguousarray(sample, dtype="float32"))
+
+
+def apply_search_params(index, spec: IndexSpec):
+    """Set query-time parameters (nprobe, efSearch); a no-op for flat indices."""
+    base = _base_index(index)
+    if spec.kind in ("ivf_flat", "ivf_pq"):
+        faiss.extract_index_ivf(base).nprobe = spec.nprobe
+    elif spec.kind == "hnsw":
+        base.hnsw.efSearch = spec.ef_search
+
+
+def search_parameters(index, selector, exhaustive: bool = False):
+    """
+    faiss SearchParameters restricting a search to `selector` with the index's own nprobe / efSearch,
+    which the parameters would otherwise reset. `exhaustive` visits every IVF list (and a wide HNSW
+    candidate list) for filters so selective that the usual probes find fewer than k matches.
+    """
+    base = _base_index(index)
+    ivf = faiss.try_extract_index_ivf(base)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nlist if exhaustive else ivf.nprobe)
+    if isinstance(base, faiss.IndexHNSW):
+        ef = base.hnsw.efSearch
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=max(ef, min(index.ntotal, 4096)) if exhaustive else ef)
+    return faiss.SearchParameters(sel=selector)
+
+
+def remove_ids(index, ids: np.ndarray, spec: IndexSpec):
+    """
+    Remove vectors by id. HNSW cannot delete, so its surviving vectors are reconstructed
+    (exactly, the graph stores them flat) and added to a freshly built index.
+    """
+    if spec.supports_remove:
+        index.remove_ids(ids)
+        return index
+    removed = set(int(i) for i in ids)
+    keep = np.array([int(i) for i in faiss.vector_to_array(index.id_map) if int(i) not in removed], dtype="int64")
+    logger.info(f"{spec.kind} index cannot remove ids, rebuilding with {len(keep)} vectors")
+    rebuilt = build_index(spec, index.d, len(keep))
+    if len(keep):
+        vectors = np.vstack([index.reconstruct(int(i)) for i in keep]).astype("float32")
+        rebuilt.add_with_ids(vectors, keep)
+    return rebuilt
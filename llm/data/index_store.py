@@ -0,0 +1,239 @@
+import os
+import json
+import glob
+import time
+import shutil
+import pickle
+from llm.utils.lazy import faiss
+from utils.log import logger
+
+
+INDEX_DIR = "llm/data"
+
+INDEX_EXT = ".faiss"
+METADATA_EXT = ".jsonl"
+LEGACY_EXT = ".pkl"
+# published versions kept per dataset; the previous one stays for readers that opened it just before a swap
+INDEX_KEEP_VERSIONS = int(os.environ.get("INDEX_KEEP_VERSIONS", "2"))
+
+
+def pointer_path(dataset_id: str, index_dir: str = INDEX_DIR) -> str:
+    """JSON file naming the current version of a dataset's index; swapping it publishes a new version."""
+    return os.path.join(index_dir, f"current_{dataset_id}.json")
+
+
+def versions_dir(dataset_id: str, index_dir: str = INDEX_DIR) -> str:
+    return os.path.join(index_dir, "versions", dataset_id)
+
+
+def index_path(dataset_id: str, index_dir: str = INDEX_DIR) -> str:
+    """Unversioned native index, as written before versioned publishing; still read when no pointer exists."""
+    return os.path.join(index_dir, f"faiss_index_{dataset_id}{INDEX_EXT}")
+
+
+def metadata_path(dataset_id: str, index_dir: str = INDEX_DIR) -> str:
+    return os.path.join(index_dir, f"metadata_{dataset_id}{METADATA_EXT}")
+
+
+def manifest_path(dataset_id: str, index_dir: str = INDEX_DIR) -> str:
+    return os.path.join(index_dir, f"manifest_{dataset_id}.json")
+
+
+def legacy_index_path(dataset_id: str, index_dir: str = INDEX_DIR) -> str:
+    return os.path.join(index_dir, f"faiss_index_{dataset_id}{LEGACY_EXT}")
+
+
+def legacy_metadata_path(dataset_id: str, index_dir: str = INDEX_DIR) -> str:
+    return os.path.join(index_dir, f"metadata_{dataset_id}{LEGACY_EXT}")
+
+
+def _mmap_flags() -> int:
+    # IO_FLAG_MMAP_IFC maps flat code arrays (IndexFlat*) on FAISS versions that support it
+    return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+
+
+def write_metadata(path: str, metadata: list[dict]):
+    """Write one JSON object per chunk, atomically."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for meta in metadata:
+            f.write(json.dumps(meta, ensure_ascii=False))
+            f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def read_metadata(path: str) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def new_version(dataset_id: str, index_dir: str = INDEX_DIR) -> str:
+    """Empty directory for the files of a not yet published index version."""
+    path = os.path.join(versions_dir(dataset_id, index_dir), str(time.time_ns()))
+    os.makedirs(path)
+    return path
+
+
+def version_files(version: str) -> tuple[str, str]:
+    """(index, metadata) paths inside a version directory."""
+    return os.path.join(version, f"index{INDEX_EXT}"), os.path.join(version, f"metadata{METADATA_EXT}")
+
+
+def publish_version(version: str, dataset_id: str, index_dir: str = INDEX_DIR):
+    """
+    Make a fully written version current by atomically replacing the dataset's pointer file.
+    Readers follow the pointer, so they see either the old index and metadata or the new pair, never a mix.
+    """
+    path = pointer_path(dataset_id, index_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": os.path.basename(version)}, f)
+    os.replace(tmp_path, path)
+    # the pointer wins over unversioned files, drop them so nothing reads a stale pair by mistake
+    for stale in (index_path(dataset_id, index_dir), metadata_path(dataset_id, index_dir)):
+        if os.path.exists(stale):
+            os.remove(stale)
+    versions = sorted(os.listdir(versions_dir(dataset_id, index_dir)), key=int)
+    for old in versions[:-INDEX_KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(versions_dir(dataset_id, index_dir), old), ignore_errors=True)
+
+
+def current_version_files(dataset_id: str, index_dir: str = INDEX_DIR) -> tuple[str, str] | None:
+    """(index, metadata) paths of the published version, None when the dataset has no pointer."""
+    try:
+        with open(pointer_path(dataset_id, index_dir), "r", encoding="utf-8") as f:
+            version = json.load(f)["version"]
+    except FileNotFoundError:
+        return None
+    return version_files(os.path.join(versions_dir(dataset_id, index_dir), version))
+
+
+def discard_version(version: str):
+    shutil.rmtree(version, ignore_errors=True)
+
+
+def save_index(index, metadata: list[dict], dataset_id: str, index_dir: str = INDEX_DIR):
+    """
+    Save an index with FAISS's own serializer plus a JSONL metadata sidecar as a new version,
+    then publish it. Readers never see a partial file or an index paired with another version's metadata.
+    """
+    version = new_version(dataset_id, index_dir)
+    path, meta_path = version_files(version)
+    faiss.write_index(index, path)
+    write_metadata(meta_path, metadata)
+    publish_version(version, dataset_id, index_dir)
+    logger.info(f"Saved FAISS index and metadata for {dataset_id} as version {os.path.basename(version)}")
+
+
+def read_index(path: str, mmap: bool = True):
+    """Open a native FAISS index, memory-mapped read-only when possible."""
+    if mmap:
+        try:
+            return faiss.read_index(path, _mmap_flags())
+        except RuntimeError as e:
+            logger.warning(f"Memory-mapped read of {path} failed ({e}), reading into memory")
+    return faiss.read_index(path)
+
+
+def load_index(dataset_id: str, index_dir: str = INDEX_DIR, mmap: bool = True):
+    """
+    Return (index, metadata) for a dataset. Falls back to the legacy pickled files when the
+    native ones do not exist yet (run `python -m llm.data.migrate_indices` to convert them).
+    """
+    for attempt in range(3):
+        files = current_version_files(dataset_id, index_dir)
+        if files is None:
+            break
+        try:
+            index, metadata = read_index(files[0], mmap=mmap), read_metadata(files[1])
+        except (FileNotFoundError, RuntimeError):
+            # the version was pruned between reading the pointer and opening it, follow the new pointer
+            if attempt == 2:
+                raise
+            continue
+        logger.info(f"Loaded FAISS index and metadata from {os.path.dirname(files[0])}")
+        return index, metadata
+
+    path, meta_path = index_path(dataset_id, index_dir), metadata_path(dataset_id, index_dir)
+    if os.path.exists(path) and os.path.exists(meta_path):
+        index = read_index(path, mmap=mmap)
+        metadata = read_metadata(meta_path)
+        logger.info(f"Loaded FAISS index and metadata from {path}")
+        return index, metadata
+
+    legacy_path, legacy_meta_path = legacy_index_path(dataset_id, index_dir), legacy_metadata_path(dataset_id, index_dir)
+    if os.path.exists(legacy_path) and os.path.exists(legacy_meta_path):
+        logger.warning(f"Loading legacy pickled index {legacy_path}; run `python -m llm.data.migrate_indices`")
+        with open(legacy_path, "rb") as f:
+            index = pickle.load(f)
+        with open(legacy_meta_path, "rb") as f:
+            metadata = pickle.load(f)
+        return index, metadata
+
+    raise FileNotFoundError(f"No FAISS index found for dataset {dataset_id} in {index_dir}")
+
+
+def read_manifest(dataset_id: str, index_dir: str = INDEX_DIR) -> dict | None:
+    """Manifest written by incremental updates (chunk ids, embedding model), None if absent."""
+    path = manifest_path(dataset_id, index_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(manifest: dict, dataset_id: str, index_dir: str = INDEX_DIR):
+    path = manifest_path(dataset_id, index_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def index_files(dataset_id: str, index_dir: str = INDEX_DIR) -> list[str]:
+    """Paths of the files load_index would read for this dataset (empty if there is no index)."""
+    current = current_version_files(dataset_id, index_dir)
+    if current is not None and all(os.path.exists(p) for p in current):
+        return [pointer_path(dataset_id, index_dir), *current]
+    for paths in ((index_path(dataset_id, index_dir), metadata_path(dataset_id, index_dir)),
+                  (legacy_index_path(dataset_id, index_dir), legacy_metadata_path(dataset_id, index_dir))):
+        if all(os.path.exists(p) for p in paths):
+            return list(paths)
+    return []
+
+
+def index_exists(dataset_id: str, index_dir: str = INDEX_DIR) -> bool:
+    return bool(index_files(dataset_id, index_dir))
+
+
+def list_indices(index_dir: str = INDEX_DIR) -> list[str]:
+    """Dataset ids with a native or legacy index in index_dir."""
+    datasets = {os.path.basename(f)[len("current_"):-len(".json")]
+                for f in glob.glob(os.path.join(index_dir, "current_*.json"))}
+    for ext in (INDEX_EXT, LEGACY_EXT):
+        for f in glob.glob(os.path.join(index_dir, f"faiss_index_*{ext}")):
+            datasets.add(os.path.basename(f)[len("faiss_index_"):-len(ext)])
+    return sorted(datasets)
+
+
+def migrate_legacy_index(dataset_id: str, index_dir: str = INDEX_DIR, remove_legacy: bool = False) -> bool:
+    """Convert one pickled index + metadata pair to the native format. Returns True if converted."""
+    legacy_path, legacy_meta_path = legacy_index_path(dataset_id, index_dir), legacy_metadata_path(dataset_id, index_dir)
+    if not (os.path.exists(legacy_path) and os.path.exists(legacy_meta_path)):
+        return False
+    with open(legacy_path, "rb") as f:
+        index = pickle.load(f)
+    with open(legacy_meta_path, "rb") as f:
+        metadata = pickle.load(f)
+    save_index(index, metadata, dataset_id, index_dir)
+
+    # verify the round trip before touching the legacy files
+    restored, restored_metadata = load_index(dataset_id, index_dir, mmap=False)
+    if restored.ntotal != index.ntotal or len(restored_metadata) != len(metadata):
+        raise ValueError(f"Migrated index for {dataset_id} does not match the pickled original")
+
+    if remove_legacy:
+        os.remove(legacy_path)
+        os.remove(legacy_meta_path)
+    logger.info(f"Migrated {dataset_id}: {index.ntotal} vectors, {len(metadata)} metadata rows")
+    return True
@@ -0,0 +1,359 @@
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing import Manager
+from concurrent.futures import ProcessPoolExecutor
+from llm.utils.lazy import faiss
+import numpy as np
+from llm.data.chunking import CHUNKER, CHUNKERS, Chunker, iter_chunk_batches, chunk_id_for, get_chunker
+from llm.data.data_pipeline import DATA_DIR, UNIFIED_DATASET_ID, DataPipeline
+from llm.data.index_specs import build_index, train_index, remove_ids, get_index_spec, trained_params
+from llm.data.index_store import INDEX_DIR, new_version, version_files, publish_version, discard_version, \
+    read_manifest, write_manifest
+from llm.utils.embedding_registry import DEFAULT_EMBEDDING_MODEL
+from utils.log import logger
+
+
+# chunks per embedding call
+INGEST_BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", "64"))
+# torch intra-op threads for embedding, 0 keeps the torch default
+INGEST_EMBED_THREADS = int(os.environ.get("INGEST_EMBED_THREADS", "0"))
+# processes reading and chunking files
+INGEST_CHUNK_WORKERS = int(os.environ.get("INGEST_CHUNK_WORKERS", str(os.cpu_count() or 1)))
+# batches buffered between chunking and embedding; bounds memory when embedding is the bottleneck
+INGEST_QUEUE_SIZE = int(os.environ.get("INGEST_QUEUE_SIZE", "8"))
+# chunk batches a worker may get ahead of the consumer per file; bounds memory per file in flight
+INGEST_FILE_BATCHES = int(os.environ.get("INGEST_FILE_BATCHES", "4"))
+
+@dataclass
+class IngestStats:
+    files: int = 0
+    chunks: int = 0
+    embedded: int = 0
+    skipped: int = 0
+    removed: int = 0
+    embed_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.total_seconds if self.total_seconds else 0.0
+
+    @property
+    def embeddings_per_second(self) -> float:
+        return self.embedded / self.embed_seconds if self.embed_seconds else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.files} files, {self.chunks} chunks ({self.embedded} embedded, {self.skipped} unchanged, "
+                f"{self.removed} removed) in {self.total_seconds:.1f}s: "
+                f"{self.chunks_per_second:.1f} chunks/s, {self.embeddings_per_second:.1f} embeddings/s")
+
+
+class _DatasetWriter:
+    """Adds vectors to one dataset's index and streams its metadata rows to disk as batches arrive."""
+
+    def __init__(self, pipeline: DataPipeline, dataset_id: str, full_rebuild: bool, index_dir: str = INDEX_DIR):
+        self.dataset_id = dataset_id
+        self.pipeline = pipeline
+        self.index_dir = index_dir
+        self.spec = get_index_spec(dataset_id)
+        manifest = read_manifest(dataset_id, index_dir)
+        self.index = None if full_rebuild else pipeline.load_updatable_index(dataset_id, manifest, self.spec)
+        self.known = set(manifest["ids"]) if self.index is not None else set()
+        # vectors held back until there are enough to train a new IVF / PQ index
+        self._pending = []
+        self._pending_count = 0
+        self.ids = []
+        self.seen = set()
+        self.sources = set()
+        self.added = 0
+        # files go into an unpublished version directory, readers keep the current one until finish()
+        self._version = new_version(dataset_id, index_dir)
+        self._index_file, metadata_file = version_files(self._version)
+        self._metadata_file = open(metadata_file, "w", encoding="utf-8")
+
+    def accept(self, text: str, meta: dict) -> int | None:
+        """Record a chunk; returns its id when it still has to be embedded, None if unchanged or duplicate."""
+        chunk_id = chunk_id_for(meta["source"], text)
+        if chunk_id in self.seen:
+            return None
+        self.seen.add(chunk_id)
+        self.ids.append(chunk_id)
+        self.sources.add(meta["source"])
+        self._metadata_file.write(json.dumps({**meta, "id": chunk_id, "text": text}, ensure_ascii=False))
+        self._metadata_file.write("\n")
+        return None if chunk_id in self.known else chunk_id
+
+    def add(self, vectors: np.ndarray, ids: list[int]):
+        ids = np.array(ids, dtype="int64")
+        if self.index is not None and self.index.is_trained:
+            self.index.add_with_ids(vectors, ids)
+        else:
+            self._pending.append((vectors, ids))
+            self._pending_count += len(ids)
+            if not self.spec.needs_training or self._pending_count >= self.spec.train_sample:
+                self._flush_pending()
+        self.added += len(ids)
+
+    def _flush_pending(self):
+        vectors = np.vstack([v for v, _ in self._pending]) if self._pending else None
+        if self.index is None:
+            dim = vectors.shape[1] if vectors is not None else \
+                self.pipeline.embedding_model.get_sentence_embedding_dimension()
+            self.index = build_index(self.spec, dim, n_vectors=self._pending_count)
+        if vectors is not None:
+            train_index(self.index, vectors, self.spec)
+            self.index.add_with_ids(vectors, np.concatenate([i for _, i in self._pending]))
+        self._pending, self._pending_count = [], 0
+
+    def finish(self) -> int:
+        """Drop chunks that disappeared from the source, then publish the index and metadata and write the manifest."""
+        if self.index is None or self._pending:
+            self._flush_pending()
+        removed = sorted(self.known - self.seen)
+        if removed:
+            self.index = remove_ids(self.index, np.array(removed, dtype="int64"), self.spec)
+        self._metadata_file.close()
+        if self.spec.outgrown(trained_params(self.index), len(self.ids)):
+            # the kept quantizer was trained for a much smaller corpus; the manifest now has the new size,
+            # so the next run's load_updatable_index rebuilds it instead of extending it again
+            logger.info(f"{self.dataset_id} outgrew its trained clusters {trained_params(self.index)}, "
+                        f"it is rebuilt on the next run")
+
+        faiss.write_index(self.index, self._index_file)
+        publish_version(self._version, self.dataset_id, self.index_dir)
+        write_manifest(self.pipeline.manifest_for(
+            self.dataset_id, self.ids, self.index, self.spec, sorted(self.sources)), self.dataset_id, self.index_dir)
+        logger.info(f"Ingested {self.dataset_id}: {len(self.ids)} chunks, {self.added} embedded, {len(removed)} removed")
+        return len(removed)
+
+    def abort(self):
+        self._metadata_file.close()
+        discard_version(self._version)
+
+
+def _put(out, item, stop) -> bool:
+    """Put on a bounded queue, giving up once stop is set; returns whether the item was queued."""
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _chunk_worker(path: str, source: str, chunker: Chunker, batch_size: int, out, stop):
+    """Process pool task: put one file's chunk batches on its own bounded queue, then None."""
+    try:
+        for batch in iter_chunk_batches(path, source, chunker, batch_size):
+            if not _put(out, batch, stop):
+                return
+    finally:
+        _put(out, None, stop)
+
+
+class StreamingIngestor:
+    """
+    Streaming corpus ingestion: a process pool reads and chunks files, a bounded queue hands
+    fixed-size batches to one embedding loop, and vectors go into each dataset's index as they arrive.
+
+    At most `chunk_workers * 2` files are in flight, each worker hands its file over in batches of
+    `batch_size` chunks through a queue of at most INGEST_FILE_BATCHES batches, and `queue_size` batches
+    are buffered for embedding, so memory depends on batch size rather than on file or corpus size.
+    Chunks whose id is already in a dataset's manifest are not embedded again.
+    """
+
+    def __init__(self, data_dir: str = DATA_DIR, embedding_model_name: str = DEFAULT_EMBEDDING_MODEL,
+                 batch_size: int = INGEST_BATCH_SIZE, embed_threads: int = INGEST_EMBED_THREADS,
+                 chunk_workers: int = INGEST_CHUNK_WORKERS, queue_size: int = INGEST_QUEUE_SIZE,
+                 full_rebuild: bool = False, chunker: Chunker = None, unified: bool = False,
+                 index_dir: str = INDEX_DIR):
+        self.data_dir = data_dir
+        self.index_dir = index_dir
+        self.pipeline = DataPipeline(data_dir, embedding_model_name, chunker, index_dir=index_dir)
+        self.chunker = self.pipeline.chunker
+        self.batch_size = batch_size
+        self.embed_threads = embed_threads
+        self.chunk_workers = max(1, chunk_workers)
+        self.queue_size = queue_size
+        self.full_rebuild = full_rebuild
+        # one index over all files (UNIFIED_DATASET_ID) instead of one per file
+        self.unified = unified
+        self._collected = 0
+        self._files = 0
+
+    def _produce(self, filenames: list[str], batches: queue.Queue, stop: threading.Event):
+        """Chunk files in the process pool and put ("batch", rows) / ("done", dataset_id) items on the queue."""
+        try:
+            buffer, pending_done = [], []
+
+            def flush():
+                if buffer:
+                    batches.put(("batch", list(buffer)))
+                    buffer.clear()
+                # every row of these datasets is now in this batch or an earlier one
+                for dataset_id in pending_done:
+                    batches.put(("done", dataset_id))
+                pending_done.clear()
+
+            with Manager() as manager, ProcessPoolExecutor(max_workers=self.chunk_workers) as executor:
+                worker_stop = manager.Event()
+                in_flight = deque()
+                try:
+                    for filename in filenames:
+                        if stop.is_set():
+                            break
+                        chunks = manager.Queue(maxsize=INGEST_FILE_BATCHES)
+                        in_flight.append((filename, chunks, executor.submit(
+                            _chunk_worker, os.path.join(self.data_dir, filename), filename, self.chunker,
+                            self.batch_size, chunks, worker_stop)))
+                        if len(in_flight) >= self.chunk_workers * 2:
+                            self._collect(*in_flight.popleft(), buffer, pending_done, flush, stop)
+                    while in_flight and not stop.is_set():
+                        self._collect(*in_flight.popleft(), buffer, pending_done, flush, stop)
+                finally:
+                    # release workers blocked on a full queue nobody reads any more
+                    worker_stop.set()
+                    for _, _, future in in_flight:
+                        future.cancel()
+            if self.unified and self._collected and not stop.is_set():
+                pending_done.append(UNIFIED_DATASET_ID)
+            flush()
+        except Exception as e:
+            batches.put(("error", e))
+        finally:
+            batches.put(("end", None))
+
+    def _collect(self, filename: str, chunks, future, buffer: list, pending_done: list, flush, stop: threading.Event):
+        """Move one file's chunk batches from its worker queue into the embedding buffer, in file order."""
+        dataset_id = os.path.splitext(filename)[0]
+        target = UNIFIED_DATASET_ID if self.unified else dataset_id
+        rows = 0
+        while not stop.is_set():
+            try:
+                batch = chunks.get(timeout=0.1)
+            except queue.Empty:
+                if future.done():
+                    # the worker died without its end marker, surface its error
+                    future.result()
+                    break
+                continue
+            if batch is None:
+                break
+            for text, meta in batch:
+                buffer.append((target, text, {**meta, "dataset_id": dataset_id}))
+                if len(buffer) >= self.batch_size:
+                    flush()
+            rows += len(batch)
+        if stop.is_set():
+            return
+        future.result()
+        if not rows:
+            logger.warning(f"No valid content found in {filename}, skipping")
+            return
+        self._collected += rows
+        self._files += 1
+        if not self.unified:
+            pending_done.append(dataset_id)
+
+    def run(self, filenames: list[str] = None) -> IngestStats:
+        filenames = filenames or sorted(f for f in os.listdir(self.data_dir) if f.endswith(".txt"))
+        if not filenames:
+            raise ValueError(f"No .txt files found in {self.data_dir}")
+        if self.embed_threads > 0:
+            import torch
+            torch.set_num_threads(self.embed_threads)
+
+        stats = IngestStats()
+        self._collected = self._files = 0
+        writers = {}
+        batches = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(filenames, batches, stop), daemon=True)
+        start = time.perf_counter()
+        producer.start()
+        try:
+            while True:
+                kind, payload = batches.get()
+                if kind == "end":
+                    break
+                if kind == "error":
+                    raise payload
+                if kind == "done":
+                    stats.removed += writers.pop(payload).finish()
+                    stats.files = self._files
+                    continue
+                self._embed_batch(payload, writers, stats)
+                stats.total_seconds = time.perf_counter() - start
+                logger.info(f"Ingestion progress: {stats.chunks} chunks, "
+                            f"{stats.chunks_per_second:.1f} chunks/s, {stats.embeddings_per_second:.1f} embeddings/s")
+        except BaseException:
+            stop.set()
+            # unblock the producer so it can see the stop flag
+            while producer.is_alive():
+                try:
+                    batches.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            for writer in writers.values():
+                writer.abort()
+            raise
+        producer.join()
+        stats.total_seconds = time.perf_counter() - start
+        logger.info(f"Ingestion finished: {stats.summary()}")
+        return stats
+
+    def _embed_batch(self, rows: list, writers: dict, stats: IngestStats):
+        to_embed = []
+        for dataset_id, text, meta in rows:
+            writer = writers.get(dataset_id)
+            if writer is None:
+                writer = writers[dataset_id] = _DatasetWriter(self.pipeline, dataset_id, self.full_rebuild,
+                                                              self.index_dir)
+            chunk_id = writer.accept(text, meta)
+            if chunk_id is None:
+                stats.skipped += 1
+            else:
+                to_embed.append((writer, chunk_id, text))
+        stats.chunks += len(rows)
+        if not to_embed:
+            return
+
+        embed_start = time.perf_counter()
+        vectors = np.asarray(self.pipeline.embedding_model.encode(
+            [text for _, _, text in to_embed], batch_size=self.batch_size), dtype="float32")
+        stats.embed_seconds += time.perf_counter() - embed_start
+        stats.embedded += len(to_embed)
+
+        by_writer = {}
+        for row, (writer, chunk_id, _) in enumerate(to_embed):
+            by_writer.setdefault(writer, []).append((row, chunk_id))
+        for writer, items in by_writer.items():
+            writer.add(vectors[[row for row, _ in items]], [chunk_id for _, chunk_id in items])
+
+
+if __name__ == "__main__":
+    """Stream every .txt file in llm/data/files into its FAISS index."""
+    parser = argparse.ArgumentParser(description="Parallel, streaming ingestion of llm/data/files into FAISS indices.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument("--embed-threads", type=int, default=INGEST_EMBED_THREADS)
+    parser.add_argument("--chunk-workers", type=int, default=INGEST_CHUNK_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=INGEST_QUEUE_SIZE)
+    parser.add_argument("--force-rebuild", action="store_true", help="re-embed every chunk instead of only changed ones")
+    parser.add_argument("--chunker", choices=sorted(CHUNKERS), default=CHUNKER)
+    parser.add_argument("--unified", action="store_true", help=f"build the cross-dataset '{UNIFIED_DATASET_ID}' index")
+    args = parser.parse_args()
+
+    ingestor = StreamingIngestor(args.data_dir, batch_size=args.batch_size, embed_threads=args.embed_threads,
+                                 chunk_workers=args.chunk_workers, queue_size=args.queue_size,
+                                 full_rebuild=args.force_rebuild, chunker=get_chunker(args.chunker),
+                                 unified=args.unified, index_dir=args.index_dir)
+    print(ingestor.run().summary())
@@ -0,0 +1,31 @@
+import os
+import glob
+import argparse
+from llm.data.index_store import INDEX_DIR, LEGACY_EXT, migrate_legacy_index
+from utils.log import logger
+
+
+def migrate_pickled_indices(index_dir: str = INDEX_DIR, remove_legacy: bool = False) -> list[str]:
+    """Convert every faiss_index_<id>.pkl / metadata_<id>.pkl pair in index_dir to the native format."""
+    migrated = []
+    for f in sorted(glob.glob(os.path.join(index_dir, f"faiss_index_*{LEGACY_EXT}"))):
+        dataset_id = os.path.basename(f)[len("faiss_index_"):-len(LEGACY_EXT)]
+        try:
+            if migrate_legacy_index(dataset_id, index_dir, remove_legacy=remove_legacy):
+                migrated.append(dataset_id)
+            else:
+                logger.warning(f"Skipping {dataset_id}: metadata pickle is missing")
+        except Exception as e:
+            logger.error(f"Migration of {dataset_id} failed: {e}")
+    return migrated
+
+
+if __name__ == "__main__":
+    """Convert pickled FAISS indices in llm/data to native .faiss + .jsonl files."""
+    parser = argparse.ArgumentParser(description="Migrate pickled FAISS indices to the native on-disk format.")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--remove-legacy", action="store_true", help="delete the .pkl files after a verified migration")
+    args = parser.parse_args()
+
+    migrated = migrate_pickled_indices(args.index_dir, remove_legacy=args.remove_legacy)
+    print(f"Migrated {len(migrated)} indices: {', '.join(migrated) or '-'}")
@@ -1,12 +1,12 @@
 import asyncio
 
-from ollama import AsyncClient
 from dataclasses import dataclass
 from dataclasses import field
 from utils.log import logger
 from llm.utils.agent_mapping import PERSONA_MAPPING
 from llm.utils.select_agent import select_agent
 from llm.utils.prompts import get_system_prompt
+from llm.utils.ollama_client import get_ollama_client
 
 
 @dataclass
@@ -26,7 +26,7 @@ class AIModel:
     async def ask_to_model(self, user_query: str = None, chat_history: list = [], stream_to_terminal: bool = False,
                            persona: str = "fixie", persona_prompt: str = "", agent_tools: list = None):
         try:
-            client = AsyncClient()
+            client = get_ollama_client()
             logger.info(f"{persona.upper()} preparing response...")
             persona_prompt = PERSONA_MAPPING[persona]
 
@@ -0,0 +1,104 @@
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+_PUNCTUATION = re.compile(r"[^\w\s./:-]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize a user query for cache keys: case folded, no punctuation, single spaces.
+    Dots, slashes, colons and dashes are kept so hostnames and IPs stay distinct.
+    """
+    text = unicodedata.normalize("NFC", text or "")
+    # users mix Turkish and English casing ("IP", "ıp", "İnternet"), so every i variant folds to "i"
+    text = text.replace("İ", "i").replace("I", "i").replace("ı", "i").lower()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip(" .:-")
+
+
+class LRUTTLCache:
+    """
+    Thread-safe LRU cache with a per-entry time to live and hit/miss counters.
+    Expiry uses wall-clock time so entries restored from disk keep their age.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float | None = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expired(self, created: float, ttl: float | None, now: float) -> bool:
+        return ttl is not None and now - created > ttl
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, created, ttl = entry
+            if self._expired(created, ttl, now):
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, ttl: float | None = ..., created: float = None) -> list:
+        """Store a value (optionally with its own ttl); returns the keys evicted to make room."""
+        ttl = self.ttl if ttl is ... else ttl
+        evicted = []
+        with self._lock:
+            self._data[key] = (value, created or time.time(), ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                old_key, _ = self._data.popitem(last=False)
+                evicted.append(old_key)
+                self.evictions += 1
+        return evicted
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def items(self) -> list:
+        """Live (key, value, created) triples, oldest first."""
+        now = time.time()
+        with self._lock:
+            return [(k, v, created) for k, (v, created, ttl) in self._data.items()
+                    if not self._expired(created, ttl, now)]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
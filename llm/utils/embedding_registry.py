@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from llm.utils.lazy import sentence_transformers, torch
+from utils.log import logger
+
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_DEVICE = os.environ.get("EMBEDDING_DEVICE", "cpu")
+# "torch" (full precision), "onnx" (ONNX Runtime, needs `pip install "sentence-transformers[onnx]"`)
+# or "int8" (torch dynamic int8 quantization of the Linear layers, CPU only)
+EMBEDDING_BACKENDS = ("torch", "onnx", "int8")
+DEFAULT_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch")
+
+
+@dataclass
+class EmbeddingModelStats:
+    model_name: str
+    device: str
+    backend: str
+    load_seconds: float
+    model_memory_mb: float
+    rss_delta_mb: float
+
+
+def _current_rss_mb() -> float:
+    """Resident set size of this process in MB (best effort, 0.0 if unknown)."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and kilobytes on Linux
+        return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+    except Exception:
+        return 0.0
+
+
+def _model_memory_mb(model) -> float:
+    """Size of the model parameters and buffers in MB."""
+    try:
+        total = sum(p.numel() * p.element_size() for p in model.parameters())
+        total += sum(b.numel() * b.element_size() for b in model.buffers())
+        return total / (1024 * 1024)
+    except Exception:
+        return 0.0
+
+
+class EmbeddingModelRegistry:
+    """
+    Process-wide registry that owns one SentenceTransformer per (model name, device, backend).
+    Models are loaded lazily on first use; concurrent first calls load only once.
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._stats = {}
+        self._hits = Counter()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get(self, model_name: str = DEFAULT_EMBEDDING_MODEL, device: str = DEFAULT_DEVICE,
+            backend: str = DEFAULT_BACKEND):
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown embedding backend '{backend}', expected one of {', '.join(EMBEDDING_BACKENDS)}")
+        key = (model_name, device, backend)
+        model = self._models.get(key)
+        if model is not None:
+            self._hits[key] += 1
+            return model
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # per-key lock so loading one model does not block lookups of another
+        with key_lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._hits[key] += 1
+                return model
+            model = self._load(model_name, device, backend)
+            self._models[key] = model
+        return model
+
+    def _load(self, model_name: str, device: str, backend: str = DEFAULT_BACKEND):
+        logger.info(f"Loading embedding model {model_name} on {device} ({backend} backend)...")
+        rss_before = _current_rss_mb()
+        start = time.perf_counter()
+        if backend == "onnx":
+            model = sentence_transformers.SentenceTransformer(model_name, device=device, backend="onnx")
+        else:
+            model = sentence_transformers.SentenceTransformer(model_name, device=device)
+        if backend == "int8":
+            # weights of every Linear layer become int8, activations are quantized per batch
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        load_seconds = time.perf_counter() - start
+        stats = EmbeddingModelStats(
+            model_name=model_name,
+            device=device,
+            backend=backend,
+            load_seconds=load_seconds,
+            model_memory_mb=_model_memory_mb(model),
+            rss_delta_mb=max(_current_rss_mb() - rss_before, 0.0),
+        )
+        self._stats[(model_name, device, backend)] = stats
+        logger.info(
+            f"Embedding model {model_name} ({backend}) loaded on {device} in {stats.load_seconds:.2f}s "
+            f"(params {stats.model_memory_mb:.1f} MB, RSS +{stats.rss_delta_mb:.1f} MB)"
+        )
+        return model
+
+    def is_loaded(self, model_name: str = DEFAULT_EMBEDDING_MODEL, device: str = DEFAULT_DEVICE,
+                  backend: str = DEFAULT_BACKEND) -> bool:
+        return (model_name, device, backend) in self._models
+
+    def stats(self) -> list[dict]:
+        """Load time, memory and reuse count of every model loaded in this process."""
+        return [{**vars(s), "hits": self._hits[key]} for key, s in self._stats.items()]
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._stats.clear()
+            self._hits.clear()
+            self._key_locks.clear()
+
+
+_registry = EmbeddingModelRegistry()
+
+
+def get_embedding_model(model_name: str = DEFAULT_EMBEDDING_MODEL, device: str = DEFAULT_DEVICE,
+                        backend: str = DEFAULT_BACKEND):
+    """Return the shared SentenceTransformer for (model_name, device, backend), loading it on first use."""
+    return _registry.get(model_name, device, backend)
+
+
+def get_embedding_registry() -> EmbeddingModelRegistry:
+    return _registry
+
+
+if __name__ == "__main__":
+    get_embedding_model()
+    get_embedding_model()
+    for s in get_embedding_registry().stats():
+        print(s)
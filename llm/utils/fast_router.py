@@ -0,0 +1,153 @@
+import os
+import time
+import threading
+import numpy as np
+from llm.utils.prompts import AGENT_CAPABILITIES
+from llm.utils.embedding_registry import get_embedding_model, DEFAULT_EMBEDDING_MODEL
+from utils.log import logger
+
+
+FAST_ROUTER_ENABLED = os.environ.get("FAST_ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+# minimum cosine similarity to the best persona centroid to skip the decider model
+FAST_ROUTER_THRESHOLD = float(os.environ.get("FAST_ROUTER_THRESHOLD", "0.6"))
+# minimum gap between the best and the second best persona
+FAST_ROUTER_MARGIN = float(os.environ.get("FAST_ROUTER_MARGIN", "0.08"))
+
+
+# labeled queries per persona, mixed with the capability text to build the centroids
+ROUTING_EXAMPLES = {
+    "fixie": [
+        "internet bağlantım kesilip duruyor",
+        "bağlantım kesilip duruyor",
+        "modemim sık sık kopuyor",
+        "bağlantı sorunumu çözebilir misin?",
+        "Wi-Fi cihazım modeme bağlanmıyor",
+        "my internet keeps disconnecting",
+    ],
+    "bytefix": [
+        "google.com için ağ tanılama testi yapabilir misin",
+        "github.com için teşhis yap",
+        "facebook.com adresine ping at",
+        "example.com için traceroute çalıştır",
+        "run nslookup for github.com",
+    ],
+    "routerx": [
+        "ağ yapılandırma",
+        "VLAN nasıl yapılandırılır",
+        "NAT ve QoS ayarlarını nasıl yapmalıyım",
+        "iki alt ağ arasında statik yönlendirme",
+        "configure port forwarding and firewall rules on my router",
+    ],
+    "sentinel": [
+        "güvenli internet kullanımı",
+        "phishing saldırılarını nasıl tanırım",
+        "Wi-Fi ağımı nasıl güvenli hale getiririm",
+        "modemim hacklendi mi nasıl anlarım",
+        "which VPN protocol is the most secure",
+    ],
+    "hypernet": [
+        "internet hız testi",
+        "internet hızımı nasıl test edebilirim?",
+        "kalabalık alanlarda nasıl daha hızlı internete erişirim",
+        "oyun oynarken ping çok yüksek",
+        "run a speed test",
+    ],
+    "professor_ping": [
+        "yıldız topolojisini açıklar mısın",
+        "yıldız topolojisi çizer misin",
+        "ip adresim ne işe yarar",
+        "DNS nedir",
+        "explain subnetting with an example",
+    ],
+}
+
+
+class FastRouter:
+    """
+    Embedding based persona classifier that runs before the decider LLM.
+
+    Each persona is represented by the normalized mean embedding of its capability text and labeled
+    examples. A query is routed locally only when its best cosine similarity reaches `threshold` and
+    beats the runner-up by `margin`; otherwise the caller falls back to the decider model.
+    """
+
+    def __init__(self, threshold: float = FAST_ROUTER_THRESHOLD, margin: float = FAST_ROUTER_MARGIN,
+                 embedding_model_name: str = DEFAULT_EMBEDDING_MODEL, examples: dict = None):
+        self.threshold = threshold
+        self.margin = margin
+        self.embedding_model_name = embedding_model_name
+        self.examples = examples or ROUTING_EXAMPLES
+        self.personas = []
+        self._centroids = None
+        self._lock = threading.Lock()
+        self.fast_routes = 0
+        self.decider_fallbacks = 0
+
+    def _persona_texts(self, persona: str) -> list[str]:
+        capability = AGENT_CAPABILITIES.get(persona, "")
+        sentences = [s.strip() for s in capability.split(".") if s.strip()]
+        return sentences + list(self.examples.get(persona, []))
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        model = get_embedding_model(self.embedding_model_name)
+        return np.asarray(model.encode(texts, normalize_embeddings=True), dtype="float32")
+
+    def _build_centroids(self):
+        personas = list(AGENT_CAPABILITIES.keys())
+        centroids = []
+        for persona in personas:
+            vectors = self._encode(self._persona_texts(persona))
+            centroid = vectors.mean(axis=0)
+            centroids.append(centroid / np.linalg.norm(centroid))
+        self.personas = personas
+        self._centroids = np.vstack(centroids)
+        logger.info(f"Fast router centroids built for {len(personas)} personas")
+
+    def warm_up(self):
+        """Build the persona centroids ahead of the first query."""
+        with self._lock:
+            if self._centroids is None:
+                self._build_centroids()
+
+    def classify(self, query: str) -> tuple[str, float, float]:
+        """Return (best persona, cosine score, margin over the runner-up)."""
+        if self._centroids is None:
+            self.warm_up()
+        scores = self._centroids @ self._encode([query])[0]
+        order = np.argsort(scores)[::-1]
+        best, second = float(scores[order[0]]), float(scores[order[1]])
+        return self.personas[order[0]], best, best - second
+
+    def route(self, query: str) -> str | None:
+        """Return a persona when the classifier is confident, else None."""
+        start = time.perf_counter()
+        persona, score, margin = self.classify(query)
+        elapsed_ms = 1000 * (time.perf_counter() - start)
+        if score >= self.threshold and margin >= self.margin:
+            self.fast_routes += 1
+            logger.info(f"Routing path: fast | agent: {persona} | score: {score:.3f} | margin: {margin:.3f} | {elapsed_ms:.1f} ms")
+            return persona
+        self.decider_fallbacks += 1
+        logger.info(f"Routing path: decider | best guess: {persona} | score: {score:.3f} | margin: {margin:.3f} | {elapsed_ms:.1f} ms")
+        return None
+
+    def stats(self) -> dict:
+        total = self.fast_routes + self.decider_fallbacks
+        return {
+            "fast_routes": self.fast_routes,
+            "decider_fallbacks": self.decider_fallbacks,
+            "fast_ratio": self.fast_routes / total if total else 0.0,
+        }
+
+
+_fast_router = None
+_fast_router_lock = threading.Lock()
+
+
+def get_fast_router() -> FastRouter:
+    global _fast_router
+    if _fast_router is None:
+        with _fast_router_lock:
+            if _fast_router is None:
+                _fast_router = FastRouter()
+    return _fast_router
@@ -0,0 +1,51 @@
+import sys
+import types
+import importlib
+import threading
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a heavy module that is imported on first attribute access.
+
+    `from llm.utils.lazy import faiss` costs nothing at import time; the first `faiss.IndexFlatL2`
+    imports the real module (once, thread-safe) and copies its namespace, so later lookups are plain
+    attribute reads.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_lock"] = threading.Lock()
+        self.__dict__["_lazy_module"] = None
+
+    def _lazy_load(self):
+        with self._lazy_lock:
+            if self._lazy_module is None:
+                module = importlib.import_module(self.__name__)
+                self.__dict__.update(module.__dict__)
+                self.__dict__["_lazy_module"] = module
+        return self._lazy_module
+
+    def __getattr__(self, attr: str):
+        # only called for names not in __dict__, i.e. before the real module is loaded
+        return getattr(self._lazy_load(), attr)
+
+    def __dir__(self):
+        return dir(self._lazy_load())
+
+    def __repr__(self):
+        state = "loaded" if self._lazy_module is not None else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def is_loaded(name: str) -> bool:
+    """True once the real module has been imported by anyone in this process."""
+    return name in sys.modules
+
+
+torch = LazyModule("torch")
+faiss = LazyModule("faiss")
+sentence_transformers = LazyModule("sentence_transformers")
+genai = LazyModule("google.generativeai")
+speedtest = LazyModule("speedtest")
+networkx = LazyModule("networkx")
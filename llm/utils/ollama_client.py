@@ -0,0 +1,196 @@
+import os
+import time
+import asyncio
+import threading
+import atexit
+import concurrent.futures
+from collections import Counter
+import httpx
+import ollama
+from utils.log import logger
+
+
+OLLAMA_MAX_CONNECTIONS = int(os.environ.get("OLLAMA_MAX_CONNECTIONS", "16"))
+OLLAMA_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("OLLAMA_MAX_KEEPALIVE_CONNECTIONS", "8"))
+OLLAMA_KEEPALIVE_EXPIRY = float(os.environ.get("OLLAMA_KEEPALIVE_EXPIRY", "120"))
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", "5"))
+# generation can take a while on CPU, so the read timeout is generous
+OLLAMA_READ_TIMEOUT = float(os.environ.get("OLLAMA_READ_TIMEOUT", "300"))
+OLLAMA_MODEL_CONCURRENCY = os.environ.get("OLLAMA_MODEL_CONCURRENCY", "2")
+# upper bound for a single decider (agent / tool / dataset selection) round trip
+DECIDER_TIMEOUT = float(os.environ.get("DECIDER_TIMEOUT", "30"))
+
+
+def parse_model_concurrency(spec: str) -> tuple[int, dict]:
+    """
+    Parse "2" or "2,gemma3=4,gemma3:12b-it-q4_K_M=1" into (default limit, per-model limits).
+    """
+    default, per_model = 2, {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "=" in part:
+            model, limit = part.rsplit("=", 1)
+            per_model[model.strip()] = max(int(limit), 1)
+        else:
+            default = max(int(part), 1)
+    return default, per_model
+
+
+class OllamaClientPool:
+    """
+    Shared Ollama client with a bounded, keep-alive HTTP connection pool and per-model concurrency limits.
+
+    httpx async connections are bound to the event loop that opened them, and Streamlit runs every
+    turn in its own short-lived loop (asyncio.run). So the one AsyncClient and the per-model semaphores
+    live on a dedicated background loop, and every call, async or sync, from any loop or thread, is
+    handed to it. Connections are then reused across turns, and the limits hold for the whole process.
+    """
+
+    def __init__(self, host: str = None, max_connections: int = OLLAMA_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry: float = OLLAMA_KEEPALIVE_EXPIRY, connect_timeout: float = OLLAMA_CONNECT_TIMEOUT,
+                 read_timeout: float = OLLAMA_READ_TIMEOUT, model_concurrency: str = OLLAMA_MODEL_CONCURRENCY):
+        self.host = host
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.default_concurrency, self.model_concurrency = parse_model_concurrency(model_concurrency)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._semaphores = {}
+        self.requests = Counter()
+        self.wait_seconds = Counter()
+
+    def concurrency_for(self, model: str) -> int:
+        return self.model_concurrency.get(model, self.default_concurrency)
+
+    def _client_kwargs(self) -> dict:
+        return {"host": self.host, "timeout": self.timeout, "limits": self.limits}
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        """The loop the shared client runs on, started on first use."""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="ollama-client", daemon=True)
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _submit(self, coroutine) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._background_loop())
+
+    def _shared(self) -> tuple:
+        """Client and semaphore table; only called on the background loop, so no locking is needed."""
+        if self._client is None:
+            self._client = ollama.AsyncClient(**self._client_kwargs())
+        return self._client, self._semaphores
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        _, semaphores = self._shared()
+        if model not in semaphores:
+            semaphores[model] = asyncio.Semaphore(self.concurrency_for(model))
+        return semaphores[model]
+
+    async def _chat(self, model: str, messages: list, **kwargs):
+        start = time.perf_counter()
+        async with self._semaphore(model):
+            self._record(model, start)
+            client, _ = self._shared()
+            return await client.chat(model=model, messages=messages, stream=False, **kwargs)
+
+    async def _produce_stream(self, model: str, messages: list, emit, **kwargs):
+        """Runs on the background loop, hands every part (then None, or the error) to `emit`."""
+        start = time.perf_counter()
+        try:
+            async with self._semaphore(model):
+                self._record(model, start)
+                client, _ = self._shared()
+                async for part in await client.chat(model=model, messages=messages, stream=True, **kwargs):
+                    emit(part)
+        except Exception as e:
+            emit(e)
+        else:
+            emit(None)
+
+    async def chat(self, model: str, messages: list, stream: bool = False, **kwargs):
+        """
+        Async chat through the shared client. With stream=True an async generator is returned;
+        its concurrency slot is taken on first iteration and given back when the stream ends.
+        Cancelling the caller cancels the request on the background loop.
+        """
+        if stream:
+            return self._stream_chat(model, messages, **kwargs)
+        return await asyncio.wrap_future(self._submit(self._chat(model, messages, **kwargs)))
+
+    async def _stream_chat(self, model: str, messages: list, **kwargs):
+        loop = asyncio.get_running_loop()
+        parts = asyncio.Queue()
+        producer = self._submit(self._produce_stream(
+            model, messages, lambda part: loop.call_soon_threadsafe(parts.put_nowait, part), **kwargs))
+        try:
+            while (part := await parts.get()) is not None:
+                if isinstance(part, Exception):
+                    raise part
+                yield part
+        finally:
+            # stream closed early or the caller was cancelled: free the slot
+            producer.cancel()
+
+    def chat_sync(self, model: str, messages: list, **kwargs):
+        """Blocking chat through the shared client, for scripts and worker threads (not the background loop)."""
+        return self._submit(self._chat(model, messages, **kwargs)).result()
+
+    def close(self):
+        """Close the shared client's connections and stop the background loop."""
+        with self._lock:
+            loop, thread, self._loop, self._thread = self._loop, self._thread, None, None
+        if loop is None:
+            return
+
+        async def shutdown():
+            if self._client is not None:
+                await self._client._client.aclose()
+            self._client, self._semaphores = None, {}
+
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout=10)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=10)
+        loop.close()
+
+    def _record(self, model: str, start: float):
+        waited = time.perf_counter() - start
+        self.requests[model] += 1
+        self.wait_seconds[model] += waited
+        if waited > 1:
+            logger.info(f"Ollama request for {model} waited {waited:.2f}s for a free slot")
+
+    def stats(self) -> dict:
+        return {
+            model: {
+                "requests": count,
+                "avg_wait_ms": 1000 * self.wait_seconds[model] / count,
+                "concurrency": self.concurrency_for(model),
+            }
+            for model, count in self.requests.items()
+        }
+
+
+_ollama_client = None
+_ollama_client_lock = threading.Lock()
+
+
+def get_ollama_client() -> OllamaClientPool:
+    """Process-wide Ollama client pool; every Ollama call in llm/ goes through it."""
+    global _ollama_client
+    if _ollama_client is None:
+        with _ollama_client_lock:
+            if _ollama_client is None:
+                _ollama_client = OllamaClientPool()
+                atexit.register(_ollama_client.close)
+    return _ollama_client
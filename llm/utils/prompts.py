@@ -111,3 +111,13 @@ Your style:
 Goal: Make networking **simple, interactive, and engaging**
 """
 
+
+# short capability descriptions used by the agent selector (decider model and fast-path router)
+AGENT_CAPABILITIES = {
+    "fixie": "Genel bağlantı sorunu giderme, ISP görüşmesi için hazırlık. Kullanıcı dostu, adım adım çözümler.",
+    "bytefix": "Teknik kullanıcılar için. DNS, traceroute, ping, paket kaybı gibi websiteleri için teşhis görevlerini yapar. Bir websiteye ping atar, DNS sorgusu yapar, traceroute çalıştırır. Kullanıcıdan hedef hostname veya IP adresi alır.",
+    "routerx": "Yönlendirme (routing), anahtarlama (switching), VLAN, NAT ve güvenlik duvarı (firewall) konularında uzmandır. LAN/WAN trafiği yönetimi ve QoS (Hizmet Kalitesi) yapılandırmaları üzerinde derin uzmanlığa sahiptir. Ağ altyapısının verimli çalışması için yapılandırma ve optimizasyon çözümleri sunar.",
+    "sentinel": "Ağ güvenliği, Wi-Fi güvenliği, güvenlik duvarları, IDS/IPS, VPN'ler, siber tehditler (phishing, malware), pratik güvenlik adımları.",
+    "hypernet": "İnternet hızı optimizasyonu, Wi-Fi yerleşimi/kanalları, hız testleri, gecikme/jitter sorunları, hızlı ve etkili çözümler.",
+    "professor_ping": "Ağ kavramlarını açıklar (IP, DNS, TCP/IP, subnetting), topoloji çizer, temel başlangıç seviyesi sorun giderme. Eğlenceli, benzetmeler kullanır.",
+}
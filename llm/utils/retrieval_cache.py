@@ -0,0 +1,114 @@
+import os
+import threading
+import numpy as np
+from llm.utils.cache import LRUTTLCache, normalize_query
+
+
+RETRIEVAL_CACHE_SIZE = int(os.environ.get("RETRIEVAL_CACHE_SIZE", "1024"))
+RETRIEVAL_CACHE_TTL = float(os.environ.get("RETRIEVAL_CACHE_TTL", "3600"))
+# cached query embeddings (exact query strings), 0 disables the embedding cache
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+
+
+class RetrievalCache:
+    """
+    Cache of retrieval results keyed by (dataset, tool prefix, normalized query, k, options).
+
+    Every entry carries the version of the IndexEntry it was computed from; a lookup with a newer
+    version (the index was rebuilt or hot-reloaded) counts as a miss and drops the entry.
+    """
+
+    def __init__(self, max_size: int = RETRIEVAL_CACHE_SIZE, ttl: float = RETRIEVAL_CACHE_TTL):
+        self._cache = LRUTTLCache(max_size=max_size, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    @staticmethod
+    def key(dataset_id: str, prefix: str, query: str, k: int, options=None) -> tuple:
+        return dataset_id, prefix, normalize_query(query), k, options
+
+    def get(self, key: tuple, version: int):
+        cached = self._cache.get(key)
+        if cached is not None:
+            cached_version, value = cached
+            if cached_version == version:
+                self.hits += 1
+                return value
+            self._cache.pop(key)
+            self.invalidated += 1
+        self.misses += 1
+        return None
+
+    def put(self, key: tuple, version: int, value):
+        self._cache.put(key, (version, value))
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": "retrieval",
+            "size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidated": self.invalidated,
+            "evictions": self._cache.evictions,
+            "expirations": self._cache.expirations,
+        }
+
+
+class QueryEmbeddingCache:
+    """LRU cache of query embeddings per model, so a repeated query string is encoded once."""
+
+    def __init__(self, max_size: int = QUERY_EMBEDDING_CACHE_SIZE):
+        self.enabled = max_size > 0
+        self._cache = LRUTTLCache(max_size=max(max_size, 1), ttl=None)
+
+    def encode(self, model, model_name: str, texts: list[str], **kwargs) -> np.ndarray:
+        """Embeddings for texts, encoding only the ones not seen before (in one batch)."""
+        if not self.enabled:
+            return np.asarray(model.encode(texts, **kwargs), dtype="float32")
+        vectors = [self._cache.get((model_name, text)) for text in texts]
+        missing = sorted({text for text, vector in zip(texts, vectors) if vector is None})
+        if missing:
+            encoded = dict(zip(missing, np.asarray(model.encode(missing, **kwargs), dtype="float32")))
+            for text, vector in encoded.items():
+                self._cache.put((model_name, text), vector)
+            vectors = [encoded[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        return np.vstack(vectors)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {"name": "query_embedding", **self._cache.stats()}
+
+
+_retrieval_cache = None
+_embedding_cache = None
+_lock = threading.Lock()
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    global _retrieval_cache
+    if _retrieval_cache is None:
+        with _lock:
+            if _retrieval_cache is None:
+                _retrieval_cache = RetrievalCache()
+    return _retrieval_cache
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _lock:
+            if _embedding_cache is None:
+                _embedding_cache = QueryEmbeddingCache()
+    return _embedding_cache
+
+
+def retrieval_cache_stats() -> list[dict]:
+    return [get_retrieval_cache().stats(), get_query_embedding_cache().stats()]
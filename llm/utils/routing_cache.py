@@ -0,0 +1,222 @@
+import os
+import json
+import atexit
+import threading
+import numpy as np
+from llm.utils.cache import LRUTTLCache, normalize_query
+from llm.utils.embedding_registry import get_embedding_model, DEFAULT_EMBEDDING_MODEL
+from utils.log import logger
+
+
+ROUTING_CACHE_SIZE = int(os.environ.get("ROUTING_CACHE_SIZE", "1024"))
+ROUTING_CACHE_TTL = float(os.environ.get("ROUTING_CACHE_TTL", "86400"))
+# cosine similarity above which a cached neighbour query is reused, empty disables semantic hits
+ROUTING_CACHE_SEMANTIC_THRESHOLD = os.environ.get("ROUTING_CACHE_SEMANTIC_THRESHOLD", "0.92")
+# directory for the on-disk tier, empty keeps the cache in memory only
+ROUTING_CACHE_DIR = os.environ.get("ROUTING_CACHE_DIR", "")
+# seconds a put waits before the on-disk tier is rewritten, so a burst of decisions is one write off the event loop
+ROUTING_CACHE_SAVE_DELAY = float(os.environ.get("ROUTING_CACHE_SAVE_DELAY", "2"))
+
+
+class RoutingCache:
+    """
+    Cache of routing decisions keyed by normalized query text.
+
+    Lookups hit on the exact normalized query first; when `semantic_threshold` is set, a miss falls
+    back to the most similar cached query by embedding cosine similarity. With `persist_path` the
+    entries are also written to a JSON file and restored on start, so restarts begin warm; writes are
+    debounced by `save_delay` and run on a timer thread, never in the caller.
+    """
+
+    def __init__(self, name: str, max_size: int = ROUTING_CACHE_SIZE, ttl: float = ROUTING_CACHE_TTL,
+                 semantic_threshold: float | None = None, persist_path: str | None = None,
+                 embedding_model_name: str = DEFAULT_EMBEDDING_MODEL, save_delay: float = ROUTING_CACHE_SAVE_DELAY):
+        self.name = name
+        self.semantic_threshold = semantic_threshold
+        self.persist_path = persist_path
+        self.save_delay = save_delay
+        self.embedding_model_name = embedding_model_name
+        self._cache = LRUTTLCache(max_size=max_size, ttl=ttl)
+        self._embeddings = {}
+        self._matrix = None
+        self._matrix_keys = []
+        self._lock = threading.Lock()
+        self._save_timer = None
+        self._save_lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        if persist_path:
+            self._load()
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        model = get_embedding_model(self.embedding_model_name)
+        return np.asarray(model.encode(texts, normalize_embeddings=True), dtype="float32")
+
+    def _semantic_lookup(self, key: str):
+        """Return (most similar cached key or None, its cosine score)."""
+        with self._lock:
+            cached_keys = [k for k, _, _ in self._cache.items()]
+            missing = [k for k in cached_keys if k not in self._embeddings]
+        if not cached_keys:
+            return None, None
+        # cached keys are embedded once, in one batch (e.g. after a restore from disk), outside the lock
+        vectors = self._encode(missing) if missing else []
+        query_vector = self._encode([key])[0]
+        with self._lock:
+            live_keys = [k for k, _, _ in self._cache.items()]
+            live = set(live_keys)
+            self._embeddings.update((k, vector) for k, vector in zip(missing, vectors) if k in live)
+            if len(self._embeddings) > len(live):
+                # keys evicted while we were encoding
+                self._embeddings = {k: vector for k, vector in self._embeddings.items() if k in live}
+            # keys added meanwhile have no embedding yet and join on the next lookup
+            keys = [k for k in live_keys if k in self._embeddings]
+            if not keys:
+                return None, None
+            if self._matrix is None or self._matrix_keys != keys:
+                self._matrix_keys = keys
+                self._matrix = np.vstack([self._embeddings[k] for k in keys])
+            # matrix and keys are taken together so their rows always line up
+            matrix, keys = self._matrix, self._matrix_keys
+        scores = matrix @ query_vector
+        best = int(np.argmax(scores))
+        if scores[best] >= self.semantic_threshold:
+            return keys[best], float(scores[best])
+        return None, float(scores[best])
+
+    def get(self, query: str):
+        key = normalize_query(query)
+        value = self._cache.get(key)
+        if value is not None:
+            self.exact_hits += 1
+            logger.info(f"Routing cache [{self.name}] exact hit for '{key}'")
+            return value
+
+        if self.semantic_threshold is not None:
+            try:
+                neighbour, score = self._semantic_lookup(key)
+            except Exception as e:
+                logger.warning(f"Routing cache [{self.name}] semantic lookup failed: {e}")
+                neighbour, score = None, None
+            if neighbour is not None:
+                value = self._cache.get(neighbour)
+                if value is not None:
+                    self.semantic_hits += 1
+                    logger.info(f"Routing cache [{self.name}] semantic hit '{key}' ~ '{neighbour}' ({score:.3f})")
+                    return value
+
+        self.misses += 1
+        return None
+
+    def put(self, query: str, value):
+        key = normalize_query(query)
+        evicted = self._cache.put(key, value)
+        with self._lock:
+            for k in evicted:
+                self._embeddings.pop(k, None)
+        if self.persist_path:
+            self._schedule_save()
+
+    def _schedule_save(self):
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Write pending entries to the on-disk tier now; run by the debounce timer and at exit."""
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is None:
+            return
+        timer.cancel()
+        self._save()
+
+    def _load(self):
+        if not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            for entry in entries:
+                self._cache.put(entry["key"], entry["value"], created=entry["created"])
+            logger.info(f"Routing cache [{self.name}] restored {len(self._cache)} entries from {self.persist_path}")
+        except Exception as e:
+            logger.warning(f"Routing cache [{self.name}] could not be restored from {self.persist_path}: {e}")
+
+    def _save(self):
+        tmp_path = f"{self.persist_path}.tmp"
+        try:
+            # one writer at a time: a timer save and the exit flush share the tmp file
+            with self._save_lock:
+                entries = [{"key": k, "value": v, "created": created} for k, v, created in self._cache.items()]
+                os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            logger.warning(f"Routing cache [{self.name}] could not be saved to {self.persist_path}: {e}")
+
+    def clear(self):
+        self._cache.clear()
+        with self._lock:
+            self._embeddings.clear()
+            self._matrix = None
+            self._matrix_keys = []
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._cache),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "evictions": self._cache.evictions,
+            "expirations": self._cache.expirations,
+        }
+
+
+def _persist_path(name: str) -> str | None:
+    return os.path.join(ROUTING_CACHE_DIR, f"routing_cache_{name}.json") if ROUTING_CACHE_DIR else None
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def _get_cache(name: str, semantic_threshold: float | None) -> RoutingCache:
+    cache = _caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                cache = _caches[name] = RoutingCache(name, semantic_threshold=semantic_threshold,
+                                                     persist_path=_persist_path(name))
+                if cache.persist_path:
+                    # the debounce timer is a daemon thread, write what it has not saved yet
+                    atexit.register(cache.flush)
+    return cache
+
+
+def get_persona_cache() -> RoutingCache:
+    """Cache of persona choices for the local path."""
+    threshold = float(ROUTING_CACHE_SEMANTIC_THRESHOLD) if ROUTING_CACHE_SEMANTIC_THRESHOLD else None
+    return _get_cache("persona", threshold)
+
+
+def get_route_cache() -> RoutingCache:
+    """
+    Cache of agent/function/parameters decisions for the Gemini path.
+    Exact matches only: parameters such as the diagnostics target come from the query text,
+    so a similar query ("github.com" vs "google.com") must not reuse them.
+    """
+    return _get_cache("route", None)
+
+
+def routing_cache_stats() -> list[dict]:
+    return [cache.stats() for cache in _caches.values()]
@@ -1,17 +1,15 @@
-import ollama
 import re
+import time
+import asyncio
 from llm.utils.tools.tools import AGENT_TOOLS
+from llm.utils.ollama_client import get_ollama_client, DECIDER_TIMEOUT
+from llm.utils.prompts import AGENT_CAPABILITIES
+from llm.utils.fast_router import get_fast_router, FAST_ROUTER_ENABLED
+from llm.utils.routing_cache import get_persona_cache
 from utils.log import logger
 
 def create_selection_prompt(user_query: str) -> str:
-    agent_capabilities = """
-    - fixie: Genel bağlantı sorunu giderme, ISP görüşmesi için hazırlık. Kullanıcı dostu, adım adım çözümler.
-    - bytefix: Teknik kullanıcılar için. DNS, traceroute, ping, paket kaybı gibi websiteleri için teşhis görevlerini yapar. Bir websiteye ping atar, DNS sorgusu yapar, traceroute çalıştırır. Kullanıcıdan hedef hostname veya IP adresi alır.
-    - routerx: Yönlendirme (routing), anahtarlama (switching), VLAN, NAT ve güvenlik duvarı (firewall) konularında uzmandır. LAN/WAN trafiği yönetimi ve QoS (Hizmet Kalitesi) yapılandırmaları üzerinde derin uzmanlığa sahiptir. Ağ altyapısının verimli çalışması için yapılandırma ve optimizasyon çözümleri sunar.
-    - sentinel: Ağ güvenliği, Wi-Fi güvenliği, güvenlik duvarları, IDS/IPS, VPN'ler, siber tehditler (phishing, malware), pratik güvenlik adımları.
-    - hypernet: İnternet hızı optimizasyonu, Wi-Fi yerleşimi/kanalları, hız testleri, gecikme/jitter sorunları, hızlı ve etkili çözümler.
-    - professor_ping: Ağ kavramlarını açıklar (IP, DNS, TCP/IP, subnetting), topoloji çizer, temel başlangıç seviyesi sorun giderme. Eğlenceli, benzetmeler kullanır.
-    """
+    agent_capabilities = "\n".join(f"    - {agent}: {text}" for agent, text in AGENT_CAPABILITIES.items())
 
     return f"""
     Aşağıdaki kullanıcı sorgusu için, belirtilen ajanlar ve yetenekleri arasından en uygun olanı seçin.
@@ -39,15 +37,7 @@ def fallback_to_tool_calls(response) -> str | None:
                 return agent
     return parse_agent_response(response.message.content)
 
-def select_agent(user_query: str, decider_model: str = "gemma3") -> str:
-    prompt = create_selection_prompt(user_query)
-    
-    response = ollama.chat(
-        model=decider_model,
-        messages=[{"role": "user", "content": prompt}],
-        stream=False
-    )
-
+def parse_selection_response(response) -> str | None:
     response_text = response["message"].get("content", "").strip()
     logger.info(f"Response of decider model - {response_text}")
 
@@ -58,6 +48,84 @@ def select_agent(user_query: str, decider_model: str = "gemma3") -> str:
 
     return selected_agent
 
+def fast_path_agent(user_query: str) -> str | None:
+    """Embedding classifier decision, or None when it is not confident (or fails)."""
+    try:
+        return get_fast_router().route(user_query)
+    except Exception as e:
+        logger.warning(f"Fast router failed, using decider model: {e}")
+        return None
+
+def cached_agent(user_query: str) -> str | None:
+    try:
+        return get_persona_cache().get(user_query)
+    except Exception as e:
+        logger.warning(f"Routing cache lookup failed: {e}")
+        return None
+
+def remember_agent(user_query: str, selected_agent: str | None):
+    # only real personas are cached, a bad decider answer must not stick
+    if selected_agent in AGENT_CAPABILITIES:
+        get_persona_cache().put(user_query, selected_agent)
+
+async def select_agent_async(user_query: str, decider_model: str = "gemma3",
+                             timeout: float | None = DECIDER_TIMEOUT, use_fast_path: bool = FAST_ROUTER_ENABLED) -> str | None:
+    """
+    Non-blocking agent selection. Returns None if the decider does not answer within `timeout`
+    seconds; cancelling the caller cancels the pending request.
+    The embedding fast path is tried first and the decider model only runs when it is not confident.
+    """
+    # cache lookup and encoding are CPU bound, keep them off the event loop
+    selected_agent = await asyncio.to_thread(cached_agent, user_query)
+    if selected_agent:
+        logger.info(f"Routing path: cache | agent: {selected_agent}")
+        return selected_agent
+
+    if use_fast_path:
+        selected_agent = await asyncio.to_thread(fast_path_agent, user_query)
+        if selected_agent:
+            remember_agent(user_query, selected_agent)
+            return selected_agent
+
+    prompt = create_selection_prompt(user_query)
+    start = time.perf_counter()
+
+    try:
+        response = await asyncio.wait_for(
+            get_ollama_client().chat(model=decider_model, messages=[{"role": "user", "content": prompt}]),
+            timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"Decider model {decider_model} timed out after {timeout}s selecting an agent.")
+        return None
+
+    logger.info(f"Decider model answered in {1000 * (time.perf_counter() - start):.0f} ms")
+    selected_agent = parse_selection_response(response)
+    remember_agent(user_query, selected_agent)
+    return selected_agent
+
+def select_agent(user_query: str, decider_model: str = "gemma3", use_fast_path: bool = FAST_ROUTER_ENABLED) -> str:
+    """Blocking variant for scripts; use select_agent_async inside the event loop."""
+    selected_agent = cached_agent(user_query)
+    if selected_agent:
+        return selected_agent
+
+    if use_fast_path:
+        selected_agent = fast_path_agent(user_query)
+        if selected_agent:
+            remember_agent(user_query, selected_agent)
+            return selected_agent
+
+    prompt = create_selection_prompt(user_query)
+    
+    response = get_ollama_client().chat_sync(
+        model=decider_model,
+        messages=[{"role": "user", "content": prompt}]
+    )
+
+    selected_agent = parse_selection_response(response)
+    remember_agent(user_query, selected_agent)
+    return selected_agent
 
 if __name__ == "__main__":
     #user_query = "bana ağ güvenliği konseptini açıklayabilir misin?"
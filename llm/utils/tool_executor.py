@@ -0,0 +1,149 @@
+import os
+import time
+import asyncio
+import threading
+import concurrent.futures
+from collections import Counter
+from dataclasses import dataclass
+from llm.utils.cache import LRUTTLCache
+from utils.log import logger
+
+
+# seconds a tool result is reused for identical calls; 0 only coalesces concurrent calls
+TOOL_CACHE_TTLS = {
+    "run_speed_test": float(os.environ.get("SPEEDTEST_CACHE_TTL", "120")),
+    "run_network_diagnostics": float(os.environ.get("DIAGNOSTICS_CACHE_TTL", "30")),
+}
+TOOL_CACHE_SIZE = int(os.environ.get("TOOL_CACHE_SIZE", "256"))
+
+FRESH, CACHED, COALESCED = "fresh", "cached", "coalesced"
+
+
+@dataclass
+class ToolResult:
+    """A tool's value and where it came from: run now (fresh), reused (cached) or shared with a running call (coalesced)."""
+    value: object
+    source: str
+    age_seconds: float = 0.0
+
+    @property
+    def shared(self) -> bool:
+        return self.source != FRESH
+
+
+class _LeaderCancelled(Exception):
+    """The call that was running the tool was cancelled; waiting callers retry."""
+
+
+def normalize_parameters(parameters: dict) -> tuple:
+    """Hashable cache key of tool parameters: sorted, strings trimmed and lower-cased, callables ignored."""
+    items = []
+    for name, value in sorted((parameters or {}).items()):
+        if callable(value):
+            continue
+        if isinstance(value, str):
+            value = value.strip().lower()
+        items.append((name, value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)))
+    return tuple(items)
+
+
+class ToolExecutor:
+    """
+    Runs expensive tools once per (tool, normalized parameters).
+
+    Identical calls that arrive while one is running wait for it (single-flight) instead of starting
+    their own run, also when they come from other threads / event loops (each Streamlit turn has its
+    own loop). Finished results are cached for the tool's TTL. Failures are shared with the waiting
+    calls but never cached.
+    """
+
+    def __init__(self, ttls: dict = None, max_size: int = TOOL_CACHE_SIZE):
+        self.ttls = TOOL_CACHE_TTLS if ttls is None else ttls
+        self._cache = LRUTTLCache(max_size=max_size, ttl=None)
+        self._inflight: dict[tuple, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    async def run(self, tool_name: str, call, parameters: dict = None) -> ToolResult:
+        """`call()` returns an awaitable with the tool's value; it only runs when no cached or running result exists."""
+        key = (tool_name, normalize_parameters(parameters))
+        while True:
+            cached = self._cache.get(key)
+            if cached is not None:
+                value, created = cached
+                self._counts[(tool_name, CACHED)] += 1
+                return ToolResult(value, CACHED, round(time.time() - created, 1))
+
+            with self._lock:
+                future = self._inflight.get(key)
+                leader = future is None
+                if leader:
+                    future = concurrent.futures.Future()
+                    self._inflight[key] = future
+
+            if leader:
+                return await self._lead(tool_name, key, call, future)
+            try:
+                # shield: a waiting caller that goes away must not cancel the shared run
+                value, created = await asyncio.shield(asyncio.wrap_future(future))
+            except _LeaderCancelled:
+                continue
+            self._counts[(tool_name, COALESCED)] += 1
+            logger.info(f"Tool {tool_name} call coalesced with a running call")
+            return ToolResult(value, COALESCED, round(time.time() - created, 1))
+
+    async def _lead(self, tool_name: str, key: tuple, call, future: concurrent.futures.Future) -> ToolResult:
+        try:
+            value = await call()
+        except asyncio.CancelledError:
+            self._finish(key, future, exception=_LeaderCancelled())
+            raise
+        except Exception as e:
+            self._finish(key, future, exception=e)
+            raise
+        created = time.time()
+        ttl = self.ttls.get(tool_name, 0)
+        if ttl > 0:
+            self._cache.put(key, (value, created), ttl=ttl)
+        self._finish(key, future, result=(value, created))
+        self._counts[(tool_name, FRESH)] += 1
+        return ToolResult(value, FRESH)
+
+    def _finish(self, key: tuple, future: concurrent.futures.Future, result=None, exception: BaseException = None):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def invalidate(self, tool_name: str = None):
+        """Drop cached results of one tool, or of every tool."""
+        if tool_name is None:
+            self._cache.clear()
+            return
+        for key, _, _ in self._cache.items():
+            if key[0] == tool_name:
+                self._cache.pop(key)
+
+    def stats(self) -> dict:
+        tools = sorted({tool for tool, _ in self._counts})
+        return {
+            "cache_size": len(self._cache),
+            "in_flight": len(self._inflight),
+            "tools": {tool: {source: self._counts[(tool, source)] for source in (FRESH, CACHED, COALESCED)}
+                      for tool in tools},
+        }
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_tool_executor() -> ToolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ToolExecutor()
+    return _executor
@@ -0,0 +1,204 @@
+import os
+import time
+import asyncio
+import threading
+import concurrent.futures
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from utils.log import logger
+
+
+# tool runs allowed at once per tool; tools not listed share only the global cap
+TOOL_CONCURRENCY = {
+    "run_speed_test": int(os.environ.get("SPEEDTEST_CONCURRENCY", "1")),
+    "run_network_diagnostics": int(os.environ.get("DIAGNOSTICS_CONCURRENCY", "4")),
+}
+TOOL_GLOBAL_CONCURRENCY = int(os.environ.get("TOOL_GLOBAL_CONCURRENCY", "6"))
+# waiting runs beyond this are refused right away instead of queuing without end
+TOOL_QUEUE_LIMIT = int(os.environ.get("TOOL_QUEUE_LIMIT", "64"))
+# seconds a run may wait for a slot before it gives up
+TOOL_QUEUE_TIMEOUT = float(os.environ.get("TOOL_QUEUE_TIMEOUT", "120"))
+
+
+class ToolBusyError(Exception):
+    """A tool run could not get a slot: the queue is full or the wait timed out."""
+
+
+@dataclass
+class ToolContext:
+    """Who is running tools in the current task: the chat session and its progress callback."""
+    session_id: str = ""
+    on_progress: object = None
+
+
+_tool_context: ContextVar[ToolContext] = ContextVar("tool_context", default=ToolContext())
+
+
+def set_tool_context(session_id: str = "", on_progress=None):
+    """Attribute the tool runs of the current task (and tasks it starts) to a session."""
+    _tool_context.set(ToolContext(session_id or "", on_progress))
+
+
+def get_tool_context() -> ToolContext:
+    return _tool_context.get()
+
+
+@dataclass
+class ToolQueued:
+    """Progress notice for a run that waits for a slot, shown to the user instead of a silent wait."""
+    tool_name: str
+    position: int
+
+    def message(self) -> str:
+        return f"{self.tool_name} is queued behind {self.position} other run(s), it starts as soon as a slot is free"
+
+
+@dataclass
+class _Waiter:
+    tool_name: str
+    session_id: str
+    future: concurrent.futures.Future = field(default_factory=concurrent.futures.Future)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class ToolScheduler:
+    """
+    Bounded concurrency for tool runs across all sessions, threads and event loops.
+
+    A run needs a free slot of its tool (TOOL_CONCURRENCY) and of the global cap. Waiting runs are
+    queued per session and sessions are served round-robin, so one session bursting many runs does not
+    delay everyone else. A run that has to wait tells the user through the context's progress callback.
+    """
+
+    def __init__(self, limits: dict = None, global_limit: int = TOOL_GLOBAL_CONCURRENCY,
+                 queue_limit: int = TOOL_QUEUE_LIMIT, queue_timeout: float = TOOL_QUEUE_TIMEOUT):
+        self.limits = TOOL_CONCURRENCY if limits is None else limits
+        self.global_limit = global_limit
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._running = Counter()
+        self._queues: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+        self._waits = deque(maxlen=512)
+        self._counts = Counter()
+
+    def _has_slot(self, tool_name: str) -> bool:
+        return (sum(self._running.values()) < self.global_limit
+                and self._running[tool_name] < self.limits.get(tool_name, self.global_limit))
+
+    def _queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _dispatch(self):
+        """Hand free slots to waiting runs, one session at a time in turn. Caller holds the lock."""
+        progress = True
+        while progress and self._queues:
+            progress = False
+            for session_id in list(self._queues):
+                queue = self._queues[session_id]
+                waiter = next((w for w in queue if self._has_slot(w.tool_name)), None)
+                if waiter is None:
+                    continue
+                queue.remove(waiter)
+                # served: this session goes to the back of the line
+                self._queues.move_to_end(session_id)
+                if not queue:
+                    del self._queues[session_id]
+                self._running[waiter.tool_name] += 1
+                self._waits.append(time.perf_counter() - waiter.enqueued_at)
+                waiter.future.set_result(None)
+                progress = True
+                break
+
+    def _remove(self, waiter: _Waiter):
+        queue = self._queues.get(waiter.session_id)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[waiter.session_id]
+
+    async def acquire(self, tool_name: str, session_id: str = None, on_progress=None):
+        context = get_tool_context()
+        session_id = context.session_id if session_id is None else session_id
+        on_progress = context.on_progress if on_progress is None else on_progress
+        with self._lock:
+            if not self._queues and self._has_slot(tool_name):
+                self._running[tool_name] += 1
+                self._counts["started"] += 1
+                self._waits.append(0.0)
+                return
+            if self._queued() >= self.queue_limit:
+                self._counts["rejected"] += 1
+                raise ToolBusyError(f"Too many tool runs are waiting ({self._queued()}), {tool_name} was not started")
+            waiter = _Waiter(tool_name, session_id)
+            self._queues.setdefault(session_id, deque()).append(waiter)
+            position = self._queued() - 1
+            self._counts["queued"] += 1
+            self._dispatch()
+
+        if not waiter.future.done():
+            logger.info(f"Tool {tool_name} queued for session {session_id or '-'} behind {position} run(s)")
+            if on_progress is not None:
+                update = on_progress(ToolQueued(tool_name, position))
+                if asyncio.iscoroutine(update):
+                    await update
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(waiter.future)), self.queue_timeout)
+        except BaseException as e:
+            with self._lock:
+                if waiter.future.done():
+                    # the slot was granted as we gave up: hand it on
+                    self._running[tool_name] -= 1
+                    self._dispatch()
+                else:
+                    self._remove(waiter)
+                    waiter.future.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                self._counts["timed_out"] += 1
+                raise ToolBusyError(f"{tool_name} waited {self.queue_timeout:g}s for a free slot") from e
+            raise
+        self._counts["started"] += 1
+
+    def release(self, tool_name: str):
+        with self._lock:
+            self._running[tool_name] -= 1
+            self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, tool_name: str, session_id: str = None, on_progress=None):
+        """`async with scheduler.slot("run_speed_test"):` runs the block once a slot is free."""
+        await self.acquire(tool_name, session_id, on_progress)
+        try:
+            yield
+        finally:
+            self.release(tool_name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            queued_by_tool = Counter(w.tool_name for queue in self._queues.values() for w in queue)
+            return {
+                "running": {tool: count for tool, count in self._running.items() if count},
+                "queue_depth": self._queued(),
+                "queued_by_tool": dict(queued_by_tool),
+                "queued_sessions": len(self._queues),
+                "wait_avg_s": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "wait_p95_s": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+                "wait_max_s": round(waits[-1], 3) if waits else 0.0,
+                **{name: self._counts[name] for name in ("started", "queued", "rejected", "timed_out")},
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_tool_scheduler() -> ToolScheduler:
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = ToolScheduler()
+    return _scheduler
@@ -1,18 +1,38 @@
-import subprocess
+import os
+import sys
 import json
-import platform
+import time
 import shutil
-import sys
+import asyncio
+import platform
+from llm.utils.tools import probes
+from llm.utils.tool_executor import get_tool_executor
+from llm.utils.tool_scheduler import ToolBusyError, get_tool_scheduler
 from utils.log import logger
 
 
+# seconds each diagnostic probe may run before it is killed and reported as timed out
+PROBE_TIMEOUTS = {
+    "ping": float(os.environ.get("PING_TIMEOUT", "10")),
+    "traceroute": float(os.environ.get("TRACEROUTE_TIMEOUT", "30")),
+    "nslookup": float(os.environ.get("NSLOOKUP_TIMEOUT", "10")),
+}
+# "native" probes in-process (DNS, TCP connect, ICMP, UDP traceroute), falling back per probe to
+# the ping / traceroute binaries; "subprocess" always uses the binaries
+PROBE_ENGINE = os.environ.get("BYTEFIX_PROBE_ENGINE", "native")
+# port whose TCP connect time is measured by the native engine
+TCP_PROBE_PORT = int(os.environ.get("TCP_PROBE_PORT", "443"))
+
+
 async def run_command(command):
     """Run a shell command and return the result."""
-    try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, check=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        return f"Error: {e.stderr}"
+    process = await asyncio.create_subprocess_shell(
+        command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        return f"Error: {stderr.decode(errors='replace')}"
+    return stdout.decode(errors="replace")
 
 async def install_packages():
     """Install required system packages based on the operating system."""
@@ -24,12 +44,12 @@ async def install_packages():
         distro = platform.freedesktop_os_release().get("ID", "").lower()
         if distro in ["ubuntu", "debian"]:
             logger.info("Detected Ubuntu/Debian. Installing packages with apt...")
-            logger.info(run_command("sudo apt update"))
-            logger.info(run_command(f"sudo apt install -y traceroute {dns_package} {' '.join(packages)}"))
+            logger.info(await run_command("sudo apt update"))
+            logger.info(await run_command(f"sudo apt install -y traceroute {dns_package} {' '.join(packages)}"))
         elif distro in ["centos", "rhel", "fedora"]:
             logger.info("Detected CentOS/RHEL/Fedora. Installing packages with yum/dnf...")
-            logger.info(run_command("sudo yum install -y epel-release"))
-            logger.info(run_command(f"sudo yum install -y traceroute bind-utils {' '.join(packages)}"))
+            logger.info(await run_command("sudo yum install -y epel-release"))
+            logger.info(await run_command(f"sudo yum install -y traceroute bind-utils {' '.join(packages)}"))
         else:
             logger.info("Unsupported Linux distribution. Please install packages manually.")
             sys.exit(1)
@@ -37,8 +57,8 @@ async def install_packages():
         logger.info("Detected macOS. Installing packages with Homebrew...")
         if not shutil.which("brew"):
             logger.info("Installing Homebrew...")
-            logger.info(run_command('/bin/bash -c "$(curl -fsSL https://raw.githubusercontent.com/Homebrew/install/HEAD/install.sh)"'))
-        logger.info(run_command(f"brew install {' '.join(packages)}"))
+            logger.info(await run_command('/bin/bash -c "$(curl -fsSL https://raw.githubusercontent.com/Homebrew/install/HEAD/install.sh)"'))
+        logger.info(await run_command(f"brew install {' '.join(packages)}"))
     else:
         logger.info("Unsupported OS. For Windows, use WSL or install tools manually.")
         sys.exit(1)
@@ -49,32 +69,134 @@ async def check_tools():
     missing = [tool for tool in tools if not shutil.which(tool)]
     if missing:
         logger.info(f"Missing tools: {', '.join(missing)}. Installing...")
-        install_packages()
+        await install_packages()
     else:
         logger.info("All required tools are installed.")
 
-async def run_network_diagnostics(target: str) -> str:
-    """Execute ping, traceroute, and nslookup for the target."""
-    try:
-        ping_result = subprocess.run(["ping", "-c", "4", target], capture_output=True, text=True, check=True).stdout
-        logger.info(f"Ping result is ready.")
+def probe_commands(target: str) -> dict[str, list[str]]:
+    """argv of each diagnostic probe for a target."""
+    return {
+        "ping": ["ping", "-c", "4", target],
         # max hops set to 15
-        traceroute_result = subprocess.run(["traceroute", "-m", "15", target], capture_output=True, text=True, check=True).stdout
-        logger.info(f"Traceroute result is ready.")
-        nslookup_result = subprocess.run(["nslookup", target], capture_output=True, text=True, check=True).stdout
-        logger.info(f"Nslookup result is ready.")
-        result = {
-            "ping": ping_result,
-            "traceroute": traceroute_result,
-            "nslookup": nslookup_result
-        }
-        return json.dumps(result, indent=2, ensure_ascii=False)
-    except subprocess.CalledProcessError as e:
-        return json.dumps({"error": f"Command failed: {e.stderr}"}, ensure_ascii=False)
-    except FileNotFoundError as e:
-        return json.dumps({"error": f"Command not found: {str(e)}"}, ensure_ascii=False)
+        "traceroute": ["traceroute", "-m", "15", target],
+        "nslookup": ["nslookup", target],
+    }
+
+
+async def _collect(stream: asyncio.StreamReader, lines: list[str]):
+    async for line in stream:
+        lines.append(line.decode("utf-8", errors="replace"))
+
+
+async def run_probe(command: list[str], timeout: float) -> dict:
+    """
+    Run one probe without blocking the event loop. Output is collected line by line, so a probe that
+    times out still returns what it printed (e.g. the first traceroute hops). The process is killed on
+    timeout and on cancellation.
+    """
+    start = time.perf_counter()
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError:
+        return {"status": "missing", "output": "", "error": f"Command not found: {command[0]}", "seconds": 0.0}
+    except OSError as e:
+        # e.g. not executable by this user
+        return {"status": "error", "output": "", "error": str(e), "seconds": 0.0}
+
+    stdout, stderr = [], []
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(_collect(process.stdout, stdout), _collect(process.stderr, stderr), process.wait()),
+            timeout=timeout,
+        )
+    except asyncio.TimeoutError:
+        status = "timeout"
+    else:
+        status = "ok" if process.returncode == 0 else "error"
+    finally:
+        # timed out, or the caller went away: do not leave the probe running
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    result = {"status": status, "output": "".join(stdout), "seconds": round(time.perf_counter() - start, 2)}
+    if status == "timeout":
+        result["error"] = f"Timed out after {timeout:g}s"
+    elif status == "error":
+        result["error"] = "".join(stderr).strip() or f"Exit code {process.returncode}"
+    return result
+
+
+async def _subprocess_diagnostics(target: str) -> dict:
+    commands = probe_commands(target)
+    results = await asyncio.gather(*(run_probe(command, PROBE_TIMEOUTS[name]) for name, command in commands.items()))
+    return dict(zip(commands, results))
+
+
+async def _native_or_subprocess(name: str, probe, target: str) -> dict:
+    """Result of a native probe, or of its binary when the probe is not possible here (no ICMP rights, not Linux)."""
+    try:
+        return (await asyncio.wait_for(probe, PROBE_TIMEOUTS[name])).to_dict()
+    except (PermissionError, NotImplementedError, OSError) as e:
+        logger.info(f"Native {name} unavailable ({e}), falling back to the {name} binary")
+    except asyncio.TimeoutError:
+        return {"status": "timeout", "error": f"Timed out after {PROBE_TIMEOUTS[name]:g}s"}
+    return {"engine": "subprocess", **await run_probe(probe_commands(target)[name], PROBE_TIMEOUTS[name])}
+
+
+async def _native_diagnostics(target: str) -> dict:
+    dns = await probes.resolve(target, timeout=PROBE_TIMEOUTS["nslookup"])
+    result = {"dns": dns.to_dict()}
+    if not dns.addresses:
+        return result
+    address = dns.addresses[0]
+    ping, tcp, trace = await asyncio.gather(
+        _native_or_subprocess("ping", probes.icmp_ping(address), target),
+        _native_or_subprocess("ping", probes.tcp_ping(address, TCP_PROBE_PORT), target),
+        _native_or_subprocess("traceroute", probes.traceroute(address), target),
+    )
+    result.update(ping=ping, tcp=tcp, traceroute=trace)
+    return result
+
+
+async def _diagnose(target: str, engine: str) -> dict:
+    # bounded with the other sessions' probes (DIAGNOSTICS_CONCURRENCY / TOOL_GLOBAL_CONCURRENCY)
+    async with get_tool_scheduler().slot("run_network_diagnostics"):
+        return await (_native_diagnostics(target) if engine == "native" else _subprocess_diagnostics(target))
+
+
+async def run_network_diagnostics(target: str = None, engine: str = None) -> str:
+    """
+    Diagnose a target concurrently: DNS resolution, latency (ICMP and TCP connect) and the route.
+    Every probe has its own timeout, and a failed or timed-out probe does not discard the results of
+    the others. The native engine returns compact statistics (RTT min/avg/max/jitter, loss %, hops);
+    the subprocess engine returns the raw output of ping, traceroute and nslookup.
+    """
+    target = target.strip() if isinstance(target, str) else ""
+    # a leading "-" would be parsed as an option by ping / traceroute
+    if not target or target.startswith("-"):
+        return json.dumps({"error": f"Invalid diagnostics target: {target!r}"}, ensure_ascii=False)
+    engine = engine or PROBE_ENGINE
+    start = time.perf_counter()
+    # the same host asked again within DIAGNOSTICS_CACHE_TTL, or by another session meanwhile, is probed once
+    try:
+        shared = await get_tool_executor().run("run_network_diagnostics", lambda: _diagnose(target, engine),
+                                               {"target": target, "engine": engine})
+    except ToolBusyError as e:
+        logger.warning(f"Network diagnostics for {target} not started: {e}")
+        return json.dumps({"target": target, "status": "busy", "error": f"Diagnostics are busy, try again shortly: {e}"},
+                          ensure_ascii=False)
     except Exception as e:
+        logger.error(f"Network diagnostics for {target} failed: {e}")
         return json.dumps({"error": str(e)}, ensure_ascii=False)
+    result = {"target": target, "engine": engine, "source": shared.source, **shared.value}
+    if shared.shared:
+        result["age_s"] = shared.age_seconds
+    logger.info(f"Network diagnostics for {target} ({engine}, {shared.source}) ready in "
+                f"{time.perf_counter() - start:.2f}s.")
+    return json.dumps(result, indent=2, ensure_ascii=False)
 
 async def main():
     await check_tools()
@@ -84,5 +206,4 @@ async def main():
     print(result)
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,191 @@
+import os
+import re
+import json
+import math
+
+
+# prompt tokens a single tool result may take after compaction
+TOOL_OUTPUT_TOKEN_BUDGET = int(os.environ.get("TOOL_OUTPUT_TOKEN_BUDGET", "300"))
+# a hop whose latency is this much above the previous answering hop is reported as slow
+SLOW_HOP_MS = float(os.environ.get("SLOW_HOP_MS", "50"))
+
+DIAGNOSTICS_TOOLS = ("run_network_diagnostics", "bytefix_run_network_diagnostics")
+SPEED_TEST_TOOLS = ("run_speed_test",)
+# retrieved passages and diagrams are content the model must use as-is, never summarized or cut
+PASSTHROUGH_TOOLS = ("call_rag_tool", "draw_topology_diagram")
+# run_network_diagnostics keys that describe the run rather than a probe
+_DIAGNOSTICS_INFO = ("target", "engine", "source", "age_s", "status", "error")
+
+_PING_PACKETS = re.compile(r"(\d+) packets transmitted, (\d+) (?:packets )?received.*?([\d.]+)% packet loss")
+_PING_RTT = re.compile(r"(?:rtt|round-trip) min/avg/max/(?:mdev|stddev) = ([\d.]+)/([\d.]+)/([\d.]+)/([\d.]+)")
+_HOP_LINE = re.compile(r"^\s*(\d+)\s+(.*)$")
+_HOP_ADDRESS = re.compile(r"\(([0-9a-fA-F:.]+)\)")
+_HOP_RTT = re.compile(r"([\d.]+)\s*ms")
+_SPEED = {
+    "download_mbps": re.compile(r"Download(?: Speed)?:\s*([\d.]+)", re.IGNORECASE),
+    "upload_mbps": re.compile(r"Upload(?: Speed)?:\s*([\d.]+)", re.IGNORECASE),
+    "ping_ms": re.compile(r"Ping:\s*([\d.]+)", re.IGNORECASE),
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt-token count of tool output (~4 characters per token for JSON and numbers)."""
+    return math.ceil(len(text) / 4)
+
+
+def to_json(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def parse_ping(output: str) -> dict:
+    """Packet counts, loss and RTT statistics from Linux / macOS ping output."""
+    result = {}
+    packets = _PING_PACKETS.search(output)
+    if packets:
+        result.update(sent=int(packets.group(1)), received=int(packets.group(2)), loss_pct=float(packets.group(3)))
+    rtt = _PING_RTT.search(output)
+    if rtt:
+        low, avg, high, deviation = (float(value) for value in rtt.groups())
+        result.update(min_ms=low, avg_ms=avg, max_ms=high, jitter_ms=deviation)
+    return result
+
+
+def parse_traceroute(output: str) -> list[list]:
+    """[ttl, address or "*", best rtt in ms or None] per hop of traceroute output."""
+    hops = []
+    for line in output.splitlines():
+        match = _HOP_LINE.match(line)
+        if not match:
+            continue
+        rest = match.group(2)
+        address = _HOP_ADDRESS.search(rest)
+        if address:
+            address = address.group(1)
+        else:
+            # "10.0.0.1  5.1 ms * 5.0 ms": what is left after removing the times and "*"
+            tokens = [token for token in _HOP_RTT.sub("", rest).split() if token != "*"]
+            address = tokens[0] if tokens else None
+        rtts = [float(value) for value in _HOP_RTT.findall(rest)]
+        hops.append([int(match.group(1)), address or "*", min(rtts) if rtts else None])
+    return hops
+
+
+def parse_nslookup(output: str) -> dict:
+    """Server, resolved addresses and lookup error from nslookup output."""
+    result = {"addresses": []}
+    in_answer = False
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith("Server:"):
+            result["server"] = line.split(":", 1)[1].strip()
+        elif line.startswith("Name:"):
+            in_answer = True
+        elif line.startswith("Address") and in_answer:
+            result["addresses"].append(line.split(":", 1)[1].strip())
+        elif line.startswith("**"):
+            result["error"] = line.strip("* ").split(": ")[-1]
+    return result
+
+
+def parse_speed_test(output: str) -> dict:
+    result = {}
+    for key, pattern in _SPEED.items():
+        match = pattern.search(output)
+        if match:
+            result[key] = float(match.group(1))
+    return result
+
+
+def summarize_hops(hops: list[list], reached: bool = None) -> dict:
+    """Route summary: hop count, destination reached, the last hop, silent hops and latency jumps."""
+    summary = {"hops": len(hops)}
+    if reached is not None:
+        summary["reached"] = reached
+    if hops:
+        summary["last"] = hops[-1]
+    silent = [hop[0] for hop in hops if hop[1] == "*"]
+    if silent:
+        summary["no_reply"] = silent
+    slow, previous = [], None
+    for hop in hops:
+        if hop[2] is None:
+            continue
+        if previous is not None and hop[2] - previous >= SLOW_HOP_MS:
+            slow.append(hop)
+        previous = hop[2]
+    if slow:
+        summary["slow"] = slow
+    return summary
+
+
+def _compact_probe(name: str, probe) -> list[dict]:
+    """Compaction candidates of one probe result, most detailed first."""
+    if not isinstance(probe, dict):
+        return [{"output": str(probe)}]
+    status = {key: probe[key] for key in ("status", "error") if key in probe and probe.get("status") != "ok"}
+    if "output" in probe:
+        # raw binary output from the subprocess engine
+        output = probe["output"]
+        if name == "ping":
+            return [{**parse_ping(output), **status}]
+        if name == "traceroute":
+            hops = parse_traceroute(output)
+            return [{"route": hops, **status}, {**summarize_hops(hops), **status}]
+        if name == "nslookup":
+            return [{**parse_nslookup(output), **status}]
+        return [status]
+    if "hops" in probe and isinstance(probe["hops"], list):
+        summary = summarize_hops(probe["hops"], probe.get("reached"))
+        return [{"reached": probe.get("reached"), "route": probe["hops"]}, summary]
+    return [{key: value for key, value in probe.items() if key not in ("target", "name")}]
+
+
+def compact_diagnostics(result) -> list[dict]:
+    """Candidates for run_network_diagnostics output (either engine), from most to least detailed."""
+    if isinstance(result, str):
+        try:
+            result = json.loads(result)
+        except json.JSONDecodeError:
+            return [{"output": result}]
+    if not isinstance(result, dict) or "error" in result and len(result) == 1:
+        return [result]
+    base = {key: result[key] for key in _DIAGNOSTICS_INFO if key in result and key != "engine"}
+    probes = {name: _compact_probe(name, probe) for name, probe in result.items() if name not in _DIAGNOSTICS_INFO}
+    # first every probe at full detail, then every probe at its shortest form
+    detailed = {**base, **{name: options[0] for name, options in probes.items()}}
+    shortest = {**base, **{name: options[-1] for name, options in probes.items()}}
+    return [detailed, shortest] if shortest != detailed else [detailed]
+
+
+def truncate_to_budget(text: str, budget: int) -> str:
+    limit = budget * 4
+    return text if len(text) <= limit else text[:max(0, limit - 1)] + "…"
+
+
+def compact_tool_output(tool_name: str, output, budget: int = TOOL_OUTPUT_TOKEN_BUDGET) -> str:
+    """
+    Compact, structured summary of a tool result for the prompt: parsed statistics instead of raw
+    command output, reduced further (and finally truncated) until it fits `budget` tokens.
+    """
+    if tool_name in PASSTHROUGH_TOOLS:
+        return output if isinstance(output, str) else to_json(output)
+    if tool_name in DIAGNOSTICS_TOOLS:
+        candidates = compact_diagnostics(output)
+    elif tool_name in SPEED_TEST_TOOLS and isinstance(output, str):
+        parsed = parse_speed_test(output)
+        candidates = [parsed] if parsed else [output]
+    else:
+        candidates = [output]
+    for candidate in candidates:
+        text = candidate if isinstance(candidate, str) else to_json(candidate)
+        if estimate_tokens(text) <= budget:
+            return text
+    return truncate_to_budget(text, budget)
+
+
+def compact_results(results, budget: int = TOOL_OUTPUT_TOKEN_BUDGET) -> str:
+    """Compact a {function_name: output} mapping (as AgentRouter passes results) into one prompt string."""
+    if not isinstance(results, dict):
+        return truncate_to_budget(str(results), budget)
+    parts = {name: compact_tool_output(name, output, budget) for name, output in results.items()}
+    return "\n".join(f"{name}: {text}" for name, text in parts.items())
@@ -1,7 +1,8 @@
-import ollama
 import re
 import json
+import asyncio
 from typing import Tuple, Optional, Dict, Any
+from llm.utils.ollama_client import get_ollama_client, DECIDER_TIMEOUT
 from utils.log import logger
 
 
@@ -22,18 +23,10 @@ def create_tool_selection_prompt(user_query: str) -> str:
 """
 
 
-def select_bytefix_tool(user_query: str, decider_model: str = "gemma3") -> Optional[Tuple[str, Optional[Dict[str, Any]]]]:
+def parse_tool_selection(response_text: str) -> Optional[Tuple[str, Optional[Dict[str, Any]]]]:
     """
-    Selects the appropriate Bytefix tool based on the user's query.
+    Parses the decider model answer into (tool_name, parameters).
     """
-    # prompt and model response
-    prompt = create_tool_selection_prompt(user_query)
-    response = ollama.chat(
-        model=decider_model,
-        messages=[{"role": "user", "content": prompt}],
-        stream=False
-    )
-    response_text = response["message"].get("content", "").strip()
     logger.info(f"Response of decider model - {response_text}")
     
     # tool name
@@ -68,4 +61,35 @@ def select_bytefix_tool(user_query: str, decider_model: str = "gemma3") -> Optio
         logger.warning("No valid Bytefix tool selected.")
         return None
     
-    return selected_tool, parameters
\ No newline at end of file
+    return selected_tool, parameters
+
+
+async def select_bytefix_tool_async(user_query: str, decider_model: str = "gemma3",
+                                    timeout: Optional[float] = DECIDER_TIMEOUT) -> Optional[Tuple[str, Optional[Dict[str, Any]]]]:
+    """
+    Non-blocking Bytefix tool selection. Returns None on decider timeout; cancellation propagates.
+    """
+    prompt = create_tool_selection_prompt(user_query)
+    try:
+        response = await asyncio.wait_for(
+            get_ollama_client().chat(model=decider_model, messages=[{"role": "user", "content": prompt}]),
+            timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"Decider model {decider_model} timed out after {timeout}s selecting a Bytefix tool.")
+        return None
+    return parse_tool_selection(response["message"].get("content", "").strip())
+
+
+def select_bytefix_tool(user_query: str, decider_model: str = "gemma3") -> Optional[Tuple[str, Optional[Dict[str, Any]]]]:
+    """
+    Selects the appropriate Bytefix tool based on the user's query.
+    Blocking variant for scripts; use select_bytefix_tool_async inside the event loop.
+    """
+    # prompt and model response
+    prompt = create_tool_selection_prompt(user_query)
+    response = get_ollama_client().chat_sync(
+        model=decider_model,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    return parse_tool_selection(response["message"].get("content", "").strip())
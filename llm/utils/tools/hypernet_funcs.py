@@ -1,24 +1,76 @@
-import speedtest
+import asyncio
+from llm.utils.tools.speedtest_engine import PHASES, SPEEDTEST_SERVER_URL, SpeedTestProgress, SpeedTestResult, \
+    get_speed_test
+from llm.utils.tool_executor import get_tool_executor, COALESCED
+from llm.utils.tool_scheduler import ToolBusyError, get_tool_scheduler
 from utils.log import logger
 
 
-async def run_speed_test(query: str) -> str | None:    
+class SpeedTestIncomplete(Exception):
+    """The speed test failed after some phases finished; `result` holds those phases."""
+
+    def __init__(self, result: SpeedTestResult, cause: Exception):
+        super().__init__(str(cause))
+        self.result = result
+
+
+async def _notify(on_progress, progress: SpeedTestProgress):
+    if on_progress is not None:
+        update = on_progress(progress)
+        if asyncio.iscoroutine(update):
+            await update
+
+
+async def measure_speed(on_progress=None, server_url: str = None) -> SpeedTestResult:
+    result = SpeedTestResult()
     try:
-        st = speedtest.Speedtest()
-        st.get_best_server()
-        download_speed = st.download() / 1_000_000  # Mbps
-        upload_speed = st.upload() / 1_000_000      # Mbps
-        ping = st.results.ping
-
-        speedtest_results = f"""User: {query}
-        Internet Speed Test Results:
-        - Download Speed: {download_speed:.2f} Mbps
-        - Upload Speed: {upload_speed:.2f} Mbps
-        - Ping: {ping:.2f} ms
-        """
-        logger.info(speedtest_results.strip())
-        return speedtest_results.strip()
+        async with get_tool_scheduler().slot("run_speed_test", on_progress=on_progress):
+            async for progress in get_speed_test(server_url).phases():
+                result = progress.result
+                logger.info(f"Speed test {progress.message()}")
+                await _notify(on_progress, progress)
+    except asyncio.CancelledError:
+        logger.info("Speed test cancelled.")
+        raise
+    except Exception as e:
+        if result.ping_ms is None:
+            raise
+        raise SpeedTestIncomplete(result, e) from e
+    return result
+
 
+async def run_speed_test(query: str, on_progress=None, server_url: str = None) -> str | None:
+    """
+    Run the speed test off the event loop. `on_progress` (sync or async) receives a SpeedTestProgress
+    after latency, download and upload, so the chat can show partial results while the test runs.
+    Cancelling the calling task stops the test. Concurrent requests share one measurement and a
+    recent result is reused (SPEEDTEST_CACHE_TTL), so parallel tests do not saturate the link they measure.
+    """
+    server_url = SPEEDTEST_SERVER_URL if server_url is None else server_url
+    try:
+        shared = await get_tool_executor().run("run_speed_test", lambda: measure_speed(on_progress, server_url),
+                                               {"server_url": server_url})
+    except asyncio.CancelledError:
+        raise
+    except ToolBusyError as e:
+        logger.warning(f"Speedtest not started: {e}")
+        return f"Internet speed test is busy right now ({e}). Please try again in a moment."
+    except SpeedTestIncomplete as e:
+        logger.error(f"Speedtest failed: {e}")
+        # keep the phases that finished
+        return f"{e.result.to_text(query)}\n(Speed test stopped early: {e})"
     except Exception as e:
         logger.error(f"Speedtest failed: {e}")
         return "Internet speed test failed."
+
+    result = shared.value
+    speedtest_results = result.to_text(query)
+    if shared.shared:
+        # replay the phases for callers that did not run the measurement themselves
+        for phase in PHASES:
+            await _notify(on_progress, SpeedTestProgress(phase, result))
+        origin = "a test running at the same time" if shared.source == COALESCED else \
+            f"a test {shared.age_seconds:.0f}s ago"
+        speedtest_results += f"\n- Result: shared from {origin}"
+    logger.info(speedtest_results)
+    return speedtest_results
@@ -0,0 +1,380 @@
+import os
+import sys
+import time
+import random
+import socket
+import struct
+import asyncio
+import ipaddress
+from dataclasses import dataclass, field
+from utils.log import logger
+
+
+DNS_PORT = 53
+RESOLV_CONF = "/etc/resolv.conf"
+# first destination port of UDP traceroute probes (one port per hop, like traceroute(8))
+TRACEROUTE_BASE_PORT = 33434
+
+_QTYPES = {"A": 1, "AAAA": 28}
+_RCODES = {0: "NOERROR", 1: "FORMERR", 2: "SERVFAIL", 3: "NXDOMAIN", 4: "NOTIMP", 5: "REFUSED"}
+
+# Linux delivers ICMP errors for a UDP socket on its error queue when IP_RECVERR is set
+_IP_RECVERR = getattr(socket, "IP_RECVERR", 11)
+_MSG_ERRQUEUE = getattr(socket, "MSG_ERRQUEUE", 0x2000)
+_ICMP_ECHO_REQUEST, _ICMP_ECHO_REPLY = 8, 0
+_ICMP_DEST_UNREACH, _ICMP_TIME_EXCEEDED = 3, 11
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+@dataclass
+class RttStats:
+    """Round-trip times of one probe series; lost probes are counted in `sent` but have no sample."""
+    target: str
+    method: str
+    sent: int = 0
+    samples: list[float] = field(default_factory=list)
+
+    @property
+    def received(self) -> int:
+        return len(self.samples)
+
+    @property
+    def loss_pct(self) -> float:
+        return round(100.0 * (self.sent - self.received) / self.sent, 1) if self.sent else 0.0
+
+    @property
+    def jitter_ms(self) -> float | None:
+        """Mean absolute difference of consecutive samples."""
+        if len(self.samples) < 2:
+            return None
+        diffs = [abs(b - a) for a, b in zip(self.samples, self.samples[1:])]
+        return round(sum(diffs) / len(diffs), 2)
+
+    def to_dict(self) -> dict:
+        result = {"target": self.target, "method": self.method, "sent": self.sent, "received": self.received,
+                  "loss_pct": self.loss_pct}
+        if self.samples:
+            result.update(min_ms=min(self.samples), avg_ms=round(sum(self.samples) / len(self.samples), 2),
+                          max_ms=max(self.samples), jitter_ms=self.jitter_ms)
+        return result
+
+
+@dataclass
+class DnsResult:
+    name: str
+    server: str
+    rtt_ms: float | None
+    addresses: list[str] = field(default_factory=list)
+    rcode: str = "NOERROR"
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "server": self.server, "rtt_ms": self.rtt_ms, "rcode": self.rcode,
+                "addresses": self.addresses}
+
+
+@dataclass
+class Hop:
+    ttl: int
+    address: str | None = None
+    rtt_ms: float | None = None
+
+
+@dataclass
+class TraceResult:
+    target: str
+    hops: list[Hop] = field(default_factory=list)
+    reached: bool = False
+
+    def to_dict(self) -> dict:
+        # [ttl, address, rtt_ms] rows, "*" for hops that did not answer
+        return {"target": self.target, "reached": self.reached,
+                "hops": [[hop.ttl, hop.address or "*", hop.rtt_ms] for hop in self.hops]}
+
+
+def is_ip_address(value: str) -> bool:
+    try:
+        ipaddress.ip_address(value)
+        return True
+    except ValueError:
+        return False
+
+
+def system_nameserver(path: str = RESOLV_CONF) -> str | None:
+    """First nameserver in resolv.conf, None when there is none (or no resolv.conf, e.g. Windows)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == "nameserver":
+                    return parts[1]
+    except OSError:
+        pass
+    return None
+
+
+# --- DNS ---------------------------------------------------------------------------------------
+
+def build_dns_query(name: str, qtype: str = "A", query_id: int = 0) -> bytes:
+    """Wire-format question for `name`; raises ValueError (UnicodeError) for empty or over-long labels."""
+    header = struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 0)  # recursion desired, one question
+    labels = name.rstrip(".").encode("idna").split(b".")
+    qname = b"".join(bytes([len(label)]) + label for label in labels) + b"\x00"
+    return header + qname + struct.pack("!HH", _QTYPES[qtype], 1)
+
+
+def _skip_name(packet: bytes, offset: int) -> int:
+    while True:
+        length = packet[offset]
+        if length & 0xC0 == 0xC0:  # compression pointer ends the name
+            return offset + 2
+        if length == 0:
+            return offset + 1
+        offset += 1 + length
+
+
+def parse_dns_response(packet: bytes) -> tuple[int, str, list[str]]:
+    """(query id, rcode name, A / AAAA addresses) of a DNS response."""
+    query_id, flags, questions, answers, _, _ = struct.unpack("!HHHHHH", packet[:12])
+    offset = 12
+    for _ in range(questions):
+        offset = _skip_name(packet, offset) + 4
+    addresses = []
+    for _ in range(answers):
+        offset = _skip_name(packet, offset)
+        rtype, _, _, length = struct.unpack("!HHIH", packet[offset:offset + 10])
+        offset += 10
+        data = packet[offset:offset + length]
+        if rtype == 1 and length == 4:
+            addresses.append(socket.inet_ntop(socket.AF_INET, data))
+        elif rtype == 28 and length == 16:
+            addresses.append(socket.inet_ntop(socket.AF_INET6, data))
+        offset += length
+    rcode = flags & 0x000F
+    return query_id, _RCODES.get(rcode, str(rcode)), addresses
+
+
+class _DnsReply(asyncio.DatagramProtocol):
+    def __init__(self, query_id: int):
+        self.query_id = query_id
+        self.reply = asyncio.get_running_loop().create_future()
+
+    def datagram_received(self, data, addr):
+        # ignore stray datagrams, only the answer to our id completes the query
+        if len(data) >= 12 and int.from_bytes(data[:2], "big") == self.query_id and not self.reply.done():
+            self.reply.set_result(data)
+
+    def error_received(self, exc):
+        if not self.reply.done():
+            self.reply.set_exception(exc)
+
+
+async def dns_query(name: str, server: str = None, port: int = DNS_PORT, qtype: str = "A",
+                    timeout: float = 2.0) -> DnsResult:
+    """Resolve `name` with one UDP query to `server` (default: the system nameserver) and time it."""
+    server = server or system_nameserver()
+    if server is None:
+        raise OSError("No DNS server configured")
+    query_id = random.getrandbits(16)
+    display_server = f"{server}:{port}" if port != DNS_PORT else server
+    try:
+        query = build_dns_query(name, qtype, query_id)
+    except ValueError as e:
+        # "a..b", a label over 63 characters: no server would accept it, answer like one that got it
+        logger.info(f"Not querying malformed DNS name {name!r}: {e}")
+        return DnsResult(name=name, server=display_server, rtt_ms=None, rcode="FORMERR")
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(lambda: _DnsReply(query_id), remote_addr=(server, port))
+    try:
+        start = time.perf_counter()
+        transport.sendto(query)
+        packet = await asyncio.wait_for(protocol.reply, timeout)
+        rtt = time.perf_counter() - start
+    finally:
+        transport.close()
+    _, rcode, addresses = parse_dns_response(packet)
+    return DnsResult(name=name, server=display_server, rtt_ms=_ms(rtt), addresses=addresses, rcode=rcode)
+
+
+async def resolve(name: str, server: str = None, port: int = DNS_PORT, timeout: float = 2.0) -> DnsResult:
+    """
+    Timed resolution of a host name: a direct UDP query, or the system resolver (getaddrinfo, which also
+    reads the hosts file) when no nameserver is configured, the query fails or it returns no address.
+    IP literals resolve to themselves.
+    """
+    if is_ip_address(name):
+        return DnsResult(name=name, server="-", rtt_ms=0.0, addresses=[name])
+    direct = None
+    try:
+        direct = await dns_query(name, server, port, timeout=timeout)
+        if direct.addresses or direct.rcode == "FORMERR":
+            return direct
+    except (OSError, asyncio.TimeoutError) as e:
+        logger.info(f"Direct DNS query for {name} failed ({e or type(e).__name__}), using the system resolver")
+    start = time.perf_counter()
+    try:
+        infos = await asyncio.wait_for(asyncio.get_running_loop().getaddrinfo(name, None, type=socket.SOCK_STREAM),
+                                       timeout)
+    except (socket.gaierror, asyncio.TimeoutError):
+        return direct or DnsResult(name=name, server="system", rtt_ms=_ms(time.perf_counter() - start),
+                                   rcode="NXDOMAIN")
+    except ValueError:
+        # the name cannot be IDNA-encoded (empty or over-long label)
+        return DnsResult(name=name, server="system", rtt_ms=None, rcode="FORMERR")
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    return DnsResult(name=name, server="system", rtt_ms=_ms(time.perf_counter() - start), addresses=addresses)
+
+
+# --- TCP / ICMP latency ------------------------------------------------------------------------
+
+async def tcp_ping(address: str, port: int = 443, count: int = 4, timeout: float = 2.0,
+                   interval: float = 0.2) -> RttStats:
+    """
+    TCP connect latency. A refused connection still answered (RST), so it counts as a sample;
+    only timeouts and unreachable errors count as loss.
+    """
+    stats = RttStats(target=f"{address}:{port}", method="tcp")
+    for attempt in range(count):
+        if attempt:
+            await asyncio.sleep(interval)
+        stats.sent += 1
+        start = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+        except ConnectionRefusedError:
+            stats.samples.append(_ms(time.perf_counter() - start))
+            continue
+        except (OSError, asyncio.TimeoutError):
+            continue
+        stats.samples.append(_ms(time.perf_counter() - start))
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+    return stats
+
+
+def _icmp_checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _icmp_socket() -> tuple[socket.socket, bool]:
+    """Unprivileged ICMP datagram socket (Linux ping_group_range), else a raw socket (root)."""
+    try:
+        return socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP), False
+    except (PermissionError, OSError):
+        return socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP), True
+
+
+async def icmp_ping(address: str, count: int = 4, timeout: float = 2.0, interval: float = 0.2) -> RttStats:
+    """ICMP echo to an IPv4 address; raises PermissionError when neither socket type is allowed."""
+    if ipaddress.ip_address(address).version != 4:
+        raise NotImplementedError("ICMP probes support IPv4 only")
+    sock, raw = _icmp_socket()
+    sock.setblocking(False)
+    loop = asyncio.get_running_loop()
+    ident = os.getpid() & 0xFFFF
+    stats = RttStats(target=address, method="icmp")
+    try:
+        for seq in range(1, count + 1):
+            if seq > 1:
+                await asyncio.sleep(interval)
+            payload = struct.pack("!d", time.perf_counter())
+            header = struct.pack("!BBHHH", _ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+            checksum = _icmp_checksum(header + payload)
+            packet = struct.pack("!BBHHH", _ICMP_ECHO_REQUEST, 0, checksum, ident, seq) + payload
+            stats.sent += 1
+            start = time.perf_counter()
+            sock.sendto(packet, (address, 0))
+            deadline = start + timeout
+            while (remaining := deadline - time.perf_counter()) > 0:
+                try:
+                    data = await asyncio.wait_for(loop.sock_recv(sock, 1024), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if raw:
+                    data = data[(data[0] & 0x0F) * 4:]  # strip the IP header
+                if len(data) < 8:
+                    continue
+                icmp_type, _, _, reply_ident, reply_seq = struct.unpack("!BBHHH", data[:8])
+                # datagram sockets rewrite the identifier, raw sockets see every echo reply on the host
+                if icmp_type == _ICMP_ECHO_REPLY and reply_seq == seq and (not raw or reply_ident == ident):
+                    stats.samples.append(_ms(time.perf_counter() - start))
+                    break
+    finally:
+        sock.close()
+    return stats
+
+
+# --- traceroute ----------------------------------------------------------------------------------
+
+def _read_hop_error(sock: socket.socket) -> tuple[str, int] | None:
+    """(offender address, ICMP type) from the socket error queue, None when it is empty."""
+    try:
+        _, ancdata, _, _ = sock.recvmsg(512, 512, _MSG_ERRQUEUE)
+    except (BlockingIOError, InterruptedError):
+        return None
+    for level, kind, data in ancdata:
+        if level == socket.IPPROTO_IP and kind == _IP_RECVERR and len(data) >= 24:
+            # struct sock_extended_err (16 bytes) followed by the offender's sockaddr_in
+            _, _, icmp_type, _, _, _, _ = struct.unpack("=IBBBBII", data[:16])
+            return socket.inet_ntop(socket.AF_INET, data[20:24]), icmp_type
+    return None
+
+
+async def _trace_hop(address: str, ttl: int, timeout: float) -> tuple[Hop, bool]:
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, ttl)
+        sock.setsockopt(socket.IPPROTO_IP, _IP_RECVERR, 1)
+        sock.connect((address, TRACEROUTE_BASE_PORT + ttl))
+        reply = loop.create_future()
+
+        def on_error():
+            # epoll reports a queued error as readable
+            error = _read_hop_error(sock)
+            if error and not reply.done():
+                reply.set_result(error)
+
+        loop.add_reader(sock.fileno(), on_error)
+        try:
+            start = time.perf_counter()
+            sock.send(b"\x00" * 32)
+            offender, icmp_type = await asyncio.wait_for(reply, timeout)
+            rtt = _ms(time.perf_counter() - start)
+        except asyncio.TimeoutError:
+            return Hop(ttl), False
+        finally:
+            loop.remove_reader(sock.fileno())
+        return Hop(ttl, offender, rtt), icmp_type == _ICMP_DEST_UNREACH or offender == address
+    finally:
+        sock.close()
+
+
+async def traceroute(address: str, max_hops: int = 15, timeout: float = 2.0) -> TraceResult:
+    """
+    UDP traceroute with per-hop latency, every TTL probed at once (like `traceroute -N`), so the
+    whole trace takes about one timeout. Needs Linux IP_RECVERR; IPv4 only.
+    """
+    if not sys.platform.startswith("linux"):
+        raise NotImplementedError("Native traceroute needs Linux IP_RECVERR")
+    if ipaddress.ip_address(address).version != 4:
+        raise NotImplementedError("Native traceroute supports IPv4 only")
+    results = await asyncio.gather(*(_trace_hop(address, ttl, timeout) for ttl in range(1, max_hops + 1)))
+    trace = TraceResult(target=address)
+    for hop, reached in results:
+        trace.hops.append(hop)
+        if reached:
+            trace.reached = True
+            break
+    return trace
@@ -0,0 +1,263 @@
+import os
+import time
+import asyncio
+import argparse
+import threading
+from dataclasses import dataclass, field, asdict
+from urllib.parse import urlsplit, parse_qs
+from llm.utils.lazy import speedtest
+from utils.log import logger
+
+
+# base URL of a local throughput server (python -m llm.utils.tools.speedtest_engine --serve),
+# empty to use the public speedtest.net servers
+SPEEDTEST_SERVER_URL = os.environ.get("SPEEDTEST_SERVER_URL", "")
+SPEEDTEST_DOWNLOAD_BYTES = int(os.environ.get("SPEEDTEST_DOWNLOAD_BYTES", str(50 * 1024 * 1024)))
+SPEEDTEST_UPLOAD_BYTES = int(os.environ.get("SPEEDTEST_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+# parallel connections per direction, a single TCP stream rarely fills a fast link
+SPEEDTEST_CONNECTIONS = int(os.environ.get("SPEEDTEST_CONNECTIONS", "4"))
+SPEEDTEST_LATENCY_SAMPLES = int(os.environ.get("SPEEDTEST_LATENCY_SAMPLES", "5"))
+# seconds a phase may take before the test gives up
+SPEEDTEST_TIMEOUT = float(os.environ.get("SPEEDTEST_TIMEOUT", "60"))
+
+PHASES = ("latency", "download", "upload")
+_CHUNK = 64 * 1024
+_ZEROS = bytes(_CHUNK)
+# the local server never sends more than this per request
+_MAX_SERVER_BYTES = 1 << 30
+
+
+@dataclass
+class SpeedTestResult:
+    server: str = ""
+    ping_ms: float | None = None
+    jitter_ms: float | None = None
+    download_mbps: float | None = None
+    upload_mbps: float | None = None
+
+    def to_dict(self) -> dict:
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+    def to_text(self, query: str = "") -> str:
+        lines = [f"User: {query}", "Internet Speed Test Results:"]
+        if self.server:
+            lines.append(f"- Server: {self.server}")
+        if self.download_mbps is not None:
+            lines.append(f"- Download Speed: {self.download_mbps:.2f} Mbps")
+        if self.upload_mbps is not None:
+            lines.append(f"- Upload Speed: {self.upload_mbps:.2f} Mbps")
+        if self.ping_ms is not None:
+            lines.append(f"- Ping: {self.ping_ms:.2f} ms")
+        return "\n".join(lines)
+
+
+@dataclass
+class SpeedTestProgress:
+    """One finished phase ("latency", "download", "upload") with the results measured so far."""
+    phase: str
+    result: SpeedTestResult = field(default_factory=SpeedTestResult)
+
+    @property
+    def done(self) -> bool:
+        return self.phase == PHASES[-1]
+
+    def message(self) -> str:
+        if self.phase == "latency":
+            return f"Ping: {self.result.ping_ms:.1f} ms ({self.result.server})"
+        if self.phase == "download":
+            return f"Download: {self.result.download_mbps:.1f} Mbps"
+        return f"Upload: {self.result.upload_mbps:.1f} Mbps"
+
+
+def _mbps(n_bytes: int, seconds: float) -> float:
+    return round(n_bytes * 8 / seconds / 1_000_000, 2) if seconds > 0 else 0.0
+
+
+class PublicSpeedTest:
+    """
+    speedtest.net through speedtest-cli. Every blocking phase runs in a worker thread; on
+    cancellation the shared shutdown event stops speedtest-cli's transfer threads.
+    """
+
+    def __init__(self, timeout: float = SPEEDTEST_TIMEOUT):
+        self.timeout = timeout
+
+    async def phases(self):
+        shutdown = threading.Event()
+        result = SpeedTestResult()
+        try:
+            client = await asyncio.wait_for(
+                asyncio.to_thread(speedtest.Speedtest, shutdown_event=shutdown, timeout=10), self.timeout)
+            best = await asyncio.wait_for(asyncio.to_thread(client.get_best_server), self.timeout)
+            result.server = f"{best.get('sponsor', '')} ({best.get('name', '')})".strip()
+            result.ping_ms = round(client.results.ping, 2)
+            yield SpeedTestProgress("latency", result)
+            result.download_mbps = round(await asyncio.wait_for(asyncio.to_thread(client.download), self.timeout)
+                                         / 1_000_000, 2)
+            yield SpeedTestProgress("download", result)
+            result.upload_mbps = round(await asyncio.wait_for(asyncio.to_thread(client.upload), self.timeout)
+                                       / 1_000_000, 2)
+            yield SpeedTestProgress("upload", result)
+        finally:
+            shutdown.set()
+
+
+class HttpSpeedTest:
+    """Latency and throughput against a SpeedTestServer, fully async (no threads) and cancellable."""
+
+    def __init__(self, base_url: str, download_bytes: int = SPEEDTEST_DOWNLOAD_BYTES,
+                 upload_bytes: int = SPEEDTEST_UPLOAD_BYTES, connections: int = SPEEDTEST_CONNECTIONS,
+                 latency_samples: int = SPEEDTEST_LATENCY_SAMPLES, timeout: float = SPEEDTEST_TIMEOUT):
+        url = urlsplit(base_url)
+        self.host = url.hostname or "127.0.0.1"
+        self.port = url.port or 80
+        self.base_url = base_url
+        self.download_bytes = download_bytes
+        self.upload_bytes = upload_bytes
+        self.connections = max(1, connections)
+        self.latency_samples = max(1, latency_samples)
+        self.timeout = timeout
+
+    async def _request(self, method: str, path: str, upload: int = 0) -> int:
+        """Send `upload` bytes, return the number of response body bytes read."""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nConnection: close\r\n"
+            if method == "POST":
+                head += f"Content-Length: {upload}\r\n"
+            writer.write(f"{head}\r\n".encode("ascii"))
+            sent = 0
+            while sent < upload:
+                size = min(_CHUNK, upload - sent)
+                writer.write(_ZEROS[:size])
+                await writer.drain()
+                sent += size
+            status = await reader.readline()
+            if b" 200 " not in status:
+                raise ConnectionError(f"Speed test server answered {status.decode(errors='replace').strip()!r}")
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            received = 0
+            while data := await reader.read(_CHUNK):
+                received += len(data)
+            return received
+        finally:
+            writer.close()
+
+    async def _transfer(self, method: str, total: int) -> float:
+        share = max(1, total // self.connections)
+        path = f"/download?bytes={share}" if method == "GET" else "/upload"
+        start = time.perf_counter()
+        counts = await asyncio.gather(*(self._request(method, path, upload=share if method == "POST" else 0)
+                                        for _ in range(self.connections)))
+        elapsed = time.perf_counter() - start
+        return _mbps(sum(counts) if method == "GET" else share * self.connections, elapsed)
+
+    async def phases(self):
+        result = SpeedTestResult(server=self.base_url)
+        samples = []
+        for _ in range(self.latency_samples):
+            start = time.perf_counter()
+            await asyncio.wait_for(self._request("GET", "/latency"), self.timeout)
+            samples.append((time.perf_counter() - start) * 1000)
+        result.ping_ms = round(min(samples), 2)
+        if len(samples) > 1:
+            result.jitter_ms = round(sum(abs(b - a) for a, b in zip(samples, samples[1:])) / (len(samples) - 1), 2)
+        yield SpeedTestProgress("latency", result)
+        result.download_mbps = await asyncio.wait_for(self._transfer("GET", self.download_bytes), self.timeout)
+        yield SpeedTestProgress("download", result)
+        result.upload_mbps = await asyncio.wait_for(self._transfer("POST", self.upload_bytes), self.timeout)
+        yield SpeedTestProgress("upload", result)
+
+
+def get_speed_test(server_url: str = None):
+    """Local HTTP test server when one is configured, speedtest.net otherwise."""
+    server_url = SPEEDTEST_SERVER_URL if server_url is None else server_url
+    return HttpSpeedTest(server_url) if server_url else PublicSpeedTest()
+
+
+class SpeedTestServer:
+    """
+    Minimal HTTP throughput server for on-prem and CI speed tests:
+    GET /latency (empty body), GET /download?bytes=N (N zero bytes), POST /upload (body discarded).
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> "SpeedTestServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def serve_forever(self):
+        await self.start()
+        logger.info(f"Speed test server listening on {self.url}")
+        async with self._server:
+            await self._server.serve_forever()
+
+    @staticmethod
+    async def _respond(writer, status: str, length: int):
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Length: {length}\r\nContent-Type: application/octet-stream\r\n"
+                     f"Connection: close\r\n\r\n".encode("ascii"))
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = (await reader.readline()).decode("ascii", errors="replace").split()
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("ascii", errors="replace").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if len(request) < 2:
+                return
+            method, target = request[0], urlsplit(request[1])
+            if method == "GET" and target.path == "/latency":
+                await self._respond(writer, "200 OK", 0)
+            elif method == "GET" and target.path == "/download":
+                size = min(int(parse_qs(target.query).get("bytes", ["0"])[0]), _MAX_SERVER_BYTES)
+                await self._respond(writer, "200 OK", size)
+                sent = 0
+                while sent < size:
+                    chunk = min(_CHUNK, size - sent)
+                    writer.write(_ZEROS[:chunk])
+                    await writer.drain()
+                    sent += chunk
+            elif method == "POST" and target.path == "/upload":
+                remaining = int(headers.get("content-length", "0"))
+                while remaining > 0 and (data := await reader.read(min(_CHUNK, remaining))):
+                    remaining -= len(data)
+                await self._respond(writer, "200 OK", 0)
+            else:
+                await self._respond(writer, "404 Not Found", 0)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+if __name__ == "__main__":
+    """Serve the local throughput endpoints, or run one speed test and print each phase."""
+    parser = argparse.ArgumentParser(description="HyperNet speed test engine and local throughput server.")
+    parser.add_argument("--serve", action="store_true", help="run the local HTTP throughput server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--server-url", default=None, help="test against this local server instead of speedtest.net")
+    args = parser.parse_args()
+
+    async def run_once():
+        async for progress in get_speed_test(args.server_url).phases():
+            print(progress.message())
+
+    asyncio.run(SpeedTestServer(args.host, args.port).serve_forever() if args.serve else run_once())
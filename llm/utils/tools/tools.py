@@ -43,7 +43,7 @@ AGENT_TOOLS = {
             "type": "function",
             "function": {
             "name": "draw_topology_diagram",
-            "description": "Creates an ASCII network topology diagram for a given scenario.",
+            "description": "Creates an ASCII network topology diagram for a given scenario, sized by a node count or device kind when given (e.g. \"ring with 8 routers\").",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -0,0 +1,322 @@
+import os
+import re
+import argparse
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from llm.utils.cache import normalize_query
+from llm.utils.lazy import networkx as nx
+from llm.utils.tools.topology_graph import build_star, build_bus, build_ring, build_mesh, build_tree, build_hybrid, \
+    build_full, to_ascii, to_svg
+
+
+# largest node count a parameterized diagram is drawn with
+TOPOLOGY_MAX_NODES = int(os.environ.get("TOPOLOGY_MAX_NODES", "32"))
+TOPOLOGY_CACHE_SIZE = int(os.environ.get("TOPOLOGY_CACHE_SIZE", "256"))
+TOPOLOGY_FORMATS = ("ascii", "svg")
+
+# normalize_query already folds every i variant, the other Turkish letters fold here
+_TURKISH_FOLD = str.maketrans("çğöşüâîû", "cgosuaiu")
+_COUNT = re.compile(r"(?<![\w.:/])(\d{1,3})(?![\d.])")
+# "named Web, DB and Cache", "labels: R1, R2", "isimleri Web, DB ve Cache"
+_LABELS = re.compile(r"\b(?:named|called|labell?ed|labels?|isimleri|adları)\s*:?\s+(.+)", re.IGNORECASE)
+_LABEL_SPLIT = re.compile(r"\s*(?:[,;]|\band\b|\bve\b)\s*", re.IGNORECASE)
+
+
+def fold(text: str) -> str:
+    """Lower-case, ASCII-folded form of Turkish and English text that scenarios and keywords are matched in."""
+    return normalize_query(text).translate(_TURKISH_FOLD)
+
+
+class KeywordMatcher:
+    """
+    Aho–Corasick automaton over many keywords: one pass over the text finds every occurrence.
+
+    A match must start at a word start. Keywords added with `suffixes=True` (Turkish stems such as
+    "halka" for "halkada") may continue into the rest of the word, the others must end at a word end.
+    """
+
+    def __init__(self, keywords: list[tuple[str, object, bool]]):
+        """`keywords`: (folded keyword, value, suffixes) entries, a keyword may map to several values."""
+        self._goto: list[dict] = [{}]
+        self._fail = [0]
+        self._out: list[list] = [[]]
+        for keyword, value, suffixes in keywords:
+            state = 0
+            for char in keyword:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._out[state].append((keyword, value, suffixes))
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0) if state else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> list[tuple[int, str, object]]:
+        """(start, keyword, value) of every word-aligned keyword occurrence in folded `text`."""
+        matches, state = [], 0
+        for end, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for keyword, value, suffixes in self._out[state]:
+                start = end - len(keyword) + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if not suffixes and end + 1 < len(text) and text[end + 1].isalnum():
+                    continue
+                matches.append((start, keyword, value))
+        return matches
+
+
+@dataclass(frozen=True)
+class Topology:
+    name: str
+    turkish: str
+    keywords: tuple
+    turkish_keywords: tuple
+    diagram: str
+    # labels -> networkx graph of the topology
+    build: object
+    default_nodes: int
+    min_nodes: int = 2
+    # "hybrid of star and bus" is a hybrid, "full mesh" is fully connected
+    priority: int = 0
+
+    @property
+    def title(self) -> str:
+        return f"{self.name}/{self.turkish}"
+
+
+@dataclass(frozen=True)
+class Device:
+    prefix: str
+    plural: str
+    keywords: tuple
+    turkish_keywords: tuple
+
+
+TOPOLOGIES = (
+    Topology("star", "yıldız", ("star", "stars"), ("yıldız",), (
+        "      [Hub]       \n"
+        "   / /  |  \\     \n"
+        "[A] [B] [C] [D]  "
+    ), build_star, 4),
+    Topology("bus", "omurga", ("bus", "buses", "backbone"), ("omurga", "veri yolu", "veriyolu"), (
+        "[A]---[B]---[C]---[D]---[E]"
+    ), build_bus, 5),
+    Topology("ring", "halka", ("ring", "rings", "token ring"), ("halka",), (
+        "   [A]       [B]    \n"
+        "  /   \\     /   \\  \n"
+        "[E]   [C]---[D]    \n"
+        "  \\         /      \n"
+        "   \\-------/       "
+    ), build_ring, 5, min_nodes=3),
+    Topology("mesh", "örgü", ("mesh", "meshes", "partial mesh"), ("örgü",), (
+        "[A]-----[B]     \n"
+        "| \\   / |      \n"
+        "|  [C]  |      \n"
+        "| /   \\ |      \n"
+        "[D]-----[E]     "
+    ), build_mesh, 5, min_nodes=3),
+    Topology("tree", "ağaç", ("tree", "trees", "hierarchical"), ("ağaç", "hiyerarşik"), (
+        "        [Root]         \n"
+        "       /     \\        \n"
+        "    [C1]     [C2]     \n"
+        "    /  \\       \\     \n"
+        "[L1] [L2]    [L3]    "
+    ), build_tree, 6),
+    Topology("hybrid", "karma", ("hybrid",), ("karma", "hibrit"), (
+        "      [Hub]          \n"
+        "    /  |  \\         \n"
+        "[A] [B] [Switch]---[C]\n"
+        "            |         \n"
+        "           [D]        "
+    ), build_hybrid, 4, min_nodes=3, priority=2),
+    Topology("fully connected", "tam bağlı", ("full", "full mesh", "fully connected", "fully meshed"),
+             ("tam bağlı", "tam bağlantılı", "tam örgü"), (
+        "  [A]---[B]         \n"
+        "   | \\ / |          \n"
+        "   |  X  |          \n"
+        "   | / \\ |          \n"
+        "  [C]---[D]         "
+    ), build_full, 4, priority=1),
+)
+
+TOPOLOGY_BY_NAME = {topology.name: topology for topology in TOPOLOGIES}
+
+DEVICES = {
+    "router": Device("R", "routers", ("router", "routers"), ("yönlendirici", "router")),
+    "switch": Device("SW", "switches", ("switch", "switches"), ("anahtar", "switch")),
+    "pc": Device("PC", "PCs", ("pc", "pcs", "computer", "computers", "host", "hosts"), ("bilgisayar",)),
+    "server": Device("SRV", "servers", ("server", "servers"), ("sunucu",)),
+    "node": Device("", "nodes", ("node", "nodes", "device", "devices"), ("düğüm", "cihaz")),
+}
+
+NUMBER_WORDS = {
+    "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+    "twelve": 12, "iki": 2, "üç": 3, "dört": 4, "beş": 5, "altı": 6, "yedi": 7, "sekiz": 8, "dokuz": 9,
+}
+
+# scenarios that ask for a drawing without naming a known topology get the two-node fallback
+DIAGRAM_REQUEST = ("topology", "topologies", "diagram", "draw", "network map")
+DIAGRAM_REQUEST_TURKISH = ("topoloji", "diyagram", "şema", "çiz")
+FALLBACK_TITLE = "link/bağlantı"
+FALLBACK_DIAGRAM = "[A]-----[B]"
+
+
+def _compile() -> KeywordMatcher:
+    keywords = []
+
+    def add(words: tuple, value, suffixes: bool):
+        keywords.extend((fold(word), value, suffixes) for word in words)
+
+    for topology in TOPOLOGIES:
+        add(topology.keywords, ("topology", topology), False)
+        add(topology.turkish_keywords, ("topology", topology), True)
+    for kind, device in DEVICES.items():
+        add(device.keywords, ("device", kind), False)
+        add(device.turkish_keywords, ("device", kind), True)
+    for word, count in NUMBER_WORDS.items():
+        keywords.append((fold(word), ("count", count), False))
+    add(DIAGRAM_REQUEST, ("request", None), False)
+    add(DIAGRAM_REQUEST_TURKISH, ("request", None), True)
+    return KeywordMatcher(keywords)
+
+
+# compiled once at import, every lookup is a single pass over the scenario
+_MATCHER = _compile()
+
+
+@dataclass(frozen=True)
+class TopologyRequest:
+    """What a scenario asks for: a topology, and the node count / device kind / labels when it names them."""
+    topology: Topology | None
+    count: int | None = None
+    device: str | None = None
+    labels: tuple | None = None
+    diagram_requested: bool = False
+
+    @property
+    def parameterized(self) -> bool:
+        return self.count is not None or self.device is not None or self.labels is not None
+
+
+def parse_labels(scenario: str) -> tuple | None:
+    """Node labels listed after "named", "labels:" or "isimleri" ("a star named Web, DB and Cache")."""
+    match = _LABELS.search(scenario)
+    if not match:
+        return None
+    labels = (label.strip(" .?!\"'[]") for label in _LABEL_SPLIT.split(match.group(1)))
+    return tuple(dict.fromkeys(label for label in labels if label)) or None
+
+
+def parse_scenario(scenario: str) -> TopologyRequest:
+    text = fold(scenario)
+    topologies, counts, devices, requested = [], [], [], False
+    for start, _, (kind, value) in _MATCHER.find(text):
+        if kind == "topology":
+            topologies.append((-value.priority, start, value))
+        elif kind == "device":
+            devices.append(value)
+        elif kind == "count":
+            counts.append((start, value))
+        else:
+            requested = True
+    counts += [(match.start(), int(match.group(1))) for match in _COUNT.finditer(text)]
+    return TopologyRequest(
+        topology=min(topologies, key=lambda item: item[:2])[2] if topologies else None,
+        count=min(counts)[1] if counts else None,
+        device=devices[0] if devices else None,
+        labels=parse_labels(scenario),
+        diagram_requested=requested or bool(topologies),
+    )
+
+
+def node_labels(count: int, device: str = None) -> tuple:
+    prefix = DEVICES[device or "node"].prefix
+    if not prefix and count <= 26:
+        return tuple(chr(ord("A") + i) for i in range(count))
+    return tuple(f"{prefix or 'N'}{i + 1}" for i in range(count))
+
+
+def resolve_labels(topology: Topology, count: int = None, device: str = None, labels: tuple = None) -> tuple:
+    """Labels of the nodes to draw: the given ones (padded up to the topology's minimum) or generated ones."""
+    if labels:
+        labels = tuple(labels)[:TOPOLOGY_MAX_NODES]
+        padding = (label for label in node_labels(topology.min_nodes + len(labels)) if label not in labels)
+        return labels + tuple(next(padding) for _ in range(topology.min_nodes - len(labels)))
+    count = min(max(count or topology.default_nodes, topology.min_nodes), TOPOLOGY_MAX_NODES)
+    return node_labels(count, device)
+
+
+@lru_cache(maxsize=TOPOLOGY_CACHE_SIZE)
+def topology_graph(name: str, labels: tuple):
+    """networkx graph of a topology over `labels`, cached and frozen so no caller can change the shared copy."""
+    return nx.freeze(TOPOLOGY_BY_NAME[name].build(labels))
+
+
+@lru_cache(maxsize=TOPOLOGY_CACHE_SIZE)
+def render_topology(name: str, count: int = None, device: str = None, labels: tuple = None,
+                    fmt: str = "ascii") -> str:
+    """
+    Diagram of a topology in `fmt` ("ascii" with its "Scenario:" header, or "svg"). Without a count,
+    device kind or labels the ASCII form is the precompiled picture.
+    """
+    if fmt not in TOPOLOGY_FORMATS:
+        raise ValueError(f"Unknown topology format {fmt!r}, expected one of {TOPOLOGY_FORMATS}")
+    topology = TOPOLOGY_BY_NAME[name]
+    if fmt == "ascii" and count is None and device is None and labels is None:
+        return f"Scenario: {topology.title}\n\n{topology.diagram}"
+    nodes = resolve_labels(topology, count, device, labels)
+    graph = topology_graph(name, nodes)
+    requested = len(labels) if labels else count or 0
+    # say so when the drawing has fewer nodes than asked for
+    capped = f", capped from {requested}" if requested > TOPOLOGY_MAX_NODES else ""
+    title = f"{topology.title} ({len(nodes)} {DEVICES[device or 'node'].plural}{capped})"
+    if fmt == "svg":
+        return to_svg(graph, title)
+    return f"Scenario: {title}\n\n{to_ascii(graph)}"
+
+
+def get_topology_diagram(scenario: str, fmt: str = "ascii") -> str | None:
+    """
+    Diagram for a scenario, or None when it asks for no drawing. A scenario that asks for a diagram
+    but names no known topology gets a two-node link, so the answer never depends on the model.
+    """
+    request = parse_scenario(scenario)
+    if request.topology is not None:
+        return render_topology(request.topology.name, request.count, request.device, request.labels, fmt)
+    if not request.diagram_requested:
+        return None
+    if fmt == "svg":
+        return to_svg(build_bus(("A", "B")), FALLBACK_TITLE)
+    return f"Scenario: {FALLBACK_TITLE}\n\n{FALLBACK_DIAGRAM}"
+
+
+if __name__ == "__main__":
+    """Print the diagram Professor Ping would use for a scenario, or write it as SVG."""
+    parser = argparse.ArgumentParser(description="Draw a network topology diagram for a scenario.")
+    parser.add_argument("scenario", help='e.g. "a ring with 8 routers" or "star named Web, DB and Cache"')
+    parser.add_argument("--svg", default=None, help="write the diagram as SVG to this file")
+    args = parser.parse_args()
+
+    if args.svg:
+        svg = get_topology_diagram(args.scenario, fmt="svg")
+        if svg is None:
+            raise SystemExit("No topology diagram requested in the scenario.")
+        with open(args.svg, "w", encoding="utf-8") as f:
+            f.write(svg)
+        print(f"Wrote {args.svg}")
+    else:
+        print(get_topology_diagram(args.scenario) or "No topology diagram requested in the scenario.")
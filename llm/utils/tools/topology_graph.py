@@ -0,0 +1,221 @@
+import math
+from xml.sax.saxutils import escape
+from llm.utils.lazy import networkx as nx
+
+
+# SVG node fill per role
+_FILLS = {"hub": "#f4b942", "switch": "#7fb3d5", "device": "#d5e8d4"}
+_SVG_MARGIN = 40
+
+
+def _graph(name: str, layout: str, root: str = None):
+    graph = nx.Graph(topology=name, layout=layout)
+    if root is not None:
+        graph.graph["root"] = root
+    return graph
+
+
+def _with_devices(graph, labels: tuple):
+    graph.add_nodes_from(labels, role="device")
+    return graph
+
+
+def _free_name(name: str, taken) -> str:
+    """`name`, or `name-2`, `name-3`, ... when a device label already uses it, so nodes never merge."""
+    candidate, n = name, 1
+    while candidate in taken:
+        n += 1
+        candidate = f"{name}-{n}"
+    return candidate
+
+
+def build_star(labels: tuple, center: str = "Hub"):
+    center = _free_name(center, labels)
+    graph = _graph("star", "star", root=center)
+    graph.add_node(center, role="hub")
+    _with_devices(graph, labels).add_edges_from((center, label) for label in labels)
+    return graph
+
+
+def build_bus(labels: tuple):
+    graph = _with_devices(_graph("bus", "line"), labels)
+    nx.add_path(graph, labels)
+    return graph
+
+
+def build_ring(labels: tuple):
+    graph = _with_devices(_graph("ring", "ring"), labels)
+    nx.add_cycle(graph, labels)
+    return graph
+
+
+def build_mesh(labels: tuple):
+    """Partial mesh: every node links to its next two neighbours around the ring."""
+    graph = _with_devices(_graph("mesh", "matrix"), labels)
+    ring = nx.relabel_nodes(nx.circulant_graph(len(labels), [1, 2]), dict(enumerate(labels)))
+    graph.add_edges_from(ring.edges)
+    return graph
+
+
+def build_full(labels: tuple):
+    graph = _with_devices(_graph("fully connected", "matrix"), labels)
+    graph.add_edges_from(nx.complete_graph(labels).edges)
+    return graph
+
+
+def build_tree(labels: tuple):
+    """Binary tree filled level by level, the first label is the root."""
+    graph = _with_devices(_graph("tree", "tree", root=labels[0]), labels)
+    graph.add_edges_from((labels[(i - 1) // 2], labels[i]) for i in range(1, len(labels)))
+    return graph
+
+
+def build_hybrid(labels: tuple, center: str = "Hub"):
+    """Star core: the hub feeds one switch per group of up to three devices."""
+    center = _free_name(center, labels)
+    graph = _graph("hybrid", "tree", root=center)
+    graph.add_node(center, role="hub")
+    for i in range(0, len(labels), 3):
+        switch = _free_name(f"Switch{i // 3 + 1}", set(labels) | set(graph))
+        graph.add_node(switch, role="switch")
+        graph.add_edge(center, switch)
+        graph.add_nodes_from(labels[i:i + 3], role="device")
+        graph.add_edges_from((switch, label) for label in labels[i:i + 3])
+    return graph
+
+
+def _box(label: str) -> str:
+    return f"[{label}]"
+
+
+def _line_ascii(order: list) -> str:
+    return "---".join(_box(label) for label in order)
+
+
+def _ring_ascii(order: list) -> str:
+    top = _line_ascii(order)
+    first = len(_box(order[0])) // 2
+    last = len(top) - len(_box(order[-1])) // 2 - 1
+    return "\n".join([top,
+                      " " * first + "|" + " " * (last - first - 1) + "|",
+                      " " * first + "+" + "-" * (last - first - 1) + "+"])
+
+
+def _star_ascii(center: str, leaves: list) -> str:
+    row, centers = "", []
+    for label in leaves:
+        centers.append(len(row) + len(_box(label)) // 2)
+        row += _box(label) + "  "
+    row = row.rstrip()
+    middle = (centers[0] + centers[-1]) // 2
+    bar, drops = [" "] * len(row), [" "] * len(row)
+    for column in range(centers[0], centers[-1] + 1):
+        bar[column] = "-"
+    for column in centers + [middle]:
+        bar[column] = "+"
+    for column in centers:
+        drops[column] = "|"
+    hub = _box(center)
+    return "\n".join([" " * max(0, middle - len(hub) // 2) + hub, " " * middle + "|",
+                      "".join(bar).rstrip(), "".join(drops).rstrip(), row])
+
+
+def _tree_ascii(root: str, children: dict) -> str:
+    lines = [_box(root)]
+
+    def walk(node: str, prefix: str):
+        below = children.get(node, ())
+        for i, child in enumerate(below):
+            last = i == len(below) - 1
+            lines.append(f"{prefix}{'`-- ' if last else '+-- '}{_box(child)}")
+            walk(child, prefix + ("    " if last else "|   "))
+
+    walk(root, "")
+    return "\n".join(lines)
+
+
+def _matrix_ascii(graph) -> str:
+    """Adjacency matrix ("x" = link) for meshes, which have too many links to draw as lines."""
+    labels = list(graph.nodes)
+    width = max(len(label) for label in labels)
+    rows = [" " * (width + 3) + " ".join(label.center(width) for label in labels)]
+    for a in labels:
+        cells = ("-" if a == b else "x" if graph.has_edge(a, b) else "." for b in labels)
+        rows.append((_box(a).ljust(width + 3) + " ".join(cell.center(width) for cell in cells)).rstrip())
+    rows.append(f"Links: {graph.number_of_edges()}")
+    return "\n".join(rows)
+
+
+def _path_order(graph) -> list:
+    ends = [node for node, degree in graph.degree if degree <= 1]
+    return list(nx.dfs_preorder_nodes(graph, ends[0] if ends else next(iter(graph))))
+
+
+def to_ascii(graph) -> str:
+    """ASCII diagram of a topology graph, drawn the way its `layout` graph attribute says."""
+    layout = graph.graph["layout"]
+    if layout == "line":
+        return _line_ascii(_path_order(graph))
+    if layout == "ring":
+        first = next(iter(graph))
+        return _ring_ascii([edge[0] for edge in nx.find_cycle(graph, first)])
+    if layout == "star":
+        root = graph.graph["root"]
+        return _star_ascii(root, [node for node in graph if node != root])
+    if layout == "tree":
+        root = graph.graph["root"]
+        return _tree_ascii(root, dict(nx.bfs_successors(graph, root)))
+    return _matrix_ascii(graph)
+
+
+def positions(graph) -> dict:
+    """Node positions in [0, 1] x [0, 1] for the graph's layout."""
+    layout = graph.graph["layout"]
+    if layout == "line":
+        order = _path_order(graph)
+        return {node: ((i + 0.5) / len(order), 0.5) for i, node in enumerate(order)}
+    if layout in ("tree", "star"):
+        levels = nx.single_source_shortest_path_length(graph, graph.graph["root"])
+        rows = {}
+        for node in nx.bfs_tree(graph, graph.graph["root"]):
+            rows.setdefault(levels[node], []).append(node)
+        depth = max(rows) + 1
+        return {node: ((i + 0.5) / len(row), (level + 0.5) / depth)
+                for level, row in rows.items() for i, node in enumerate(row)}
+    # ring and meshes: evenly spaced on a circle, neighbours next to each other
+    raw = nx.circular_layout(graph) if len(graph) > 1 else {node: (0.0, 0.0) for node in graph}
+    return {node: ((x + 1) / 2, (1 - y) / 2) for node, (x, y) in raw.items()}
+
+
+def _canvas(graph) -> tuple[int, int]:
+    layout, n = graph.graph["layout"], len(graph)
+    if layout == "line":
+        return max(360, 90 * n), 120
+    if layout in ("tree", "star"):
+        levels = nx.single_source_shortest_path_length(graph, graph.graph["root"])
+        widest = max(list(levels.values()).count(level) for level in set(levels.values()))
+        return max(360, 90 * widest), 100 * (max(levels.values()) + 1)
+    side = max(360, int(45 * n / math.pi) * 2 + 2 * _SVG_MARGIN)
+    return side, side
+
+
+def to_svg(graph, title: str = "") -> str:
+    """Standalone SVG of a topology graph: links as lines, nodes as labelled boxes coloured by role."""
+    width, height = _canvas(graph)
+    points = {node: (_SVG_MARGIN + x * (width - 2 * _SVG_MARGIN), _SVG_MARGIN / 2 + y * (height - _SVG_MARGIN))
+              for node, (x, y) in positions(graph).items()}
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'viewBox="0 0 {width} {height}" font-family="monospace" font-size="12">']
+    if title:
+        parts.append(f"<title>{escape(title)}</title>")
+    for a, b in graph.edges:
+        (x1, y1), (x2, y2) = points[a], points[b]
+        parts.append(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" stroke="#555" stroke-width="1.5"/>')
+    for node, (x, y) in points.items():
+        box = 7.5 * len(str(node)) + 14
+        fill = _FILLS.get(graph.nodes[node].get("role"), _FILLS["device"])
+        parts.append(f'<rect x="{x - box / 2:.1f}" y="{y - 11:.1f}" width="{box:.1f}" height="22" rx="5" '
+                     f'fill="{fill}" stroke="#333"/>')
+        parts.append(f'<text x="{x:.1f}" y="{y + 4:.1f}" text-anchor="middle">{escape(str(node))}</text>')
+    parts.append("</svg>")
+    return "\n".join(parts)
@@ -1,6 +1,7 @@
 import asyncio
 from uuid import uuid4
 from llm.chat import handle_user_query
+from llm.agents.agent_pool import get_agent_pool
 from utils.log import logger
 
 async def main():
@@ -14,6 +15,9 @@ async def main():
             print("Geçersiz seçim. Varsayılan olarak 'local' seçildi.")
             llm_backend = "local"
 
+        # build the agent before the first message so it does not pay the cold start
+        get_agent_pool().warm_up(backends=[llm_backend])
+
         logger.info(f"Session started: {session_id} | LLM: {llm_backend}")
         while True:
             user_query = input(">> ").strip()
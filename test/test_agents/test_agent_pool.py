@@ -0,0 +1,62 @@
+from unittest import TestCase
+from unittest.mock import patch
+from llm.agents.agent_pool import AgentPool
+
+
+class FakeAgent:
+    def __init__(self, backend, language_mode, session_id):
+        self.backend = backend
+        self.language_mode = language_mode
+        self.session_id = session_id
+
+
+class TestAgentPool(TestCase):
+    """
+    Test case for ensuring pooled agents are reused per session and evicted
+    """
+
+    def setUp(self):
+        self.pool = AgentPool(max_sessions=2, session_ttl=60)
+        patcher = patch.object(self.pool, "_build_agent", side_effect=FakeAgent)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test01_reuses_agent_for_same_session(self):
+        """
+        Test if the same session, backend and language get the same warm agent
+        """
+        first = self.pool.acquire("s1", "local", "tr")
+        second = self.pool.acquire("s1", "ollama", "tr")
+
+        self.assertIs(first, second)
+        self.assertEqual(self.pool.stats()["reused"], 1)
+
+    def test02_sessions_are_kept_apart(self):
+        """
+        Test if different sessions or language modes get separate agents
+        """
+        a = self.pool.acquire("s1", "local", "tr")
+        b = self.pool.acquire("s2", "local", "tr")
+        c = self.pool.acquire("s1", "local", "en")
+
+        self.assertIsNot(a, b)
+        self.assertIsNot(a, c)
+        self.assertEqual(b.session_id, "s2")
+
+    def test03_evicts_least_recently_used(self):
+        """
+        Test if the pool drops the least recently used session above max_sessions
+        """
+        first = self.pool.acquire("s1", "local", "tr")
+        self.pool.acquire("s2", "local", "tr")
+        self.pool.acquire("s3", "local", "tr")
+
+        self.assertEqual(self.pool.stats()["sessions"], 2)
+        self.assertIsNot(self.pool.acquire("s1", "local", "tr"), first)
+
+    def test04_rejects_unknown_backend(self):
+        """
+        Test if an unsupported backend raises ValueError like handle_user_query does
+        """
+        with self.assertRaises(ValueError):
+            self.pool.acquire("s1", "openai", "tr")
@@ -0,0 +1,133 @@
+import asyncio
+from unittest import TestCase
+from unittest.mock import patch, PropertyMock
+import numpy as np
+import faiss
+from llm.agents import rag_agent
+from llm.agents.rag_agent import RagAgent
+from llm.data.index_cache import IndexEntry
+from llm.utils.retrieval_cache import get_retrieval_cache, get_query_embedding_cache
+
+
+class FakeEmbeddingModel:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def encode(self, texts, **kwargs):
+        return np.array([self.vectors[text] for text in texts], dtype="float32")
+
+
+class TestUnifiedRetrieval(TestCase):
+    """
+    Test case for single-search retrieval over the unified index with dataset filters and boosts
+    """
+
+    def setUp(self):
+        vectors = {"q": [0.0, 0.0], "ortak ağ sorunları: q": [0.0, 0.0], "a1": [1.0, 0.0], "b1": [1.1, 0.0], "b2": [3.0, 0.0], "a2": [5.0, 0.0]}
+        texts = ["a1", "b1", "b2", "a2"]
+        ids = np.array([11, 22, 33, 44], dtype="int64")
+        index = faiss.IndexIDMap2(faiss.IndexFlatL2(2))
+        index.add_with_ids(np.array([vectors[t] for t in texts], dtype="float32"), ids)
+        metadata = [{"id": int(i), "source": f"{t[0]}.txt", "chunk_id": n, "dataset_id": t[0]}
+                    for n, (i, t) in enumerate(zip(ids, texts))]
+
+        get_retrieval_cache().clear()
+        get_query_embedding_cache().clear()
+        self.agent = RagAgent()
+        self.entry = IndexEntry("all", index, texts, metadata, (), 1)
+        for patcher in (patch.object(self.agent.pipeline, "get_index_entry", side_effect=lambda *a: self.entry),
+                        patch.object(RagAgent, "embedding_model", new_callable=PropertyMock,
+                                     return_value=FakeEmbeddingModel(vectors))):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test01_single_search_over_all_datasets(self):
+        """
+        Test if the nearest chunks come back across datasets, each tagged with its dataset
+        """
+        hits = self.agent.retrieve("q", k=2)
+
+        self.assertEqual([hit.text for hit in hits], ["a1", "b1"])
+        self.assertEqual([hit.dataset_id for hit in hits], ["a", "b"])
+
+    def test02_filter_keeps_requested_datasets(self):
+        """
+        Test if a dataset filter drops other datasets' hits but still fills k from the over-fetch
+        """
+        hits = self.agent.retrieve("q", k=2, datasets=["b"])
+
+        self.assertEqual([hit.text for hit in hits], ["b1", "b2"])
+
+    def test03_boost_reorders_without_dropping(self):
+        """
+        Test if boosting a dataset moves its hits up while other datasets stay in the results
+        """
+        hits = self.agent.retrieve("q", k=3, boost={"b": 0.5})
+
+        self.assertEqual([hit.text for hit in hits], ["b1", "a1", "b2"])
+        self.assertEqual(self.agent.format_hits([]), "İlgili bilgi bulunamadı.")
+
+    def test04_results_cached_until_index_version_changes(self):
+        """
+        Test if a repeated query is served from the cache and searched again after a reload
+        """
+        first = self.agent.retrieve("q", k=2)
+        second = self.agent.retrieve("q", k=2)
+        self.assertEqual(get_retrieval_cache().stats()["hits"], 1)
+        self.assertEqual(first, second)
+
+        self.entry = IndexEntry("all", self.entry.index, self.entry.documents, self.entry.metadata, (), 2)
+        self.agent.retrieve("q", k=2)
+        self.assertEqual(get_retrieval_cache().stats()["invalidated"], 1)
+
+    def test05_per_dataset_search_keeps_no_agent_state(self):
+        """
+        Test if the per-dataset path searches the loaded entry without storing it on the shared agent
+        """
+        with patch.object(rag_agent, "RAG_UNIFIED_INDEX", False):
+            asyncio.run(self.agent.call_rag_tool("check_common_issues", "q", "common_home_network_problems", k=2))
+
+        self.agent.pipeline.get_index_entry.assert_called_once_with(
+            "common_home_network_problems", "common_home_network_problems.txt")
+        for attribute in ("index", "documents", "metadata"):
+            self.assertFalse(hasattr(self.agent, attribute))
+
+    def test06_tool_call_keeps_its_dataset(self):
+        """
+        Test if a tool call over the unified index returns only hits from the tool's dataset
+        """
+        with patch.object(self.agent.pipeline, "index_ready", return_value=True):
+            answer = asyncio.run(self.agent.call_rag_tool("check_common_issues", "q", "b", k=2))
+
+        self.assertEqual(answer, "b1\n\nb2")
+
+    def test07_per_dataset_until_unified_index_is_built(self):
+        """
+        Test if retrieval falls back to the tool's own index while no unified index exists
+        """
+        with patch.object(self.agent.pipeline, "index_ready", return_value=False):
+            self.assertFalse(self.agent.use_unified_index())
+            asyncio.run(self.agent.call_rag_tool("check_common_issues", "q", "common_home_network_problems"))
+
+        self.agent.pipeline.get_index_entry.assert_called_once_with(
+            "common_home_network_problems", "common_home_network_problems.txt")
+
+    def test08_small_dataset_in_large_corpus_fills_k(self):
+        """
+        Test if a dataset filter searches only that dataset, even when its chunks are far from the query
+        """
+        rng = np.random.default_rng(0)
+        vectors = np.vstack([rng.normal(0.0, 1.0, (500, 2)), rng.normal(50.0, 1.0, (3, 2))]).astype("float32")
+        ids = np.arange(1000, 1503, dtype="int64")
+        metadata = [{"id": int(i), "source": "x.txt", "chunk_id": n, "dataset_id": "a" if n < 500 else "b"}
+                    for n, i in enumerate(ids)]
+        texts = [f"t{n}" for n in range(503)]
+        for version, index in enumerate((faiss.IndexIDMap2(faiss.IndexFlatL2(2)), faiss.index_factory(2, "IVF8,Flat"))):
+            index.train(vectors)
+            index.add_with_ids(vectors, ids)
+            if isinstance(index, faiss.IndexIVF):
+                index.nprobe = 1
+            self.entry = IndexEntry("all", index, texts, metadata, (), 10 + version)
+
+            hits = self.agent.retrieve("q", k=3, datasets=["b"])
+            self.assertEqual(sorted(hit.text for hit in hits), ["t500", "t501", "t502"])
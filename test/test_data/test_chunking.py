@@ -0,0 +1,85 @@
+import os
+import tempfile
+from unittest import TestCase
+from llm.data.chunking import iter_split, chunk_file, chunk_id_for, get_chunker, iter_chunk_batches, \
+    ParagraphChunker, SlidingWindowChunker
+
+
+class TestChunking(TestCase):
+    """
+    Test case for the pluggable chunkers and the block-wise file reader
+    """
+
+    def setUp(self):
+        self.content = "# Başlık\n\n1. Neden?\nİlk paragraf\nikinci satır\n\n\n\n2. Nasıl?\nSon paragraf\n"
+        handle, self.path = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(handle, "w", encoding="utf-8") as f:
+            f.write(self.content)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test01_iter_split_matches_str_split(self):
+        """
+        Test if block-wise reading yields exactly the parts of str.split for any block size
+        """
+        for block_size in (1, 2, 5, 1 << 16):
+            self.assertEqual(list(iter_split(self.path, block_size=block_size)), self.content.split("\n\n"))
+
+    def test02_paragraph_chunker_keeps_legacy_split(self):
+        """
+        Test if the paragraph chunker returns the non-empty blank-line paragraphs
+        """
+        chunks = chunk_file(self.path, "faq.txt", ParagraphChunker())
+
+        self.assertEqual([text for text, _ in chunks],
+                         ["# Başlık", "1. Neden?\nİlk paragraf\nikinci satır", "2. Nasıl?\nSon paragraf"])
+        self.assertEqual([meta["chunk_id"] for _, meta in chunks], [0, 1, 2])
+
+    def test03_headings_merge_into_their_section(self):
+        """
+        Test if a lone title is merged into the next section and inline questions start new sections
+        """
+        chunker = SlidingWindowChunker(min_tokens=0)
+
+        self.assertEqual(list(chunker.split(["# Başlık", "1. Neden?\nİlk paragraf\n2. Nasıl?\nSon paragraf"])),
+                         ["# Başlık\n1. Neden?\nİlk paragraf", "2. Nasıl?\nSon paragraf"])
+
+    def test04_long_sections_are_windowed_with_overlap(self):
+        """
+        Test if a section over the budget becomes overlapping windows that each repeat the heading
+        """
+        words = [f"w{i}" for i in range(30)]
+        chunker = SlidingWindowChunker(max_tokens=10, overlap_tokens=3, min_tokens=0, count_tokens=lambda t: len(t.split()))
+        windows = list(chunker.split(["3. Neden yavaş?\n" + " ".join(words)]))
+
+        self.assertGreater(len(windows), 1)
+        for window in windows:
+            self.assertTrue(window.startswith("3. Neden yavaş?\n"))
+            self.assertLessEqual(len(window.split()), 10)
+        bodies = [window.split("\n", 1)[1].split() for window in windows]
+        self.assertEqual(bodies[0][-3:], bodies[1][:3])
+        self.assertEqual(bodies[-1][-1], "w29")
+
+    def test05_chunk_ids_are_stable(self):
+        """
+        Test if chunk ids depend only on source and text and fit in a signed 64-bit FAISS id
+        """
+        first = get_chunker("sliding").chunk(self.content, "faq.txt")
+        second = get_chunker("sliding").chunk(self.content, "faq.txt")
+
+        self.assertEqual([meta["id"] for _, meta in first], [meta["id"] for _, meta in second])
+        self.assertNotEqual(chunk_id_for("a.txt", "x"), chunk_id_for("b.txt", "x"))
+        self.assertTrue(all(0 <= meta["id"] < 2 ** 63 for _, meta in first))
+        with self.assertRaises(ValueError):
+            get_chunker("unknown")
+
+    def test06_chunk_batches_are_bounded(self):
+        """
+        Test if a file is handed over in batches of at most batch_size that add up to chunk_file
+        """
+        chunker = get_chunker("paragraph")
+        batches = list(iter_chunk_batches(self.path, "faq.txt", chunker, batch_size=2))
+
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+        self.assertEqual([row for batch in batches for row in batch], chunk_file(self.path, "faq.txt", chunker))
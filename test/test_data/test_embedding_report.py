@@ -0,0 +1,34 @@
+from unittest import TestCase
+import numpy as np
+from llm.data.embedding_report import cosine_drift, parity
+
+
+class TestEmbeddingParity(TestCase):
+    """
+    Test case for the embedding backend parity check
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.reference = rng.normal(size=(50, 384)).astype("float32")
+
+    def test01_identical_vectors(self):
+        """
+        Test if identical (or only rescaled) vectors have no drift and pass
+        """
+        result = parity(self.reference, self.reference * 3.0, tolerance=1e-5)
+
+        self.assertTrue(result["passed"])
+        self.assertAlmostEqual(result["max_drift"], 0.0, places=5)
+
+    def test02_drift_over_tolerance(self):
+        """
+        Test if vectors perturbed beyond the tolerance fail the parity check
+        """
+        noise = np.random.default_rng(1).normal(scale=0.5, size=self.reference.shape).astype("float32")
+        drift = cosine_drift(self.reference, self.reference + noise)
+
+        self.assertTrue(np.all(drift > 0))
+        self.assertFalse(parity(self.reference, self.reference + noise, tolerance=0.01)["passed"])
+        self.assertTrue(parity(self.reference, self.reference + noise, tolerance=float(drift.max()))["passed"])
+
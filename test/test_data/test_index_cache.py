@@ -0,0 +1,89 @@
+import threading
+from unittest import TestCase
+from llm.data.index_cache import IndexCache, IndexEntry
+
+
+class TestIndexCache(TestCase):
+    """
+    Test case for the per-process FAISS index cache and its hot reload
+    """
+
+    def setUp(self):
+        self.cache = IndexCache(check_interval=0)
+        self.fingerprint = ("v1",)
+        self.load_count = 0
+
+    def loader(self):
+        self.load_count += 1
+        return f"index-{self.load_count}", [f"doc-{self.load_count}"], [{"source": "x"}]
+
+    def get(self, dataset_id="common_home_network_problems"):
+        return self.cache.get(dataset_id, loader=self.loader, fingerprint=lambda: self.fingerprint)
+
+    def test01_loads_once_and_hits(self):
+        """
+        Test if a dataset is loaded once and then served from the cache
+        """
+        first = self.get()
+        second = self.get()
+
+        self.assertIs(first, second)
+        self.assertEqual(self.load_count, 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test02_datasets_are_kept_apart(self):
+        """
+        Test if each dataset_id gets its own entry instead of the last loaded index
+        """
+        a = self.get("common_home_network_problems")
+        b = self.get("network_troubleshooting")
+
+        self.assertNotEqual(a.index, b.index)
+        self.assertEqual(self.get("common_home_network_problems").index, a.index)
+
+    def test03_reloads_on_file_change(self):
+        """
+        Test if a changed fingerprint swaps in a new entry with a new version
+        """
+        first = self.get()
+        self.fingerprint = ("v2",)
+        second = self.get()
+
+        self.assertEqual(second.index, "index-2")
+        self.assertGreater(second.version, first.version)
+        self.assertEqual(self.cache.stats()["reloads"], 1)
+
+    def test04_readers_not_blocked_during_reload(self):
+        """
+        Test if readers keep getting the old entry while another thread reloads
+        """
+        first = self.get()
+        self.fingerprint = ("v2",)
+        started, release = threading.Event(), threading.Event()
+
+        def slow_loader():
+            started.set()
+            release.wait(5)
+            return "index-slow", [], []
+
+        reloader = threading.Thread(target=lambda: self.cache.get(
+            "common_home_network_problems", loader=slow_loader, fingerprint=lambda: self.fingerprint))
+        reloader.start()
+        started.wait(5)
+
+        self.assertIs(self.get(), first)
+        release.set()
+        reloader.join()
+        self.assertEqual(self.get().index, "index-slow")
+
+    def test05_entry_maps_chunk_ids_to_rows(self):
+        """
+        Test if labels of an ID-mapped index resolve through the metadata ids, and plain positions otherwise
+        """
+        by_id = IndexEntry("d", None, ["a", "b"], [{"id": 901}, {"id": 42}], (), 1)
+        by_position = IndexEntry("d", None, ["a", "b"], [{"source": "x"}, {"source": "y"}], (), 2)
+
+        self.assertEqual(by_id.row(42), 1)
+        self.assertIsNone(by_id.row(1))
+        self.assertEqual(by_position.row(1), 1)
+        self.assertIsNone(by_position.row(-1))
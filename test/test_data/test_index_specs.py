@@ -0,0 +1,107 @@
+import os
+import json
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch, PropertyMock
+import numpy as np
+from llm.data import data_pipeline
+from llm.data.data_pipeline import DataPipeline
+from llm.data.index_store import read_manifest
+from llm.data.index_specs import IndexSpec, get_index_spec, build_index, train_index, remove_ids, has_chunk_ids, \
+    trained_params
+
+
+class TestIndexSpecs(TestCase):
+    """
+    Test case for per-dataset FAISS index specs
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(500, 16)).astype("float32")
+        self.ids = np.arange(1000, 1500, dtype="int64")
+
+    def test01_specs_merge_default_and_dataset(self):
+        """
+        Test if a dataset entry overrides the default entry and missing keys keep their defaults
+        """
+        handle, path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(handle, "w") as f:
+            json.dump({"default": {"kind": "ivf_flat", "nprobe": 8}, "manuals": {"kind": "hnsw"}}, f)
+        try:
+            self.assertEqual(get_index_spec("manuals", path).kind, "hnsw")
+            self.assertEqual(get_index_spec("tickets", path).nprobe, 8)
+            self.assertEqual(get_index_spec("tickets", path + ".missing").kind, "flat")
+        finally:
+            os.remove(path)
+        with self.assertRaises(ValueError):
+            IndexSpec(kind="lsh")
+
+    def test02_cluster_count_is_capped_by_corpus_size(self):
+        """
+        Test if nlist and PQ bits shrink to what a small corpus can train
+        """
+        self.assertEqual(IndexSpec(kind="ivf_flat", nlist=1024).factory_string(500), "IVF12,Flat")
+        self.assertEqual(IndexSpec(kind="ivf_pq", nlist=4, m=4).factory_string(100), "IVF2,PQ4x6")
+        self.assertEqual(IndexSpec(kind="ivf_pq").factory_string(), "IVF1024,PQ16x8")
+
+    def test03_trained_index_returns_chunk_ids(self):
+        """
+        Test if an IVF index is trained on a sample and searches return the ids it was given
+        """
+        spec = IndexSpec(kind="ivf_flat", nprobe=64, train_sample=200)
+        index = build_index(spec, 16, len(self.vectors))
+        self.assertFalse(index.is_trained)
+        train_index(index, self.vectors, spec)
+        index.add_with_ids(self.vectors, self.ids)
+
+        _, labels = index.search(self.vectors[:5], 1)
+        self.assertEqual(labels[:, 0].tolist(), self.ids[:5].tolist())
+        self.assertTrue(has_chunk_ids(index))
+
+    def test04_hnsw_remove_rebuilds_without_the_ids(self):
+        """
+        Test if removing from an HNSW index rebuilds it with the surviving vectors only
+        """
+        spec = IndexSpec(kind="hnsw", hnsw_m=8)
+        index = build_index(spec, 16)
+        index.add_with_ids(self.vectors, self.ids)
+
+        index = remove_ids(index, self.ids[:10], spec)
+        self.assertEqual(index.ntotal, 490)
+        _, labels = index.search(self.vectors[10:12], 1)
+        self.assertEqual(labels[:, 0].tolist(), self.ids[10:12].tolist())
+        _, labels = index.search(self.vectors[:1], 1)
+        self.assertNotEqual(int(labels[0, 0]), int(self.ids[0]))
+
+    def test05_capped_index_is_rebuilt_once_corpus_grows(self):
+        """
+        Test if an IVF index capped for a small corpus records its nlist and is rebuilt when the corpus doubles
+        """
+        spec = IndexSpec(kind="ivf_flat", nlist=64)
+        vectors = {f"doc {i}": row for i, row in enumerate(np.random.default_rng(1).normal(size=(2000, 16)))}
+        model = type("Model", (), {"encode": lambda _, texts, **kw: np.array([vectors[t] for t in texts]),
+                                   "get_sentence_embedding_dimension": lambda _: 16})()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for patcher in (patch.object(data_pipeline, "get_index_spec", return_value=spec),
+                        patch.object(DataPipeline, "embedding_model", new_callable=PropertyMock, return_value=model)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        pipeline = DataPipeline(index_dir=tmp.name)
+
+        def update(n):
+            pipeline.documents = [f"doc {i}" for i in range(n)]
+            pipeline.metadata = [{"source": "docs.txt", "chunk_id": i} for i in range(n)]
+            return pipeline.update_index("docs")
+
+        update(200)
+        self.assertEqual(read_manifest("docs", tmp.name)["trained"], {"nlist": 5})
+        self.assertEqual(update(390)["added"], 190)
+        self.assertEqual(trained_params(pipeline.index), {"nlist": 5})
+        self.assertEqual(update(1000)["added"], 1000)
+        self.assertEqual(read_manifest("docs", tmp.name)["trained"], {"nlist": 25})
+
+        self.assertTrue(IndexSpec(kind="ivf_pq", nlist=4, m=4).outgrown({"nlist": 4, "nbits": 6}, 1000))
+        self.assertFalse(IndexSpec(kind="ivf_flat", nlist=8).outgrown({"nlist": 8}, 100_000))
+        self.assertFalse(IndexSpec(kind="flat").outgrown({}, 100_000))
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase
+import numpy as np
+from llm.utils.lazy import faiss
+from llm.data.index_store import save_index, load_index, index_files, list_indices, pointer_path, versions_dir, \
+    index_path, metadata_path, write_metadata, INDEX_KEEP_VERSIONS
+
+
+def make_index(n: int, dim: int = 8):
+    index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+    index.add_with_ids(np.random.default_rng(n).random((n, dim), dtype="float32"), np.arange(n, dtype="int64"))
+    return index, [{"id": i, "text": f"v{n}-{i}", "version": n} for i in range(n)]
+
+
+class TestIndexStore(TestCase):
+    """
+    Test case for versioned index and metadata publishing
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test01_round_trip(self):
+        """
+        Test if a saved index loads back with its metadata and is listed through its pointer
+        """
+        save_index(*make_index(5), "docs", self.dir)
+        index, metadata = load_index("docs", self.dir, mmap=False)
+
+        self.assertEqual(index.ntotal, 5)
+        self.assertEqual([m["text"] for m in metadata], [f"v5-{i}" for i in range(5)])
+        self.assertEqual(list_indices(self.dir), ["docs"])
+        self.assertEqual(index_files("docs", self.dir)[0], pointer_path("docs", self.dir))
+
+    def test02_old_versions_are_pruned(self):
+        """
+        Test if republishing keeps only the newest versions and drops unversioned files
+        """
+        index, metadata = make_index(3)
+        faiss.write_index(index, index_path("docs", self.dir))
+        write_metadata(metadata_path("docs", self.dir), metadata)
+        for n in range(4, 8):
+            save_index(*make_index(n), "docs", self.dir)
+
+        self.assertEqual(len(os.listdir(versions_dir("docs", self.dir))), INDEX_KEEP_VERSIONS)
+        self.assertFalse(os.path.exists(index_path("docs", self.dir)))
+        self.assertEqual(load_index("docs", self.dir, mmap=False)[0].ntotal, 7)
+
+    def test03_readers_never_mix_versions(self):
+        """
+        Test if readers racing a writer always get an index and metadata from the same version
+        """
+        save_index(*make_index(2), "docs", self.dir)
+        done, mismatches = threading.Event(), []
+
+        def reader():
+            while not done.is_set():
+                index, metadata = load_index("docs", self.dir, mmap=False)
+                if index.ntotal != len(metadata) or {m["version"] for m in metadata} != {index.ntotal}:
+                    mismatches.append((index.ntotal, len(metadata)))
+
+        readers = [threading.Thread(target=reader) for _ in range(3)]
+        for thread in readers:
+            thread.start()
+        for n in range(3, 40):
+            save_index(*make_index(n), "docs", self.dir)
+        done.set()
+        for thread in readers:
+            thread.join()
+
+        self.assertEqual(mismatches, [])
@@ -0,0 +1,142 @@
+import os
+import zlib
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch, PropertyMock
+import numpy as np
+from llm.data.chunking import get_chunker
+from llm.data.data_pipeline import DataPipeline
+from llm.data.index_store import load_index, list_indices, read_manifest, index_files
+from llm.data.ingest import IngestStats, StreamingIngestor
+
+
+class FakeEmbeddingModel:
+    def __init__(self):
+        self.calls = []
+
+    def get_sentence_embedding_dimension(self):
+        return 8
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return np.array([np.random.default_rng(zlib.crc32(text.encode())).random(8) for text in texts],
+                        dtype="float32")
+
+
+class TestIngest(TestCase):
+    """
+    Test case for the streaming ingestion throughput report
+    """
+
+    def test01_stats_rates(self):
+        """
+        Test if throughput is reported per wall-clock and per embedding second
+        """
+        stats = IngestStats(chunks=100, embedded=40, embed_seconds=2.0, total_seconds=4.0)
+
+        self.assertEqual(stats.chunks_per_second, 25.0)
+        self.assertEqual(stats.embeddings_per_second, 20.0)
+        self.assertIn("25.0 chunks/s", stats.summary())
+
+
+class TestStreamingIngestor(TestCase):
+    """
+    Test case for end-to-end streaming ingestion into a separate index directory
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir = os.path.join(self.tmp.name, "files")
+        self.index_dir = os.path.join(self.tmp.name, "indices")
+        os.makedirs(self.data_dir)
+        os.makedirs(self.index_dir)
+        self.paragraphs = {"alpha": [f"alpha paragraph {i}" for i in range(9)],
+                           "beta": [f"beta paragraph {i}" for i in range(4)]}
+        for dataset_id, paragraphs in self.paragraphs.items():
+            self.write(dataset_id, paragraphs)
+
+        self.model = FakeEmbeddingModel()
+        patcher = patch.object(DataPipeline, "embedding_model", new_callable=PropertyMock, return_value=self.model)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, dataset_id, paragraphs):
+        with open(os.path.join(self.data_dir, f"{dataset_id}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(paragraphs))
+
+    def run_ingest(self, chunker: str = "paragraph"):
+        return StreamingIngestor(self.data_dir, batch_size=4, chunk_workers=2, queue_size=2,
+                                 chunker=get_chunker(chunker), index_dir=self.index_dir).run()
+
+    def test01_indices_written_to_index_dir(self):
+        """
+        Test if every file gets its own index and metadata, in file order, under the given index_dir
+        """
+        stats = self.run_ingest()
+
+        self.assertEqual((stats.files, stats.chunks, stats.embedded, stats.skipped), (2, 13, 13, 0))
+        self.assertEqual(list_indices(self.index_dir), ["alpha", "beta"])
+        for dataset_id, paragraphs in self.paragraphs.items():
+            index, metadata = load_index(dataset_id, self.index_dir, mmap=False)
+            self.assertEqual(index.ntotal, len(paragraphs))
+            self.assertEqual([meta["text"] for meta in metadata], paragraphs)
+            self.assertEqual({meta["dataset_id"] for meta in metadata}, {dataset_id})
+
+    def test02_batches_flushed_in_order(self):
+        """
+        Test if chunks reach the embedder in batches of at most batch_size, in file and paragraph order
+        """
+        self.run_ingest()
+
+        self.assertTrue(all(len(call) <= 4 for call in self.model.calls))
+        self.assertGreater(len(self.model.calls), 3)
+        self.assertEqual([text for call in self.model.calls for text in call],
+                         self.paragraphs["alpha"] + self.paragraphs["beta"])
+
+    def test03_unchanged_files_are_skipped(self):
+        """
+        Test if a second run embeds nothing and an edit only embeds the changed paragraph
+        """
+        self.run_ingest()
+        self.model.calls.clear()
+
+        stats = self.run_ingest()
+        self.assertEqual((stats.embedded, stats.skipped, stats.removed), (0, 13, 0))
+        self.assertEqual(self.model.calls, [])
+
+        self.write("beta", self.paragraphs["beta"][:3] + ["beta edited"])
+        stats = self.run_ingest()
+        self.assertEqual((stats.embedded, stats.removed), (1, 1))
+        self.assertEqual(self.model.calls, [["beta edited"]])
+        index, metadata = load_index("beta", self.index_dir, mmap=False)
+        self.assertEqual((index.ntotal, metadata[-1]["text"]), (4, "beta edited"))
+
+    def test04_chunker_change_rebuilds(self):
+        """
+        Test if switching the chunker re-embeds everything and records the new chunker in the manifest
+        """
+        self.run_ingest()
+        self.assertEqual(read_manifest("beta", self.index_dir)["chunker"], "paragraph")
+
+        stats = self.run_ingest("sliding")
+        self.assertEqual((stats.skipped, stats.embedded), (0, stats.chunks))
+        self.assertEqual(read_manifest("beta", self.index_dir)["chunker"], "sliding")
+        self.assertEqual(self.run_ingest("sliding").embedded, 0)
+
+    def test05_queries_never_build_indices(self):
+        """
+        Test if serving loads built indices as they are and refuses to build a missing one
+        """
+        self.run_ingest()
+        pipeline = DataPipeline(self.data_dir, chunker=get_chunker("paragraph"), index_dir=self.index_dir)
+        self.write("alpha", ["alpha changed"])
+        self.model.calls.clear()
+
+        entry = pipeline.get_index_entry("alpha")
+        self.assertEqual(entry.documents, self.paragraphs["alpha"])
+        with self.assertRaises(FileNotFoundError):
+            pipeline.get_index_entry("all")
+        self.assertEqual(self.model.calls, [])
+        self.assertEqual(index_files("all", self.index_dir), [])
+        self.assertFalse(pipeline.index_ready("all"))
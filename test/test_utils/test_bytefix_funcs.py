@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+from llm.utils.tools import bytefix_funcs
+from llm.utils.tools.bytefix_funcs import run_probe, run_network_diagnostics
+from llm.utils.tool_executor import get_tool_executor
+
+
+def python_probe(code: str) -> list[str]:
+    return [sys.executable, "-c", code]
+
+
+class TestBytefixProbes(IsolatedAsyncioTestCase):
+    """
+    Test case for the concurrent, time-limited Bytefix diagnostics probes
+    """
+
+    def setUp(self):
+        get_tool_executor().invalidate()
+
+    async def test01_timeout_keeps_partial_output(self):
+        """
+        Test if a probe that times out is killed and still returns the lines it printed
+        """
+        start = time.perf_counter()
+        result = await run_probe(python_probe("import time; print('hop 1', flush=True); time.sleep(30)"), timeout=1)
+
+        self.assertEqual(result["status"], "timeout")
+        self.assertIn("hop 1", result["output"])
+        self.assertLess(time.perf_counter() - start, 5)
+
+    async def test02_probes_run_concurrently_with_partial_results(self):
+        """
+        Test if the probes run at the same time and a failing or missing probe keeps the others' results
+        """
+        commands = {
+            "ping": python_probe("import time; time.sleep(1); print('4 packets received')"),
+            "traceroute": python_probe("import sys, time; time.sleep(1); sys.exit('no route')"),
+            "nslookup": ["definitely-not-an-installed-binary"],
+        }
+        start = time.perf_counter()
+        with patch.object(bytefix_funcs, "probe_commands", return_value=commands):
+            result = json.loads(await run_network_diagnostics("example.com", engine="subprocess"))
+
+        self.assertLess(time.perf_counter() - start, 1.9)
+        self.assertEqual(result["ping"]["status"], "ok")
+        self.assertIn("4 packets received", result["ping"]["output"])
+        self.assertEqual(result["traceroute"]["status"], "error")
+        self.assertIn("no route", result["traceroute"]["error"])
+        self.assertEqual(result["nslookup"]["status"], "missing")
+
+    async def test03_cancellation_kills_probe(self):
+        """
+        Test if cancelling the diagnostics (the user went away) kills the running probe process
+        """
+        handle, pid_path = tempfile.mkstemp()
+        os.close(handle)
+        code = f"import os, time; open({pid_path!r}, 'w').write(str(os.getpid())); time.sleep(30)"
+        task = asyncio.create_task(run_probe(python_probe(code), timeout=30))
+        try:
+            for _ in range(100):
+                await asyncio.sleep(0.05)
+                with open(pid_path) as f:
+                    pid = f.read()
+                if pid:
+                    break
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            with self.assertRaises(ProcessLookupError):
+                os.kill(int(pid), 0)
+        finally:
+            os.remove(pid_path)
+
+    async def test04_missing_target(self):
+        """
+        Test if a missing or option-like target is rejected without running any probe
+        """
+        for target in (None, "", "-f"):
+            self.assertIn("error", json.loads(await run_network_diagnostics(target)))
+
+    async def test05_unrunnable_probe(self):
+        """
+        Test if a probe binary that cannot be executed returns an error result instead of raising
+        """
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            result = await run_probe([path], timeout=5)
+        finally:
+            os.remove(path)
+
+        self.assertEqual(result["status"], "error")
+        self.assertIn("Permission denied", result["error"])
+
+    async def test06_malformed_target_does_not_raise(self):
+        """
+        Test if a malformed host name gives a DNS error result and any other failure an error JSON
+        """
+        result = json.loads(await run_network_diagnostics("a..b", engine="native"))
+        self.assertEqual(result["dns"]["rcode"], "FORMERR")
+        self.assertNotIn("ping", result)
+
+        with patch.object(bytefix_funcs, "_subprocess_diagnostics", side_effect=RuntimeError("boom")):
+            self.assertEqual(json.loads(await run_network_diagnostics("example.org", engine="subprocess")),
+                             {"error": "boom"})
@@ -0,0 +1,141 @@
+import os
+import time
+import zlib
+import tempfile
+import threading
+import numpy as np
+from unittest import TestCase
+from unittest.mock import patch
+from llm.utils.cache import LRUTTLCache, normalize_query
+from llm.utils.routing_cache import RoutingCache
+
+
+class TestNormalizeQuery(TestCase):
+    """
+    Test case for cache key normalization of user queries
+    """
+
+    def test01_case_and_punctuation(self):
+        """
+        Test if casing, Turkish i variants, punctuation and spacing do not change the key
+        """
+        self.assertEqual(normalize_query("İnternet bağlantım KESİLİP duruyor!!"),
+                         normalize_query("internet   bağlantım kesilip duruyor?"))
+        self.assertEqual(normalize_query("IP adresim ne işe yarar?"), normalize_query("ıp adresim ne işe yarar"))
+
+    def test02_hostnames_stay_distinct(self):
+        """
+        Test if hostnames in the query keep the key distinct
+        """
+        self.assertNotEqual(normalize_query("github.com için teşhis yap"),
+                            normalize_query("google.com için teşhis yap"))
+
+
+class TestLRUTTLCache(TestCase):
+    """
+    Test case for LRU eviction, TTL expiry and counters
+    """
+
+    def test01_lru_eviction(self):
+        """
+        Test if the least recently used entry is evicted first
+        """
+        cache = LRUTTLCache(max_size=2, ttl=None)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        evicted = cache.put("c", 3)
+
+        self.assertEqual(evicted, ["b"])
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+
+    def test02_ttl_expiry(self):
+        """
+        Test if entries older than their ttl are treated as misses
+        """
+        cache = LRUTTLCache(max_size=10, ttl=60)
+        cache.put("old", 1, created=time.time() - 120)
+        cache.put("short", 2, ttl=0.0, created=time.time() - 1)
+        cache.put("fresh", 3)
+
+        self.assertIsNone(cache.get("old"))
+        self.assertIsNone(cache.get("short"))
+        self.assertEqual(cache.get("fresh"), 3)
+        self.assertEqual(cache.stats()["expirations"], 2)
+
+    def test03_hit_rate(self):
+        """
+        Test if hits and misses are counted
+        """
+        cache = LRUTTLCache()
+        cache.put("a", 1)
+        cache.get("a")
+        cache.get("missing")
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 0.5)
+
+
+def fake_encode(texts: list[str]) -> np.ndarray:
+    """Deterministic unit vectors per text, standing in for the embedding model."""
+    vectors = np.stack([np.random.default_rng(zlib.crc32(t.encode())).standard_normal(16) for t in texts])
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype("float32")
+
+
+class TestRoutingCache(TestCase):
+    """
+    Test case for semantic lookups of the routing cache under concurrent sessions
+    """
+
+    def test01_concurrent_lookups_and_puts(self):
+        """
+        Test if lookups racing with puts and evictions never pair the embedding matrix with the wrong keys
+        """
+        cache = RoutingCache("test", max_size=8, semantic_threshold=0.99)
+        errors = []
+
+        def session(n: int):
+            try:
+                for i in range(60):
+                    cache.put(f"query {n} {i}", "fixie")
+                    self.assertEqual(cache.get(f"query {n} {i}"), "fixie")
+                    cache.get(f"other {n} {i}")
+            except Exception as e:
+                errors.append(e)
+
+        with patch.object(cache, "_encode", side_effect=fake_encode):
+            threads = [threading.Thread(target=session, args=(n,)) for n in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertIsNone(cache._semantic_lookup("query 0 0")[0])
+            cache.put("last query", "bytefix")
+            self.assertEqual(cache._semantic_lookup("last query")[0], "last query")
+
+        self.assertEqual(errors, [])
+        self.assertEqual(cache._matrix.shape[0], len(cache._matrix_keys))
+        self.assertLessEqual(len(cache._embeddings), 8)
+
+    def test02_persisted_writes_are_debounced(self):
+        """
+        Test if a burst of puts is written to disk once, later and off the calling thread
+        """
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "routing_cache_test.json")
+        cache = RoutingCache("test", persist_path=path, save_delay=0.2)
+
+        with patch.object(cache, "_save", wraps=cache._save) as save:
+            for i in range(20):
+                cache.put(f"query {i}", "fixie")
+            self.assertFalse(os.path.exists(path))
+            time.sleep(0.5)
+            self.assertEqual(save.call_count, 1)
+        self.assertEqual(len(RoutingCache("test", persist_path=path)._cache), 20)
+
+        cache.put("last query", "bytefix")
+        cache.flush()
+        self.assertEqual(RoutingCache("test", persist_path=path).get("last query"), "bytefix")
@@ -0,0 +1,85 @@
+import json
+from unittest import TestCase
+from llm.utils.tools.compaction import parse_ping, parse_traceroute, parse_nslookup, compact_tool_output, \
+    compact_results, estimate_tokens
+
+PING = """PING google.com (142.250.185.78) 56(84) bytes of data.
+64 bytes from fra16s51-in-f14.1e100.net (142.250.185.78): icmp_seq=1 ttl=117 time=12.1 ms
+64 bytes from fra16s51-in-f14.1e100.net (142.250.185.78): icmp_seq=2 ttl=117 time=11.9 ms
+
+--- google.com ping statistics ---
+4 packets transmitted, 3 received, 25% packet loss, time 3004ms
+rtt min/avg/max/mdev = 11.902/12.118/12.410/0.187 ms
+"""
+TRACEROUTE = """traceroute to google.com (142.250.185.78), 15 hops max, 60 byte packets
+ 1  _gateway (192.168.1.1)  0.512 ms  0.480 ms  0.455 ms
+ 2  * * *
+ 3  10.20.0.1  5.1 ms * 5.0 ms
+ 4  72.14.204.1 (72.14.204.1)  75.3 ms  76.0 ms  74.9 ms
+ 5  142.250.185.78 (142.250.185.78)  12.0 ms  12.2 ms  12.1 ms
+"""
+NSLOOKUP = """Server:		127.0.0.53
+Address:	127.0.0.53#53
+
+Non-authoritative answer:
+Name:	google.com
+Address: 142.250.185.78
+Name:	google.com
+Address: 2a00:1450:4001:82b::200e
+"""
+
+
+class TestToolOutputCompaction(TestCase):
+    """
+    Test case for parsing and size-bounding tool output before it is put into a prompt
+    """
+
+    def test01_parse_ping(self):
+        """
+        Test if ping output is reduced to packet counts, loss and RTT statistics
+        """
+        self.assertEqual(parse_ping(PING), {"sent": 4, "received": 3, "loss_pct": 25.0, "min_ms": 11.902,
+                                            "avg_ms": 12.118, "max_ms": 12.41, "jitter_ms": 0.187})
+
+    def test02_parse_traceroute_and_nslookup(self):
+        """
+        Test if traceroute hops (including silent ones) and nslookup addresses are parsed
+        """
+        hops = parse_traceroute(TRACEROUTE)
+        self.assertEqual(hops[0], [1, "192.168.1.1", 0.455])
+        self.assertEqual(hops[1], [2, "*", None])
+        self.assertEqual(hops[2], [3, "10.20.0.1", 5.0])
+        self.assertEqual(len(hops), 5)
+
+        lookup = parse_nslookup(NSLOOKUP)
+        self.assertEqual(lookup["addresses"], ["142.250.185.78", "2a00:1450:4001:82b::200e"])
+        self.assertEqual(parse_nslookup("** server can't find nope.invalid: NXDOMAIN")["error"], "NXDOMAIN")
+
+    def test03_diagnostics_fit_budget(self):
+        """
+        Test if raw diagnostics shrink to a structured summary and a tight budget keeps only failing hops
+        """
+        raw = json.dumps({"target": "google.com", "engine": "subprocess",
+                          "ping": {"status": "ok", "output": PING},
+                          "traceroute": {"status": "timeout", "output": TRACEROUTE, "error": "Timed out after 30s"},
+                          "nslookup": {"status": "ok", "output": NSLOOKUP}}, indent=2)
+        compact = compact_tool_output("run_network_diagnostics", raw)
+        self.assertLess(estimate_tokens(compact), estimate_tokens(raw) / 2)
+        self.assertEqual(json.loads(compact)["traceroute"]["status"], "timeout")
+
+        summary = json.loads(compact_tool_output("run_network_diagnostics", raw, budget=100))
+        self.assertEqual(summary["traceroute"]["no_reply"], [2])
+        self.assertEqual(summary["traceroute"]["slow"], [[4, "72.14.204.1", 74.9]])
+        self.assertNotIn("route", summary["traceroute"])
+        self.assertLessEqual(estimate_tokens(compact_tool_output("run_network_diagnostics", raw, budget=20)), 20)
+
+    def test04_speed_test_and_passthrough(self):
+        """
+        Test if speed test text is parsed into numbers while diagrams and RAG passages are left untouched
+        """
+        speed = "User: hız\nInternet Speed Test Results:\n- Download Speed: 94.20 Mbps\n- Upload Speed: 20.10 Mbps\n- Ping: 12.00 ms"
+        self.assertEqual(json.loads(compact_tool_output("run_speed_test", speed)),
+                         {"download_mbps": 94.2, "upload_mbps": 20.1, "ping_ms": 12.0})
+        diagram = "A---B\n" * 500
+        self.assertEqual(compact_tool_output("draw_topology_diagram", diagram, budget=10), diagram)
+        self.assertTrue(compact_results({"run_speed_test": speed}).startswith("run_speed_test: {"))
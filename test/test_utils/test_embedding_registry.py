@@ -0,0 +1,69 @@
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+from llm.utils.embedding_registry import EmbeddingModelRegistry
+
+
+class TestEmbeddingModelRegistry(TestCase):
+    """
+    Test case for ensuring the embedding model is loaded once per (model, device)
+    """
+
+    def setUp(self):
+        self.registry = EmbeddingModelRegistry()
+        self.load_calls = []
+
+        def fake_load(model_name, device, backend):
+            self.load_calls.append((model_name, device))
+            return object()
+
+        patcher = patch.object(self.registry, "_load", side_effect=fake_load)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test01_same_key_loads_once(self):
+        """
+        Test if repeated lookups return the same instance without reloading
+        """
+        first = self.registry.get("model-a", "cpu")
+        second = self.registry.get("model-a", "cpu")
+
+        self.assertIs(first, second)
+        self.assertEqual(self.load_calls, [("model-a", "cpu")])
+
+    def test02_concurrent_first_use_loads_once(self):
+        """
+        Test if concurrent first lookups from many threads trigger a single load
+        """
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.registry.get("model-a", "cpu")))
+                   for _ in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(self.load_calls), 1)
+        self.assertEqual(len({id(r) for r in results}), 1)
+
+    def test03_devices_are_separate(self):
+        """
+        Test if different devices get their own model instance
+        """
+        cpu_model = self.registry.get("model-a", "cpu")
+        mps_model = self.registry.get("model-a", "mps")
+
+        self.assertIsNot(cpu_model, mps_model)
+        self.assertEqual(len(self.load_calls), 2)
+
+    def test04_backends_are_separate(self):
+        """
+        Test if each embedding backend gets its own model and unknown backends are rejected
+        """
+        torch_model = self.registry.get("model-a", "cpu", "torch")
+        int8_model = self.registry.get("model-a", "cpu", "int8")
+
+        self.assertIsNot(torch_model, int8_model)
+        self.assertTrue(self.registry.is_loaded("model-a", "cpu", "int8"))
+        with self.assertRaises(ValueError):
+            self.registry.get("model-a", "cpu", "tensorrt")
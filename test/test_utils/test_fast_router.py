@@ -0,0 +1,83 @@
+import numpy as np
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+from llm.utils import select_agent
+from llm.utils.fast_router import FastRouter
+
+
+def unit(*weights) -> np.ndarray:
+    vector = np.asarray(weights, dtype="float32")
+    return vector / np.linalg.norm(vector)
+
+
+class FakeDecider:
+    def __init__(self, answer: str):
+        self.answer = answer
+        self.calls = 0
+
+    async def chat(self, model, messages, **kwargs):
+        self.calls += 1
+        return {"message": {"content": f"agent: {self.answer}"}}
+
+
+class FakeCache:
+    def get(self, query):
+        return None
+
+    def put(self, query, value):
+        pass
+
+
+class TestFastRouter(IsolatedAsyncioTestCase):
+    """
+    Test case for the embedding fast-path router and its deferral to the decider model
+    """
+
+    def setUp(self):
+        self.router = FastRouter(threshold=0.6, margin=0.08)
+        # one axis per persona instead of real centroids, queries are encoded by the table below
+        self.router.personas = ["fixie", "bytefix", "hypernet"]
+        self.router._centroids = np.eye(3, dtype="float32")
+        self.queries = {
+            "modemim kopuyor": unit(1, 0.1, 0),
+            "belirsiz soru": unit(1, 1, 1),
+            "ping mi hız mı": unit(0, 1, 0.95),
+        }
+        patcher = patch.object(self.router, "_encode", side_effect=lambda texts: np.stack([self.queries[t] for t in texts]))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test01_confident_query_is_routed(self):
+        """
+        Test if a query above the threshold and margin is routed without the decider
+        """
+        self.assertEqual(self.router.route("modemim kopuyor"), "fixie")
+        self.assertEqual(self.router.stats()["fast_routes"], 1)
+
+    def test02_low_score_or_margin_defers(self):
+        """
+        Test if a query below the threshold, or too close to the runner-up, is left to the decider
+        """
+        persona, score, _ = self.router.classify("belirsiz soru")
+        self.assertLess(score, self.router.threshold)
+        self.assertIsNone(self.router.route("belirsiz soru"))
+
+        persona, score, margin = self.router.classify("ping mi hız mı")
+        self.assertEqual(persona, "bytefix")
+        self.assertGreaterEqual(score, self.router.threshold)
+        self.assertLess(margin, self.router.margin)
+        self.assertIsNone(self.router.route("ping mi hız mı"))
+        self.assertEqual(self.router.stats(), {"fast_routes": 0, "decider_fallbacks": 2, "fast_ratio": 0.0})
+
+    async def test03_select_agent_uses_decider_only_when_unsure(self):
+        """
+        Test if agent selection calls the decider model only when the fast path returns no persona
+        """
+        decider = FakeDecider("hypernet")
+        with patch.object(select_agent, "get_fast_router", return_value=self.router), \
+                patch.object(select_agent, "get_persona_cache", return_value=FakeCache()), \
+                patch.object(select_agent, "get_ollama_client", return_value=decider):
+            self.assertEqual(await select_agent.select_agent_async("modemim kopuyor"), "fixie")
+            self.assertEqual(decider.calls, 0)
+            self.assertEqual(await select_agent.select_agent_async("ping mi hız mı"), "hypernet")
+            self.assertEqual(decider.calls, 1)
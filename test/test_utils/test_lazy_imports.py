@@ -0,0 +1,101 @@
+import os
+import re
+import sys
+import subprocess
+from unittest import TestCase
+from llm.utils.lazy import LazyModule
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+# cumulative import time allowed for the entry points' project modules (-X importtime, microseconds)
+IMPORT_TIME_BUDGET_US = int(os.environ.get("IMPORT_TIME_BUDGET_US", "1500000"))
+HEAVY_MODULES = ("torch", "sentence_transformers", "faiss", "google.generativeai", "speedtest", "networkx")
+# modules a session imports before it first needs RAG, Gemini or a speed test
+AGENT_MODULES = ["llm.agents.rag_agent", "llm.agents.gemini_chat_agent", "llm.utils.tools.hypernet_funcs",
+                 "llm.utils.tools.professor_ping_funcs"]
+
+# top-level import lines; the scripts are scanned rather than parsed since app.py needs Python 3.12 syntax
+_IMPORT_LINE = re.compile(r"^(?:from\s+([\w.]+)\s+import|import\s+([\w.]+))", re.MULTILINE)
+
+_PROBE = """
+import sys, importlib
+for name in sys.argv[1:]:
+    try:
+        importlib.import_module(name)
+    except ModuleNotFoundError as e:
+        print("missing", name, e.name)
+print("heavy", *[m for m in {heavy!r} if m in sys.modules])
+"""
+
+
+def entry_point_modules(*scripts: str) -> list[str]:
+    """Project modules (llm.*, utils.*) imported at the top level of the entry-point scripts."""
+    modules = []
+    for script in scripts:
+        with open(os.path.join(ROOT, script), "r", encoding="utf-8") as f:
+            source = f.read()
+        for match in _IMPORT_LINE.finditer(source):
+            name = match.group(1) or match.group(2)
+            if name.split(".")[0] in ("llm", "utils") and name not in modules:
+                modules.append(name)
+    return modules
+
+
+def import_time_breakdown(modules: list[str]) -> tuple[dict, str]:
+    """Import `modules` in a fresh interpreter with -X importtime; returns ({module: cumulative us}, stdout)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(heavy=HEAVY_MODULES), *modules],
+        cwd=ROOT, capture_output=True, text=True, timeout=120,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|").split("|")]
+        if cumulative_us.isdigit():
+            cumulative[name] = int(cumulative_us)
+    return cumulative, result.stdout
+
+
+class TestLazyImports(TestCase):
+    """
+    Test case for lazy heavy imports and the import-time budget of app.py / main.py
+    """
+
+    def test01_lazy_module_loads_on_first_use(self):
+        """
+        Test if a lazy module is imported only when an attribute is first read
+        """
+        sys.modules.pop("colorsys", None)
+        colorsys = LazyModule("colorsys")
+
+        self.assertNotIn("colorsys", sys.modules)
+        self.assertEqual(colorsys.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertIn("colorsys", sys.modules)
+        with self.assertRaises(AttributeError):
+            colorsys.not_a_function
+
+    def test02_entry_points_skip_heavy_modules(self):
+        """
+        Test if importing the entry points and agents loads no heavy dependency and stays within the budget
+        """
+        modules = entry_point_modules("app.py", "main.py") + AGENT_MODULES
+        cumulative, stdout = import_time_breakdown(modules)
+        slowest = sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:15]
+        breakdown = "\n".join(f"{us / 1000:9.1f} ms  {name}" for name, us in slowest)
+        print(f"\n-X importtime breakdown (cumulative) for {', '.join(modules)}:\n{breakdown}")
+
+        # "missing <module> <dependency>": a module that did not import was neither checked nor timed
+        missing = [line.split()[1:] for line in stdout.splitlines() if line.startswith("missing ")]
+        broken = [f"{name} ({dependency})" for name, dependency in missing
+                  if dependency.split(".")[0] in ("llm", "utils")]
+        self.assertEqual(broken, [], "entry-point modules import project modules that do not exist")
+        if missing:
+            self.skipTest("dependencies not installed, cannot check "
+                          + ", ".join(f"{name} ({dependency})" for name, dependency in missing))
+
+        heavy = stdout.split("heavy", 1)[1].split() if "heavy" in stdout else []
+        self.assertEqual(heavy, [], f"heavy modules imported eagerly:\n{breakdown}")
+        total = sum(cumulative.get(name, 0) for name in modules)
+        self.assertLessEqual(total, IMPORT_TIME_BUDGET_US,
+                             f"import time {total / 1000:.0f} ms over budget {IMPORT_TIME_BUDGET_US / 1000:.0f} ms:\n{breakdown}")
@@ -0,0 +1,107 @@
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+from llm.utils.ollama_client import OllamaClientPool
+
+
+class _FakeOllama(BaseHTTPRequestHandler):
+    """Answers /api/chat after a short delay and records concurrency and client connections."""
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+    connections = set()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+            cls.connections.add(self.client_address)
+        time.sleep(0.1)
+        with cls.lock:
+            cls.in_flight -= 1
+        parts = [{"model": body["model"], "message": {"role": "assistant", "content": word}, "done": False}
+                 for word in ("a", "b")] + [{"model": body["model"], "message": {"role": "assistant", "content": ""},
+                                             "done": True}]
+        if body.get("stream"):
+            payload = "".join(json.dumps(part) + "\n" for part in parts).encode()
+        else:
+            payload = json.dumps({**parts[-1], "message": {"role": "assistant", "content": "ok"}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestOllamaClientPool(TestCase):
+    """
+    Test case for the shared Ollama client across event loops and threads
+    """
+
+    def setUp(self):
+        _FakeOllama.in_flight, _FakeOllama.peak, _FakeOllama.connections = 0, 0, set()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOllama)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.pool = OllamaClientPool(host=f"http://127.0.0.1:{self.server.server_port}", model_concurrency="2")
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def chat(self, n: int = 1):
+        async def turn():
+            return await asyncio.gather(*(self.pool.chat("gemma3", [{"role": "user", "content": "hi"}])
+                                          for _ in range(n)))
+        # a new event loop per call, like a Streamlit turn
+        return asyncio.run(turn())
+
+    def test01_client_reused_across_event_loops(self):
+        """
+        Test if consecutive asyncio.run turns share one client and its keep-alive connection
+        """
+        self.assertEqual(self.chat()[0]["message"]["content"], "ok")
+        client = self.pool._client
+        self.chat()
+
+        self.assertIs(self.pool._client, client)
+        self.assertEqual(len(_FakeOllama.connections), 1)
+
+    def test02_model_limit_holds_across_event_loops(self):
+        """
+        Test if calls from several event loops in parallel threads never exceed the per-model limit together
+        """
+        threads = [threading.Thread(target=self.chat, args=(3,)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        self.pool.chat_sync("gemma3", [{"role": "user", "content": "hi"}])
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(_FakeOllama.peak, 2)
+        self.assertEqual(self.pool.stats()["gemma3"]["requests"], 7)
+
+    def test03_stream_and_cancel(self):
+        """
+        Test if a stream yields every part and a cancelled call frees its slot
+        """
+        async def turn():
+            parts = [part["message"]["content"] async for part in
+                     await self.pool.chat("gemma3", [{"role": "user", "content": "hi"}], stream=True)]
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(self.pool.chat("gemma3", [{"role": "user", "content": "hi"}]), 0.01)
+            return parts
+
+        self.assertEqual(asyncio.run(turn()), ["a", "b", ""])
+        time.sleep(0.2)
+        self.assertEqual(self.pool._semaphores["gemma3"]._value, 2)
+        self.assertEqual(self.chat(2)[1]["message"]["content"], "ok")
@@ -0,0 +1,127 @@
+import sys
+import socket
+import struct
+import asyncio
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from llm.utils.tools.probes import RttStats, dns_query, resolve, tcp_ping, icmp_ping, traceroute, build_dns_query
+
+
+class StubDnsServer(asyncio.DatagramProtocol):
+    """Answers every A query on loopback with 10.0.0.<n> records, or NXDOMAIN for names under .invalid"""
+
+    def __init__(self, records: int = 2):
+        self.records = records
+        self.queries = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.queries += 1
+        query_id, _ = struct.unpack("!HH", data[:4])
+        question = data[12:]
+        nxdomain = b"\x07invalid\x00" in question
+        answers = b"" if nxdomain else b"".join(
+            b"\xc0\x0c" + struct.pack("!HHIH", 1, 1, 60, 4) + bytes([10, 0, 0, i + 1]) for i in range(self.records)
+        )
+        header = struct.pack("!HHHHHH", query_id, 0x8183 if nxdomain else 0x8180, 1,
+                             0 if nxdomain else self.records, 0, 0)
+        self.transport.sendto(header + question + answers, addr)
+
+
+class TestProbes(IsolatedAsyncioTestCase):
+    """
+    Test case for the native Bytefix probe engine against loopback servers
+    """
+
+    async def asyncSetUp(self):
+        loop = asyncio.get_running_loop()
+        self.dns_transport, self.dns = await loop.create_datagram_endpoint(StubDnsServer, local_addr=("127.0.0.1", 0))
+        self.dns_port = self.dns_transport.get_extra_info("sockname")[1]
+        self.tcp_server = await asyncio.start_server(lambda r, w: w.close(), "127.0.0.1", 0)
+        self.tcp_port = self.tcp_server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.dns_transport.close()
+        self.tcp_server.close()
+        await self.tcp_server.wait_closed()
+
+    def test01_rtt_stats(self):
+        """
+        Test if RTT statistics report min/avg/max, jitter and loss of a probe series
+        """
+        stats = RttStats(target="host", method="tcp", sent=5, samples=[10.0, 14.0, 12.0, 16.0])
+        result = stats.to_dict()
+
+        self.assertEqual((result["min_ms"], result["avg_ms"], result["max_ms"]), (10.0, 13.0, 16.0))
+        self.assertEqual(result["jitter_ms"], round((4 + 2 + 4) / 3, 2))
+        self.assertEqual(result["loss_pct"], 20.0)
+        self.assertNotIn("avg_ms", RttStats(target="host", method="tcp", sent=3).to_dict())
+
+    async def test02_dns_query_against_stub_server(self):
+        """
+        Test if a DNS query to the stub server returns its A records, timing and NXDOMAIN
+        """
+        result = await dns_query("fixie.example", server="127.0.0.1", port=self.dns_port)
+
+        self.assertEqual(result.addresses, ["10.0.0.1", "10.0.0.2"])
+        self.assertEqual(result.rcode, "NOERROR")
+        self.assertGreaterEqual(result.rtt_ms, 0)
+        missing = await dns_query("nothing.invalid", server="127.0.0.1", port=self.dns_port)
+        self.assertEqual((missing.rcode, missing.addresses), ("NXDOMAIN", []))
+        self.assertEqual(build_dns_query("a.b", query_id=7)[:2], b"\x00\x07")
+
+    async def test03_resolve_falls_back_and_skips_literals(self):
+        """
+        Test if resolve returns IP literals unchanged and uses the system resolver when the server is silent
+        """
+        literal = await resolve("127.0.0.1", server="127.0.0.1", port=self.dns_port)
+        self.assertEqual(literal.addresses, ["127.0.0.1"])
+        self.assertEqual(self.dns.queries, 0)
+
+        silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        silent.bind(("127.0.0.1", 0))
+        try:
+            result = await resolve("localhost", server="127.0.0.1", port=silent.getsockname()[1], timeout=0.3)
+        finally:
+            silent.close()
+        self.assertEqual(result.server, "system")
+        self.assertTrue(result.addresses)
+
+    async def test04_tcp_ping_loopback(self):
+        """
+        Test if TCP connect latency is measured against a loopback server with no loss
+        """
+        stats = await tcp_ping("127.0.0.1", self.tcp_port, count=3, interval=0)
+
+        self.assertEqual((stats.sent, stats.received, stats.loss_pct), (3, 3, 0.0))
+        self.assertLess(stats.to_dict()["max_ms"], 1000)
+
+    async def test05_icmp_and_traceroute_loopback(self):
+        """
+        Test if ICMP echo and the UDP traceroute reach loopback in one hop, where the platform allows them
+        """
+        try:
+            stats = await icmp_ping("127.0.0.1", count=2, interval=0)
+        except PermissionError:
+            stats = None
+        if stats is not None:
+            self.assertEqual(stats.received, 2)
+
+        if not sys.platform.startswith("linux"):
+            raise unittest.SkipTest("native traceroute needs Linux")
+        trace = await traceroute("127.0.0.1", max_hops=3, timeout=1)
+        self.assertTrue(trace.reached)
+        self.assertEqual(trace.to_dict()["hops"][0][:2], [1, "127.0.0.1"])
+
+    async def test06_malformed_names_are_formerr(self):
+        """
+        Test if names with an empty or over-long label give FORMERR without a query instead of raising
+        """
+        for name in ("a..b", "x" * 64 + ".example"):
+            result = await resolve(name, server="127.0.0.1", port=self.dns_port)
+            self.assertEqual((result.rcode, result.addresses), ("FORMERR", []))
+        self.assertEqual(self.dns.queries, 0)
+        with self.assertRaises(ValueError):
+            build_dns_query("a..b")
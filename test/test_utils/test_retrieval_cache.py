@@ -0,0 +1,52 @@
+from unittest import TestCase
+import numpy as np
+from llm.utils.retrieval_cache import RetrievalCache, QueryEmbeddingCache
+
+
+class CountingModel:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded += texts
+        return np.array([[len(text), 1.0] for text in texts], dtype="float32")
+
+
+class TestRetrievalCache(TestCase):
+    """
+    Test case for the retrieval result cache and the query embedding cache
+    """
+
+    def test01_hits_on_normalized_query_and_same_version(self):
+        """
+        Test if a differently cased / punctuated query hits the entry cached for the same index version
+        """
+        cache = RetrievalCache(max_size=8, ttl=60)
+        cache.put(cache.key("all", "", "Modem ışıkları yanmıyor!", 3), 1, ["hit"])
+
+        self.assertEqual(cache.get(cache.key("all", "", "modem ışıkları yanmıyor", 3), 1), ["hit"])
+        self.assertIsNone(cache.get(cache.key("all", "", "modem ışıkları yanmıyor", 5), 1))
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test02_new_index_version_invalidates(self):
+        """
+        Test if an entry computed on an older index version is dropped instead of served
+        """
+        cache = RetrievalCache(max_size=8, ttl=60)
+        key = cache.key("all", "", "dns", 3)
+        cache.put(key, 1, ["old"])
+
+        self.assertIsNone(cache.get(key, 2))
+        self.assertIsNone(cache.get(key, 1))
+        self.assertEqual(cache.stats()["invalidated"], 1)
+
+    def test03_embedding_cache_encodes_only_new_strings(self):
+        """
+        Test if repeated query strings are encoded once and results keep the input order
+        """
+        model, cache = CountingModel(), QueryEmbeddingCache(max_size=8)
+        cache.encode(model, "m", ["a", "bb"])
+        vectors = cache.encode(model, "m", ["bb", "ccc", "a"])
+
+        self.assertEqual(model.encoded, ["a", "bb", "ccc"])
+        self.assertEqual(vectors[:, 0].tolist(), [2.0, 3.0, 1.0])
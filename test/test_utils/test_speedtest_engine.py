@@ -0,0 +1,75 @@
+import time
+import socket
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from llm.utils.tools.speedtest_engine import SpeedTestServer, HttpSpeedTest, PHASES
+from llm.utils.tools.hypernet_funcs import run_speed_test
+from llm.utils.tool_executor import get_tool_executor
+
+
+class TestSpeedTestEngine(IsolatedAsyncioTestCase):
+    """
+    Test case for the HyperNet speed test engine against the local throughput server
+    """
+
+    async def asyncSetUp(self):
+        self.server = await SpeedTestServer().start()
+        get_tool_executor().invalidate()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def test01_phases_stream_in_order(self):
+        """
+        Test if latency, download and upload are reported one by one and end up in the final text
+        """
+        seen = []
+
+        async def on_progress(progress):
+            seen.append((progress.phase, progress.message()))
+
+        text = await run_speed_test("hız testi", on_progress=on_progress, server_url=self.server.url)
+
+        self.assertEqual([phase for phase, _ in seen], list(PHASES))
+        self.assertIn("Download Speed:", text)
+        self.assertIn("Upload Speed:", text)
+        self.assertIn("Ping:", text)
+
+    async def test02_cancel_during_download(self):
+        """
+        Test if cancelling the test while data is being transferred stops it right away
+        """
+        engine = HttpSpeedTest(self.server.url, download_bytes=1 << 30, connections=1, latency_samples=1)
+        phases = engine.phases()
+        self.assertEqual((await anext(phases)).phase, "latency")
+
+        task = asyncio.create_task(anext(phases))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertLess(time.perf_counter() - start, 1)
+
+    async def test03_unreachable_server(self):
+        """
+        Test if a speed test against a server that is not listening fails without raising
+        """
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        text = await run_speed_test("hız testi", server_url=f"http://127.0.0.1:{port}")
+
+        self.assertEqual(text, "Internet speed test failed.")
+
+    async def test04_concurrent_tests_share_one_measurement(self):
+        """
+        Test if speed tests requested at the same time measure once and the later one is marked as shared
+        """
+        first, second = await asyncio.gather(run_speed_test("bir", server_url=self.server.url),
+                                             run_speed_test("iki", server_url=self.server.url))
+
+        self.assertTrue(first.startswith("User: bir"))
+        self.assertTrue(second.startswith("User: iki"))
+        self.assertEqual(sum("shared from a test running at the same time" in text for text in (first, second)), 1)
+        self.assertIn("shared from a test", await run_speed_test("üç", server_url=self.server.url))
@@ -0,0 +1,98 @@
+import time
+import asyncio
+import threading
+from unittest import IsolatedAsyncioTestCase
+from llm.utils.tool_executor import ToolExecutor, FRESH, CACHED, COALESCED
+
+
+class TestToolExecutor(IsolatedAsyncioTestCase):
+    """
+    Test case for single-flight execution and TTL caching of expensive tools
+    """
+
+    def setUp(self):
+        self.executor = ToolExecutor(ttls={"slow_tool": 60, "short_tool": 0.2})
+        self.calls = 0
+
+    async def slow_call(self, value="result", delay=0.2):
+        self.calls += 1
+        await asyncio.sleep(delay)
+        return value
+
+    async def test01_concurrent_calls_coalesce(self):
+        """
+        Test if identical concurrent calls run the tool once and report fresh / coalesced
+        """
+        results = await asyncio.gather(*(self.executor.run("slow_tool", self.slow_call, {"target": "Google.com "})
+                                         for _ in range(5)))
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(sorted(r.source for r in results), [COALESCED] * 4 + [FRESH])
+        self.assertTrue(all(r.value == "result" for r in results))
+
+    async def test02_cache_per_normalized_parameters(self):
+        """
+        Test if results are reused for equal parameters until their tool TTL runs out
+        """
+        first = await self.executor.run("short_tool", self.slow_call, {"target": "google.com", "on_progress": print})
+        again = await self.executor.run("short_tool", self.slow_call, {"target": " GOOGLE.com"})
+        other = await self.executor.run("short_tool", self.slow_call, {"target": "example.com"})
+        self.assertEqual((first.source, again.source, other.source), (FRESH, CACHED, FRESH))
+
+        await asyncio.sleep(0.25)
+        expired = await self.executor.run("short_tool", self.slow_call, {"target": "google.com"})
+        self.assertEqual(expired.source, FRESH)
+        self.assertEqual(self.calls, 3)
+        self.assertEqual(self.executor.stats()["tools"]["short_tool"], {FRESH: 3, CACHED: 1, COALESCED: 0})
+
+    async def test03_failures_are_shared_not_cached(self):
+        """
+        Test if a failing run raises for every waiting caller and the next call runs again
+        """
+        async def failing():
+            self.calls += 1
+            await asyncio.sleep(0.1)
+            raise ConnectionError("link down")
+
+        results = await asyncio.gather(*(self.executor.run("slow_tool", failing) for _ in range(3)),
+                                       return_exceptions=True)
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(isinstance(r, ConnectionError) for r in results))
+
+        result = await self.executor.run("slow_tool", self.slow_call)
+        self.assertEqual(result.source, FRESH)
+
+    async def test04_cancelled_leader_hands_over(self):
+        """
+        Test if a waiting caller runs the tool itself when the caller running it is cancelled
+        """
+        leader = asyncio.create_task(self.executor.run("slow_tool", self.slow_call))
+        await asyncio.sleep(0.05)
+        follower = asyncio.create_task(self.executor.run("slow_tool", self.slow_call))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+
+        result = await follower
+        self.assertEqual(result.source, FRESH)
+        self.assertEqual(self.calls, 2)
+
+    def test05_coalesce_across_event_loops(self):
+        """
+        Test if calls from two threads with their own event loops (Streamlit turns) share one run
+        """
+        sources = []
+
+        def turn():
+            result = asyncio.run(self.executor.run("slow_tool", lambda: self.slow_call(delay=0.3)))
+            sources.append(result.source)
+
+        threads = [threading.Thread(target=turn) for _ in range(2)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(sources), [COALESCED, FRESH])
+        self.assertEqual(self.calls, 1)
+        self.assertLess(time.perf_counter() - start, 0.55)
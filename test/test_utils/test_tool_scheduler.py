@@ -0,0 +1,92 @@
+import asyncio
+from collections import Counter
+from unittest import IsolatedAsyncioTestCase
+from llm.utils.tool_scheduler import ToolScheduler, ToolBusyError, ToolQueued, set_tool_context
+
+
+class TestToolScheduler(IsolatedAsyncioTestCase):
+    """
+    Test case for bounded, fair scheduling of tool runs across sessions
+    """
+
+    def setUp(self):
+        self.running = Counter()
+        self.peak = Counter()
+        self.order = []
+
+    async def run_tool(self, scheduler, tool, session, label=None, duration=0.05):
+        async with scheduler.slot(tool, session):
+            self.running[tool] += 1
+            self.running["all"] += 1
+            for key in (tool, "all"):
+                self.peak[key] = max(self.peak[key], self.running[key])
+            self.order.append(label or session)
+            await asyncio.sleep(duration)
+            self.running[tool] -= 1
+            self.running["all"] -= 1
+
+    async def test01_per_tool_and_global_limits(self):
+        """
+        Test if no tool runs above its own limit and all tools together stay within the global cap
+        """
+        scheduler = ToolScheduler(limits={"speed": 1, "trace": 3}, global_limit=3)
+        await asyncio.gather(*(self.run_tool(scheduler, "speed", f"s{i}") for i in range(3)),
+                             *(self.run_tool(scheduler, "trace", f"t{i}") for i in range(5)))
+
+        self.assertEqual(self.peak["speed"], 1)
+        self.assertLessEqual(self.peak["trace"], 3)
+        self.assertEqual(self.peak["all"], 3)
+        self.assertEqual(scheduler.stats()["started"], 8)
+
+    async def test02_sessions_are_served_round_robin(self):
+        """
+        Test if a session bursting many runs does not delay another session's single run to the end
+        """
+        scheduler = ToolScheduler(limits={"trace": 1}, global_limit=1)
+        burst = [asyncio.create_task(self.run_tool(scheduler, "trace", "burst", f"burst{i}")) for i in range(5)]
+        await asyncio.sleep(0.01)
+        other = asyncio.create_task(self.run_tool(scheduler, "trace", "other"))
+        await asyncio.gather(*burst, other)
+
+        self.assertEqual(self.order[:3], ["burst0", "burst1", "other"])
+
+    async def test03_backpressure(self):
+        """
+        Test if a queued run notifies the user, a full queue refuses runs and a long wait times out
+        """
+        scheduler = ToolScheduler(limits={"speed": 1}, global_limit=4, queue_limit=1, queue_timeout=0.1)
+        notices = []
+        set_tool_context("session-b", notices.append)
+
+        first = asyncio.create_task(self.run_tool(scheduler, "speed", "a", duration=0.3))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.create_task(self.run_tool(scheduler, "speed", "session-b"))
+        await asyncio.sleep(0.01)
+        self.assertEqual(scheduler.stats()["queue_depth"], 1)
+        with self.assertRaises(ToolBusyError):
+            await self.run_tool(scheduler, "speed", "c")
+        with self.assertRaises(ToolBusyError):
+            await waiting
+        await first
+
+        self.assertIsInstance(notices[0], ToolQueued)
+        self.assertIn("queued", notices[0].message())
+        stats = scheduler.stats()
+        self.assertEqual((stats["rejected"], stats["timed_out"], stats["queue_depth"]), (1, 1, 0))
+
+    async def test04_cancelled_waiter_leaves_queue(self):
+        """
+        Test if cancelling a waiting run removes it from the queue and the next run still gets the slot
+        """
+        scheduler = ToolScheduler(limits={"trace": 1}, global_limit=1)
+        first = asyncio.create_task(self.run_tool(scheduler, "trace", "a", duration=0.1))
+        await asyncio.sleep(0.01)
+        cancelled = asyncio.create_task(self.run_tool(scheduler, "trace", "b"))
+        later = asyncio.create_task(self.run_tool(scheduler, "trace", "c"))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        await asyncio.gather(first, later)
+
+        self.assertEqual(self.order, ["a", "c"])
+        self.assertEqual(scheduler.stats()["running"], {})
+        self.assertGreater(scheduler.stats()["wait_max_s"], 0)
@@ -0,0 +1,109 @@
+from unittest import IsolatedAsyncioTestCase
+from llm.utils.tools.professor_ping_funcs import draw_topology_diagram
+from llm.utils.lazy import networkx as nx
+from llm.utils.tools.topology import KeywordMatcher, TOPOLOGY_MAX_NODES, fold, parse_scenario, render_topology, \
+    topology_graph, get_topology_diagram
+
+
+class TestTopology(IsolatedAsyncioTestCase):
+    """
+    Test case for the topology diagram registry and its keyword matcher
+    """
+
+    def test01_keyword_matcher(self):
+        """
+        Test if the matcher finds overlapping keywords in one pass and respects word boundaries
+        """
+        matcher = KeywordMatcher([("he", 1, False), ("she", 2, False), ("hers", 3, False), ("halka", 4, True)])
+
+        self.assertEqual(matcher.find("she hers"), [(0, "she", 2), (4, "hers", 3)])
+        self.assertEqual(matcher.find("ushers"), [])
+        self.assertEqual(matcher.find(fold("Halkada 5 cihaz")), [(0, "halka", 4)])
+
+    def test02_parse_scenario(self):
+        """
+        Test if topology, node count and device kind are read from Turkish and English scenarios
+        """
+        request = parse_scenario("Draw a ring with 8 routers")
+        self.assertEqual((request.topology.name, request.count, request.device), ("ring", 8, "router"))
+        request = parse_scenario("YILDIZ topolojisinde beş bilgisayar")
+        self.assertEqual((request.topology.name, request.count, request.device), ("star", 5, "pc"))
+        self.assertEqual(parse_scenario("star-bus hybrid network").topology.name, "hybrid")
+        self.assertEqual(parse_scenario("full mesh of servers").topology.name, "fully connected")
+        self.assertIsNone(parse_scenario("business plan for 192.168.1.10").topology)
+
+    async def test03_draw_topology_diagram(self):
+        """
+        Test if known topologies, parameterized diagrams and the fallback are drawn deterministically
+        """
+        star = await draw_topology_diagram("Yıldız topolojisi çizer misin?")
+        self.assertTrue(star.startswith("Scenario: star/yıldız\n\n      [Hub]"))
+
+        ring = await draw_topology_diagram("a ring with 8 routers")
+        self.assertIn("(8 routers)", ring)
+        self.assertEqual(ring.split("\n")[2].count("[R"), 8)
+        self.assertEqual(ring, await draw_topology_diagram("A RING with 8 routers"))
+
+        self.assertEqual(await draw_topology_diagram("draw my network"), "Scenario: link/bağlantı\n\n[A]-----[B]")
+        self.assertIsNone(await draw_topology_diagram("DNS nedir?"))
+        self.assertEqual(await draw_topology_diagram(""), "Invalid or empty scenario description.")
+
+    def test04_rendering_is_bounded_and_memoized(self):
+        """
+        Test if node counts are clamped to the topology limits and repeated renders come from the cache
+        """
+        self.assertIn("(3 nodes)", render_topology("ring", 1))
+        self.assertIn(f"({TOPOLOGY_MAX_NODES} nodes, capped from 500)", render_topology("bus", 500))
+        named = get_topology_diagram("a ring named " + ", ".join(f"R{i}" for i in range(40)))
+        self.assertIn(f"({TOPOLOGY_MAX_NODES} nodes, capped from 40)", named)
+        full = render_topology("fully connected", 6, "switch")
+        self.assertIn("Links: 15", full)
+
+        hits = render_topology.cache_info().hits
+        render_topology("fully connected", 6, "switch")
+        self.assertEqual(render_topology.cache_info().hits, hits + 1)
+
+    def test05_graph_model(self):
+        """
+        Test if every topology is built as a graph of the expected shape for any node count
+        """
+        for n in (3, 8, 17):
+            labels = tuple(f"N{i}" for i in range(n))
+            self.assertEqual(topology_graph("star", labels).degree("Hub"), n)
+            self.assertEqual(topology_graph("bus", labels).number_of_edges(), n - 1)
+            self.assertTrue(all(degree == 2 for _, degree in topology_graph("ring", labels).degree))
+            self.assertEqual(topology_graph("fully connected", labels).number_of_edges(), n * (n - 1) // 2)
+            self.assertEqual(topology_graph("tree", labels).number_of_edges(), n - 1)
+            self.assertEqual(topology_graph("hybrid", labels).number_of_nodes(), 1 + n + -(-n // 3))
+
+        with self.assertRaises(Exception):
+            topology_graph("ring", ("A", "B", "C")).add_edge("A", "Z")
+
+    async def test06_labels_and_svg(self):
+        """
+        Test if labels named in the scenario are drawn and the SVG has one box per node and one line per link
+        """
+        star = await draw_topology_diagram("a star named Web, DB and Cache")
+        self.assertTrue(star.endswith("[Web]  [DB]  [Cache]"))
+
+        svg = render_topology("ring", 8, "router", fmt="svg")
+        self.assertTrue(svg.startswith("<svg") and svg.endswith("</svg>"))
+        self.assertEqual((svg.count("<rect"), svg.count("<line")), (8, 8))
+        self.assertIn("<title>ring/halka (8 routers)</title>", svg)
+        with self.assertRaises(ValueError):
+            render_topology("ring", 8, fmt="png")
+
+    def test07_hub_never_merges_with_a_label(self):
+        """
+        Test if a label named like the hub or a switch gets its own node instead of merging into it
+        """
+        star = get_topology_diagram("star named Hub, DB and Cache")
+        self.assertIn("(3 nodes)", star)
+        self.assertTrue(star.endswith("[Hub]  [DB]  [Cache]"))
+        graph = topology_graph("star", ("Hub", "DB", "Cache"))
+        self.assertEqual((graph.graph["root"], graph.degree("Hub-2"), nx.number_of_selfloops(graph)), ("Hub-2", 3, 0))
+
+        hybrid = topology_graph("hybrid", ("Hub", "Switch1", "Switch2", "A", "B"))
+        self.assertEqual(hybrid.number_of_nodes(), 1 + 5 + 2)
+        self.assertEqual(sorted(n for n, role in hybrid.nodes(data="role") if role == "switch"),
+                         ["Switch1-2", "Switch2-2"])